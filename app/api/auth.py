@@ -1,33 +1,42 @@
-from datetime import timedelta
+from datetime import datetime
+from functools import partial
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import (
+    access_token_claims,
     create_access_token,
     get_password_hash,
-    verify_password,
+    password_pool,
+    verify_and_update_password,
 )
-from app.core.config import settings
-from app.core.deps import get_db
-from app.schemas.user import UserCreate, UserResponse, UserLogin
-from app.database import user_repository
+from app.core.deps import decode_access_token, get_db, oauth2_scheme_optional
+from app.core.principal import revocation_list
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+from app.schemas.user import UserCreate, UserResponse, UserLogin, RefreshTokenRequest
+from app.database import user_repository, refresh_token_repository
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], route_class=UnitOfWorkRoute)
 
 
-@router.post("/login", response_model=dict)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
-):
+async def authenticate(db: Session, username: str, password: str):
     """
-    Login bằng OAuth2 form (username & password)
-    Trả về JWT access token
+    Kiểm tra username / mật khẩu. Route async: query chạy ở threadpool,
+    verify chạy ở password_pool (không giữ thread nào trong lúc chờ hash).
+    Hash cũ (scheme / cost khác cấu hình) được thay bằng hash mới, commit cùng request.
     """
-    user = user_repository.get_by_username(db, form_data.username)
+    user = await run_in_threadpool(user_repository.get_by_username, db, username)
+
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await password_pool.run(verify_and_update_password, password, user.password_hash)
 
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -40,23 +49,49 @@ def login(
             detail="Tài khoản của bạn đã bị khóa",
         )
 
-    access_token_expires = timedelta(
-        minutes=settings.access_token_expire_minutes
-    )
-    access_token = create_access_token(
-        subject=user.id,
-        expires_delta=access_token_expires,
-    )
+    if new_hash:
+        await run_in_threadpool(user_repository.update_password, db, user, new_hash)
 
+    return user
+
+
+def token_response(db: Session, user, family_id: Optional[str] = None) -> dict:
+    """
+    Access token ngắn hạn (mang role / active) + refresh token mới.
+    family_id: giữ family khi xoay vòng, None -> phiên mới (login)
+    """
     return {
-        "access_token": access_token,
+        "access_token": create_access_token(subject=user.id, claims=access_token_claims(user)),
+        "refresh_token": refresh_token_repository.issue(db, user.id, family_id=family_id),
         "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "user": UserResponse.from_orm(user),
     }
 
 
+def _invalid_refresh_token() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Refresh token không hợp lệ hoặc đã hết hạn",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+@router.post("/login", response_model=dict)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
+):
+    """
+    Login bằng OAuth2 form (username & password)
+    Trả về JWT access token
+    """
+    user = await authenticate(db, form_data.username, form_data.password)
+    return await run_in_threadpool(token_response, db, user)
+
+
 @router.post("/login-json", response_model=dict)
-def login_json(
+async def login_json(
     user_data: UserLogin,
     db: Session = Depends(get_db),
 ):
@@ -64,34 +99,54 @@ def login_json(
     Login bằng JSON payload
     Dùng cho frontend SPA / mobile app
     """
-    user = user_repository.get_by_username(db, user_data.username)
+    user = await authenticate(db, user_data.username, user_data.password)
+    return await run_in_threadpool(token_response, db, user)
 
-    if not user or not verify_password(user_data.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Tài khoản của bạn đã bị khóa",
-        )
+@router.post("/refresh", response_model=dict)
+def refresh(
+    data: RefreshTokenRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Đổi refresh token lấy cặp token mới, refresh token cũ bị thu hồi (xoay vòng).
+    Role / trạng thái active trong access token mới đọc lại từ DB.
+    Refresh token đã dùng bị gửi lại (có thể bị lộ) -> thu hồi cả family, phải login lại.
+    """
+    stored = refresh_token_repository.get_by_token(db, data.refresh_token)
+    if stored is None or stored.expires_at <= datetime.utcnow():
+        raise _invalid_refresh_token()
 
-    access_token_expires = timedelta(
-        minutes=settings.access_token_expire_minutes
-    )
-    access_token = create_access_token(
-        subject=user.id,
-        expires_delta=access_token_expires,
-    )
+    if not refresh_token_repository.revoke(db, stored.id):
+        # Trả response thay vì raise để UnitOfWorkRoute commit việc thu hồi family
+        refresh_token_repository.revoke_family(db, stored.family_id)
+        error = _invalid_refresh_token()
+        return JSONResponse(status_code=error.status_code, content={"detail": error.detail}, headers=error.headers)
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": UserResponse.from_orm(user),
-    }
+    user = user_repository.get(db, stored.user_id)
+    if not user or not user.is_active:
+        raise _invalid_refresh_token()
+
+    return token_response(db, user, family_id=stored.family_id)
+
+
+@router.post("/logout")
+def logout(
+    data: Optional[RefreshTokenRequest] = None,
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    db: Session = Depends(get_db),
+):
+    """Thu hồi phiên hiện tại: family của refresh token + access token đang dùng"""
+    if data is not None:
+        stored = refresh_token_repository.get_by_token(db, data.refresh_token)
+        if stored is not None:
+            refresh_token_repository.revoke_family(db, stored.family_id)
+
+    claims = decode_access_token(token) if token else None
+    if claims is not None and "jti" in claims:
+        on_commit(db, partial(revocation_list.revoke_token, claims["jti"], float(claims["exp"])))
+
+    return {"message": "Đã đăng xuất"}
 
 
 @router.post(
@@ -122,7 +177,7 @@ def register(
             )
 
     user_dict = user_data.dict()
-    user_dict["password_hash"] = get_password_hash(user_data.password)
+    user_dict["password_hash"] = password_pool.run_blocking(get_password_hash, user_data.password)
     user_dict.pop("password", None)
 
     user = user_repository.create_user(db, user_dict)
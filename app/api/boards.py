@@ -1,3 +1,4 @@
+from functools import partial
 from fastapi import APIRouter, HTTPException, status, Query, Depends
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -11,16 +12,25 @@ from app.schemas.board import (
 from app.schemas.task import TaskResponse
 from app.database import (
     board_repository,
-    task_repository
+    task_repository,
+    time_entry_repository
 )
 from app.database.models import User
 from app.core.deps import (
     get_db,
     get_current_user,
+    load_user_snapshot,
     optional_current_user
 )
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+from app.core.permissions import (
+    BoardPermissions,
+    get_board_permissions,
+    get_board_permissions_optional,
+    invalidate_board
+)
 
-router = APIRouter(prefix="/boards", tags=["boards"])
+router = APIRouter(prefix="/boards", tags=["boards"], route_class=UnitOfWorkRoute)
 
 
 # =========================
@@ -39,33 +49,14 @@ def get_boards(
     - Admin: xem tất cả
     - User: xem board của mình + public
     """
-    if current_user.role == "admin":
-        boards = board_repository.get_multi(db)
-    else:
-        boards = board_repository.get_accessible_boards(
-            db,
-            current_user.id
-        )
-
-    paginated = boards[skip: skip + limit]
-
-    response: List[BoardResponse] = []
-
-    for board in paginated:
-        tasks = task_repository.get_by_board(db, board.id)
-
-        board_resp = BoardResponse.from_orm(board)
-        board_resp.tasks_count = len(tasks)
-
-        if board.owner:
-            board_resp.owner_name = (
-                board.owner.full_name
-                or board.owner.username
-            )
-
-        response.append(board_resp)
+    rows = board_repository.get_summaries(
+        db,
+        user_id=None if current_user.role == "admin" else current_user.id,
+        skip=skip,
+        limit=limit
+    )
 
-    return response
+    return [BoardResponse.from_orm(row) for row in rows]
 
 
 @router.get("/public", response_model=List[BoardResponse])
@@ -79,26 +70,14 @@ def get_public_boards(
     Public boards (projects)
     - Không cần đăng nhập
     """
-    boards = board_repository.get_public_boards(db)
-    paginated = boards[skip: skip + limit]
-
-    response: List[BoardResponse] = []
-
-    for board in paginated:
-        tasks = task_repository.get_by_board(db, board.id)
-
-        board_resp = BoardResponse.from_orm(board)
-        board_resp.tasks_count = len(tasks)
-
-        if board.owner:
-            board_resp.owner_name = (
-                board.owner.full_name
-                or board.owner.username
-            )
-
-        response.append(board_resp)
+    rows = board_repository.get_summaries(
+        db,
+        public_only=True,
+        skip=skip,
+        limit=limit
+    )
 
-    return response
+    return [BoardResponse.from_orm(row) for row in rows]
 
 
 # =========================
@@ -126,11 +105,13 @@ def create_board(
         obj_in=board_dict
     )
 
+    # current_user từ token chỉ có id / role -> tên lấy từ cache user
+    owner = load_user_snapshot(db, current_user.id)
     board_resp = BoardResponse.from_orm(board)
     board_resp.tasks_count = 0
     board_resp.owner_name = (
-        current_user.full_name
-        or current_user.username
+        owner.full_name
+        or owner.username
     )
 
     return board_resp
@@ -139,7 +120,7 @@ def create_board(
 @router.get("/{board_id}", response_model=BoardWithTasks)
 def get_board_detail(
     board_id: int,
-    current_user: Optional[User] = Depends(optional_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions_optional),
     db: Session = Depends(get_db)
 ):
     """
@@ -152,21 +133,8 @@ def get_board_detail(
             detail="Board không tồn tại"
         )
 
-    can_access = (
-        board.is_public
-        or (
-            current_user and (
-                board.owner_id == current_user.id
-                or current_user.role == "admin"
-            )
-        )
-    )
-
-    if not can_access:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền truy cập board này"
-        )
+    permissions.remember(board)
+    permissions.require(board_id, "read")
 
     tasks = task_repository.get_by_board(db, board_id)
 
@@ -175,6 +143,7 @@ def get_board_detail(
         TaskResponse.from_orm(t)
         for t in tasks
     ]
+    board_resp.total_seconds = sum(t.total_seconds for t in tasks)
 
     return board_resp
 
@@ -183,7 +152,7 @@ def get_board_detail(
 def update_board(
     board_id: int,
     board_update: BoardUpdate,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -196,25 +165,25 @@ def update_board(
             detail="Board không tồn tại"
         )
 
-    if (
-        board.owner_id != current_user.id
-        and current_user.role != "admin"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền chỉnh sửa board này"
-        )
+    permissions.remember(board)
+    permissions.require(
+        board_id,
+        "write",
+        detail="Không có quyền chỉnh sửa board này"
+    )
 
     updated = board_repository.update(
         db,
         db_obj=board,
-        obj_in=board_update
+        obj_in=board_update.dict(exclude_unset=True)
     )
+    on_commit(db, partial(invalidate_board, board_id))
 
     tasks = task_repository.get_by_board(db, board_id)
 
     board_resp = BoardResponse.from_orm(updated)
     board_resp.tasks_count = len(tasks)
+    board_resp.total_seconds = sum(t.total_seconds for t in tasks)
 
     if updated.owner:
         board_resp.owner_name = (
@@ -232,7 +201,7 @@ def update_board(
 @router.delete("/{board_id}")
 def delete_board(
     board_id: int,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -246,18 +215,18 @@ def delete_board(
             detail="Board không tồn tại"
         )
 
-    if (
-        board.owner_id != current_user.id
-        and current_user.role != "admin"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền xóa board này"
-        )
+    permissions.remember(board)
+    permissions.require(
+        board_id,
+        "write",
+        detail="Không có quyền xóa board này"
+    )
 
     tasks = task_repository.get_by_board(db, board_id)
 
+    time_entry_repository.delete_by_board(db, board_id)
     board_repository.delete(db, id=board_id)
+    on_commit(db, partial(invalidate_board, board_id))
 
     return {
         "message": f"Đã xóa board '{board.name}'",
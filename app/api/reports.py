@@ -1,11 +1,16 @@
+import json
 from datetime import date
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import (
+    board_repository,
+    job_repository,
     time_entry_repository,
-    task_repository
+    task_repository,
+    report_repository
 )
 from app.database.models import User
 from app.schemas.time import (
@@ -13,12 +18,27 @@ from app.schemas.time import (
     WeeklyReportResponse,
     TaskTimeReportResponse,
     StatisticsResponse,
+    TeamReportResponse,
+    UserTotalsColumns,
+    TaskTotalsColumns,
+    BoardTotalsColumns,
+    DayTotalsColumns,
+    UserDayTotalsColumns,
 )
-from app.core.deps import get_db, get_current_user
+from app.schemas.job import JobCreate, JobResponse
+from app.core.config import settings
+from app.core.deps import get_db, get_current_user, get_current_admin_user
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+from app.core.analytics_engine import analytics_engine
+from app.core.report_cache import report_cache
+from app.core.permissions import BoardPermissions, get_board_permissions
+from app.core.time_export import EXPORT_FORMATS, iter_time_entries_export
+from app.core.jobs import job_runner
 
 router = APIRouter(
     prefix="/reports",
-    tags=["reports"]
+    tags=["reports"],
+    route_class=UnitOfWorkRoute
 )
 
 # =========================
@@ -52,30 +72,45 @@ def daily_report(
 
 @router.get("/weekly", response_model=WeeklyReportResponse)
 def weekly_report(
+    request: Request,
     start_date: date = Query(...),
     end_date: date = Query(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Báo cáo thời gian làm việc theo tuần / khoảng ngày"""
+    """
+    Báo cáo thời gian làm việc theo tuần / khoảng ngày
+    (đọc từ rollup theo ngày, không quét time_entries)
+    """
     if start_date > end_date:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="start_date phải nhỏ hơn end_date"
         )
 
-    data = time_entry_repository.get_group_by_date(
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "weekly",
+        WeeklyReportResponse,
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
+    data = report_repository.get_daily_totals(
         db,
         user_id=current_user.id,
         start_date=start_date,
         end_date=end_date
     )
 
-    return WeeklyReportResponse(
+    return cached.store(WeeklyReportResponse(
         start_date=start_date,
         end_date=end_date,
         days=data
-    )
+    ))
 
 
 # =========================
@@ -84,6 +119,7 @@ def weekly_report(
 
 @router.get("/by-task", response_model=List[TaskTimeReportResponse])
 def report_by_task(
+    request: Request,
     start_date: date = Query(...),
     end_date: date = Query(...),
     current_user: User = Depends(get_current_user),
@@ -96,6 +132,17 @@ def report_by_task(
             detail="start_date phải nhỏ hơn end_date"
         )
 
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "by-task",
+        List[TaskTimeReportResponse],
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
     stats = time_entry_repository.get_group_by_task(
         db,
         user_id=current_user.id,
@@ -103,7 +150,7 @@ def report_by_task(
         end_date=end_date
     )
 
-    return stats
+    return cached.store(stats)
 
 
 # =========================
@@ -112,6 +159,7 @@ def report_by_task(
 
 @router.get("/summary", response_model=StatisticsResponse)
 def summary_statistics(
+    request: Request,
     start_date: date = Query(...),
     end_date: date = Query(...),
     current_user: User = Depends(get_current_user),
@@ -122,6 +170,7 @@ def summary_statistics(
     - Tổng thời gian
     - Số task
     - Trung bình / ngày
+    Tổng thời gian đọc từ rollup theo ngày
     """
     if start_date > end_date:
         raise HTTPException(
@@ -129,11 +178,279 @@ def summary_statistics(
             detail="start_date phải nhỏ hơn end_date"
         )
 
-    stats = time_entry_repository.statistics(
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "summary",
+        StatisticsResponse,
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
+    # Khoảng dài: tính trong RAM, không cache (có thể trễ tối đa 1 chu kỳ refresh của engine)
+    stats = analytics_engine.statistics(current_user.id, start_date, end_date)
+    if stats is not None:
+        return stats
+
+    stats = report_repository.statistics(
         db,
         user_id=current_user.id,
         start_date=start_date,
         end_date=end_date
     )
 
-    return stats
\ No newline at end of file
+    return cached.store(stats)
+
+
+# =========================
+# Team / board reports (admin)
+# =========================
+
+def _columns(model, rows: List[dict]):
+    """Danh sách dòng -> dạng cột theo field của model"""
+    return model(**{field: [row[field] for row in rows] for field in model.model_fields})
+
+
+def _team_report(db: Session, start_date: date, end_date: date, board_id: Optional[int] = None) -> TeamReportResponse:
+    groups = report_repository.team_rollup(db, start_date, end_date, board_id=board_id)
+    total = groups["total"][0] if groups["total"] else {"total_seconds": 0, "entry_count": 0}
+    return TeamReportResponse(
+        start_date=start_date,
+        end_date=end_date,
+        board_id=board_id,
+        total_seconds=total["total_seconds"],
+        entry_count=total["entry_count"],
+        by_user=_columns(UserTotalsColumns, groups["by_user"]),
+        by_task=_columns(TaskTotalsColumns, groups["by_task"]),
+        by_board=_columns(BoardTotalsColumns, groups["by_board"]),
+        by_day=_columns(DayTotalsColumns, groups["by_day"]),
+        by_user_day=_columns(UserDayTotalsColumns, groups["by_user_day"]),
+    )
+
+
+@router.get("/team", response_model=TeamReportResponse)
+def team_report(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Tổng thời gian của cả team theo user / task / board / ngày (admin)
+    Mọi nhóm tính trong 1 query GROUPING SETS, trả về dạng cột
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    return _team_report(db, start_date, end_date)
+
+
+@router.get("/board/{board_id}", response_model=TeamReportResponse)
+def board_report(
+    board_id: int,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Như /reports/team, chỉ tính các task của 1 board (admin)"""
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    if not board_repository.get(db, board_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Board không tồn tại"
+        )
+
+    return _team_report(db, start_date, end_date, board_id=board_id)
+
+
+# =========================
+# Export (payroll)
+# =========================
+
+def _export_scope(
+    format: str,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    user_id: Optional[int],
+    board_id: Optional[int],
+    current_user: User,
+    permissions: BoardPermissions
+):
+    """Kiểm tra tham số + quyền export, trả về (format, user_id sau khi giới hạn)"""
+    fmt = format.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format phải là 1 trong: {', '.join(EXPORT_FORMATS)}"
+        )
+
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    if current_user.role != "admin":
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Không có quyền export dữ liệu của user khác"
+            )
+        user_id = current_user.id
+
+    if board_id is not None:
+        permissions.require(board_id, "read")
+    return fmt, user_id
+
+
+@router.get("/export")
+def export_time_entries(
+    format: str = Query(default="csv"),
+    start_date: Optional[date] = Query(default=None),
+    end_date: Optional[date] = Query(default=None),
+    user_id: Optional[int] = Query(default=None),
+    board_id: Optional[int] = Query(default=None),
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions)
+):
+    """
+    Export time entries đã dừng dạng CSV / NDJSON (stream, không load hết vào RAM)
+    - Admin: lọc được theo user bất kỳ
+    - User thường: chỉ export entry của chính mình
+    Khoảng dài (nhiều tháng): dùng POST /reports/jobs để không giữ request / connection
+    """
+    fmt, user_id = _export_scope(format, start_date, end_date, user_id, board_id, current_user, permissions)
+
+    filename = f"time_entries_{start_date or 'all'}_{end_date or 'all'}.{fmt}"
+    return StreamingResponse(
+        iter_time_entries_export(
+            fmt,
+            start_date=start_date,
+            end_date=end_date,
+            user_id=user_id,
+            board_id=board_id
+        ),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# =========================
+# Jobs (export dài, rebuild rollup)
+# =========================
+
+def _get_own_job(db: Session, job_id: int, current_user: User):
+    job = job_repository.get(db, job_id)
+    # Job của user khác: 404 như không tồn tại (admin xem được mọi job)
+    if job is None or (job.user_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job không tồn tại"
+        )
+    return job
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_job(
+    job_in: JobCreate,
+    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Xếp hàng 1 job nền, trả về ngay (202). Theo dõi bằng GET /reports/jobs/{id}
+    - export: cùng quyền với GET /reports/export
+    - rebuild_reports: chỉ admin
+    """
+    if job_in.kind == "export":
+        fmt, user_id = _export_scope(
+            job_in.format, job_in.start_date, job_in.end_date,
+            job_in.user_id, job_in.board_id, current_user, permissions
+        )
+        params = {
+            "format": fmt,
+            "start_date": job_in.start_date,
+            "end_date": job_in.end_date,
+            "user_id": user_id,
+            "board_id": job_in.board_id,
+        }
+    else:
+        if current_user.role != "admin":
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Chỉ admin được rebuild báo cáo"
+            )
+        params = {
+            "start_date": job_in.start_date,
+            "end_date": job_in.end_date,
+            "user_id": job_in.user_id,
+        }
+
+    if job_repository.count_active(db, current_user.id) >= settings.JOB_MAX_ACTIVE_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Tối đa {settings.JOB_MAX_ACTIVE_PER_USER} job đang chờ / chạy mỗi user"
+        )
+
+    job = job_repository.create(db, current_user.id, job_in.kind, params)
+    if settings.JOB_RUNNER == "embedded":
+        on_commit(db, job_runner.wake)
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Trạng thái + tiến độ (processed / total) của job"""
+    return _get_own_job(db, job_id, current_user)
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=JobResponse)
+def cancel_job(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Hủy job: đang chờ -> cancelled ngay, đang chạy -> dừng ở lần báo tiến độ kế tiếp"""
+    job = _get_own_job(db, job_id, current_user)
+    if not job_repository.request_cancel(db, job):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job đã kết thúc"
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+def download_job_result(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Tải file kết quả của job export đã xong"""
+    job = _get_own_job(db, job_id, current_user)
+    if job.status != "succeeded" or not job.result_path:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Job chưa có kết quả"
+        )
+    fmt = json.loads(job.params).get("format", "csv")
+    return FileResponse(
+        job.result_path,
+        media_type=EXPORT_FORMATS.get(fmt),
+        filename=f"job_{job.id}.{fmt}"
+    )
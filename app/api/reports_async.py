@@ -0,0 +1,228 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.database.async_connection import get_async_db
+from app.database.async_repository import (
+    async_time_entry_repository,
+    async_report_repository,
+)
+from app.database.models import User
+from app.schemas.time import (
+    DailyReportResponse,
+    WeeklyReportResponse,
+    TaskTimeReportResponse,
+    StatisticsResponse,
+    TimeEntryResponse,
+    TeamReportResponse,
+)
+from app.schemas.job import JobResponse
+from app.core.deps import get_current_user_async
+from app.database.unit_of_work import UnitOfWorkRoute
+from app.core.analytics_engine import analytics_engine
+from app.core.report_cache import report_cache
+from app.api.reports import (
+    board_report,
+    cancel_job,
+    create_job,
+    download_job_result,
+    export_time_entries,
+    get_job,
+    team_report,
+)
+
+# Bản async def của app/api/reports.py (DB_ASYNC=True)
+router = APIRouter(
+    prefix="/reports",
+    tags=["reports"],
+    route_class=UnitOfWorkRoute
+)
+
+# =========================
+# Daily report
+# =========================
+
+@router.get("/daily", response_model=DailyReportResponse)
+async def daily_report(
+    report_date: date = Query(default=date.today()),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Báo cáo thời gian làm việc theo ngày"""
+    entries = await async_time_entry_repository.get_by_user_and_date(
+        db,
+        user_id=current_user.id,
+        report_date=report_date
+    )
+    total_seconds = sum(e.duration_seconds for e in entries)
+
+    return DailyReportResponse(
+        date=report_date,
+        total_seconds=total_seconds,
+        entries=[TimeEntryResponse.from_orm(e) for e in entries]
+    )
+
+
+# =========================
+# Weekly report
+# =========================
+
+@router.get("/weekly", response_model=WeeklyReportResponse)
+async def weekly_report(
+    request: Request,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Báo cáo thời gian làm việc theo tuần / khoảng ngày"""
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "weekly",
+        WeeklyReportResponse,
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
+    data = await async_report_repository.get_daily_totals(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    return cached.store(WeeklyReportResponse(
+        start_date=start_date,
+        end_date=end_date,
+        days=data
+    ))
+
+
+# =========================
+# Report by task
+# =========================
+
+@router.get("/by-task", response_model=List[TaskTimeReportResponse])
+async def report_by_task(
+    request: Request,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Báo cáo tổng thời gian theo từng task"""
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "by-task",
+        List[TaskTimeReportResponse],
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
+    stats = await async_time_entry_repository.get_group_by_task(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    return cached.store(stats)
+
+
+# =========================
+# Summary statistics
+# =========================
+
+@router.get("/summary", response_model=StatisticsResponse)
+async def summary_statistics(
+    request: Request,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Thống kê tổng hợp:
+    - Tổng thời gian
+    - Số task
+    - Trung bình / ngày
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date phải nhỏ hơn end_date"
+        )
+
+    cached = report_cache.lookup(
+        request,
+        current_user.id,
+        "summary",
+        StatisticsResponse,
+        start_date=start_date,
+        end_date=end_date
+    )
+    if cached.response is not None:
+        return cached.response
+
+    # Khoảng dài: tính trong RAM, không cache (có thể trễ tối đa 1 chu kỳ refresh của engine)
+    stats = analytics_engine.statistics(current_user.id, start_date, end_date)
+    if stats is not None:
+        return stats
+
+    stats = await async_report_repository.statistics(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    return cached.store(stats)
+
+
+# =========================
+# Team / board reports (admin)
+# =========================
+
+# Dùng lại route sync: 1 query aggregate trên session sync (threadpool)
+router.add_api_route("/team", team_report, methods=["GET"], response_model=TeamReportResponse)
+router.add_api_route("/board/{board_id}", board_report, methods=["GET"], response_model=TeamReportResponse)
+
+
+# =========================
+# Export (payroll)
+# =========================
+
+# Dùng lại route sync: generator stream tự mở session sync riêng
+router.add_api_route("/export", export_time_entries, methods=["GET"])
+
+
+# =========================
+# Jobs (export dài, rebuild rollup)
+# =========================
+
+# Dùng lại route sync: chỉ ghi / đọc 1 dòng jobs, việc nặng chạy ở JobRunner
+router.add_api_route(
+    "/jobs", create_job, methods=["POST"], response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+router.add_api_route("/jobs/{job_id}", get_job, methods=["GET"], response_model=JobResponse)
+router.add_api_route("/jobs/{job_id}/cancel", cancel_job, methods=["POST"], response_model=JobResponse)
+router.add_api_route("/jobs/{job_id}/result", download_job_result, methods=["GET"])
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, status, Query, Depends
+from datetime import date
+from fastapi import APIRouter, HTTPException, status, Query, Depends, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 from typing import List, Optional
 
 from app.schemas.task import (
@@ -7,43 +9,60 @@ from app.schemas.task import (
     TaskUpdate,
     TaskResponse,
     TaskMove,
-    TaskAssign
+    TaskAssign,
+    TaskBatchUpdate
 )
 from app.database import (
     task_repository,
-    board_repository,
+    time_entry_repository,
     user_repository
 )
-from app.database.models import User, StatusEnum
+from app.database.models import User, StatusEnum, PriorityEnum
+from app.database.task_repository import TASK_SORTS
 from app.core.deps import get_db, get_current_user
+from app.database.unit_of_work import UnitOfWorkRoute
+from app.core.permissions import BoardPermissions, get_board_permissions
 
-router = APIRouter(prefix="/tasks", tags=["tasks"])
+router = APIRouter(prefix="/tasks", tags=["tasks"], route_class=UnitOfWorkRoute)
 
 
 # =========================
-# Helper: board permission
+# Helper: keyset page
 # =========================
 
-def check_board_access(
+def paginate_tasks(
     db: Session,
-    board_id: int,
-    user: User,
-    action: str = "read"
-) -> bool:
-    board = board_repository.get(db, board_id)
-    if not board:
-        return False
-
-    if user.role == "admin":
-        return True
+    response: Response,
+    query: Select,
+    sort: str,
+    cursor: Optional[str],
+    limit: int
+) -> List[TaskResponse]:
+    """Chạy query theo trang, cursor trang sau trả trong header X-Next-Cursor"""
+    if sort not in TASK_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"sort phải là 1 trong: {', '.join(TASK_SORTS)}"
+        )
 
-    if board.owner_id == user.id:
-        return True
+    try:
+        tasks, next_cursor = task_repository.get_page(
+            db,
+            query,
+            sort=sort,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    if board.is_public and action == "read":
-        return True
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    return False
+    return [TaskResponse.from_orm(t) for t in tasks]
 
 
 # =========================
@@ -52,52 +71,39 @@ def check_board_access(
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    response: Response,
     board_id: int = Query(..., description="Board (Project) ID"),
-    status: Optional[str] = Query(None),
+    status_filter: Optional[List[StatusEnum]] = Query(None, alias="status"),
     assigned_to: Optional[int] = Query(None),
-    current_user: User = Depends(get_current_user),
+    priority: Optional[List[PriorityEnum]] = Query(None),
+    due_from: Optional[date] = Query(None),
+    due_to: Optional[date] = Query(None),
+    q: Optional[str] = Query(None, description="Tìm trong title / description"),
+    sort: str = Query("position", description="position | -position | updated_at | -updated_at"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor của trang trước"),
+    limit: int = Query(100, ge=1, le=500),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Lấy danh sách tasks trong board
     (sử dụng cho task list + time tracking)
+    - Filter kết hợp: status, assigned_to, priority (lặp param để chọn nhiều), due_date, q
+    - Phân trang keyset: còn trang sau -> header X-Next-Cursor
     """
-    board = board_repository.get(db, board_id)
-    if not board:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Board không tồn tại"
-        )
-
-    if not check_board_access(db, board_id, current_user, "read"):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền truy cập board này"
-        )
-
-    if status:
-        try:
-            status_enum = StatusEnum(status)
-            tasks = task_repository.get_by_status(
-                db,
-                board_id,
-                status_enum
-            )
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Status không hợp lệ"
-            )
-    else:
-        tasks = task_repository.get_by_board(db, board_id)
+    permissions.require(board_id, "read")
+
+    query = task_repository.build_query(
+        board_id=board_id,
+        statuses=status_filter,
+        assigned_to=assigned_to,
+        priorities=priority,
+        due_from=due_from,
+        due_to=due_to,
+        text=q
+    )
 
-    if assigned_to is not None:
-        tasks = [
-            t for t in tasks
-            if t.assigned_to == assigned_to
-        ]
-
-    return [TaskResponse.from_orm(t) for t in tasks]
+    return paginate_tasks(db, response, query, sort, cursor, limit)
 
 
 # =========================
@@ -111,32 +117,25 @@ def get_tasks(
 )
 def create_task(
     task_data: TaskCreate,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Tạo task mới (task sẽ là đơn vị theo dõi thời gian)
     """
-    if not check_board_access(
-        db,
+    permissions.require(
         task_data.board_id,
-        current_user,
-        "write"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền tạo task"
-        )
+        "write",
+        detail="Không có quyền tạo task"
+    )
 
-    existing = task_repository.get_by_status(
+    task_dict = task_data.dict()
+    task_dict["position"] = task_repository.append_position(
         db,
         task_data.board_id,
         task_data.status
     )
 
-    task_dict = task_data.dict()
-    task_dict["position"] = len(existing)
-
     task = task_repository.create(
         db,
         obj_in=task_dict
@@ -145,6 +144,58 @@ def create_task(
     return TaskResponse.from_orm(task)
 
 
+# =========================
+# Batch update
+# =========================
+
+@router.patch("/batch", response_model=List[TaskResponse])
+def batch_update_tasks(
+    batch: TaskBatchUpdate,
+    permissions: BoardPermissions = Depends(get_board_permissions),
+    db: Session = Depends(get_db)
+):
+    """
+    Cập nhật nhiều task trong 1 request / 1 transaction
+    (kéo nhiều card, assign hàng loạt, đóng sprint)
+    - Kiểm tra quyền 1 lần cho mỗi board
+    - Mỗi thao tác 1 UPDATE set-based, trả về các dòng đã đổi
+    """
+    all_ids = list({i for op in batch.operations for i in op.task_ids})
+    board_ids = task_repository.get_board_ids(db, all_ids)
+
+    missing = sorted(set(all_ids) - set(board_ids))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Task không tồn tại: {missing}"
+        )
+
+    # 1 query cho mọi board trong batch (hoặc 0 nếu đã có trong cache)
+    permissions.require_many(
+        set(board_ids.values()),
+        "write",
+        detail="Không có quyền chỉnh sửa task trong board"
+    )
+
+    operations = [
+        (op.task_ids, op.dict(exclude_unset=True, exclude={"task_ids"}))
+        for op in batch.operations
+    ]
+
+    assignees = {c["assigned_to"] for _, c in operations if c.get("assigned_to") is not None}
+    if assignees:
+        active = {u.id for u in user_repository.get_many(db, assignees) if u.is_active}
+        if assignees - active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User được assign không hợp lệ"
+            )
+
+    rows = task_repository.batch_update(db, operations, board_ids)
+
+    return [TaskResponse.from_orm(row) for row in rows]
+
+
 # =========================
 # Task detail
 # =========================
@@ -152,7 +203,7 @@ def create_task(
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -165,16 +216,11 @@ def get_task(
             detail="Task không tồn tại"
         )
 
-    if not check_board_access(
-        db,
+    permissions.require(
         task.board_id,
-        current_user,
-        "read"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền truy cập task"
-        )
+        "read",
+        detail="Không có quyền truy cập task"
+    )
 
     return TaskResponse.from_orm(task)
 
@@ -187,7 +233,7 @@ def get_task(
 def update_task(
     task_id: int,
     task_update: TaskUpdate,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -200,21 +246,16 @@ def update_task(
             detail="Task không tồn tại"
         )
 
-    if not check_board_access(
-        db,
+    permissions.require(
         task.board_id,
-        current_user,
-        "write"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền chỉnh sửa task"
-        )
+        "write",
+        detail="Không có quyền chỉnh sửa task"
+    )
 
     updated = task_repository.update(
         db,
         db_obj=task,
-        obj_in=task_update
+        obj_in=task_update.dict(exclude_unset=True)
     )
 
     return TaskResponse.from_orm(updated)
@@ -228,11 +269,13 @@ def update_task(
 def move_task(
     task_id: int,
     task_move: TaskMove,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
     Di chuyển task (giữ lại để không phá UI cũ)
+    - after_id / before_id: thả giữa 2 card, chỉ cập nhật 1 dòng
+    - position: chỉ số trong cột (kiểu cũ)
     """
     task = task_repository.get(db, task_id)
     if not task:
@@ -241,24 +284,27 @@ def move_task(
             detail="Task không tồn tại"
         )
 
-    if not check_board_access(
-        db,
+    permissions.require(
         task.board_id,
-        current_user,
-        "write"
-    ):
+        "write",
+        detail="Không có quyền di chuyển task"
+    )
+
+    try:
+        moved = task_repository.move_task(
+            db,
+            task_id,
+            task_move.status,
+            task_move.position,
+            after_id=task_move.after_id,
+            before_id=task_move.before_id
+        )
+    except ValueError as e:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền di chuyển task"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
 
-    moved = task_repository.move_task(
-        db,
-        task_id,
-        task_move.status,
-        task_move.position
-    )
-
     return TaskResponse.from_orm(moved)
 
 
@@ -270,7 +316,7 @@ def move_task(
 def assign_task(
     task_id: int,
     task_assign: TaskAssign,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -283,16 +329,11 @@ def assign_task(
             detail="Task không tồn tại"
         )
 
-    if not check_board_access(
-        db,
+    permissions.require(
         task.board_id,
-        current_user,
-        "write"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền assign task"
-        )
+        "write",
+        detail="Không có quyền assign task"
+    )
 
     if task_assign.assigned_to:
         user = user_repository.get(
@@ -321,7 +362,7 @@ def assign_task(
 @router.delete("/{task_id}")
 def delete_task(
     task_id: int,
-    current_user: User = Depends(get_current_user),
+    permissions: BoardPermissions = Depends(get_board_permissions),
     db: Session = Depends(get_db)
 ):
     """
@@ -334,17 +375,13 @@ def delete_task(
             detail="Task không tồn tại"
         )
 
-    if not check_board_access(
-        db,
+    permissions.require(
         task.board_id,
-        current_user,
-        "write"
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Không có quyền xóa task"
-        )
+        "write",
+        detail="Không có quyền xóa task"
+    )
 
+    time_entry_repository.delete_by_task(db, task_id)
     task_repository.delete(db, id=task_id)
 
     return {
@@ -359,18 +396,29 @@ def delete_task(
 
 @router.get("/my/assigned", response_model=List[TaskResponse])
 def get_my_assigned_tasks(
+    response: Response,
+    status_filter: Optional[List[StatusEnum]] = Query(None, alias="status"),
+    priority: Optional[List[PriorityEnum]] = Query(None),
+    due_from: Optional[date] = Query(None),
+    due_to: Optional[date] = Query(None),
+    q: Optional[str] = Query(None, description="Tìm trong title / description"),
+    sort: str = Query("-updated_at", description="position | -position | updated_at | -updated_at"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor của trang trước"),
+    limit: int = Query(100, ge=1, le=500),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Tasks được assign cho user hiện tại (dashboard + thống kê thời gian)
+    Admin: toàn bộ tasks. Filter / phân trang giống GET /tasks
     """
-    if current_user.role == "admin":
-        tasks = task_repository.get_multi(db)
-    else:
-        tasks = task_repository.get_by_assigned_user(
-            db,
-            current_user.id
-        )
+    query = task_repository.build_query(
+        assigned_to=None if current_user.role == "admin" else current_user.id,
+        statuses=status_filter,
+        priorities=priority,
+        due_from=due_from,
+        due_to=due_to,
+        text=q
+    )
 
-    return [TaskResponse.from_orm(t) for t in tasks]
\ No newline at end of file
+    return paginate_tasks(db, response, query, sort, cursor, limit)
@@ -1,5 +1,11 @@
+import asyncio
+import json
+from functools import partial
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -7,26 +13,55 @@ from app.database import (
     task_repository,
     user_repository,
     time_entry_repository,
+    report_repository,
 )
 from app.database.models import User
 from app.schemas.time import (
     TimeEntryResponse,
     TimeStart,
     TimeStop,
+    TimeSwitchResponse,
     DailyReportResponse,
     StatisticsResponse,
 )
-from app.core.deps import get_db, get_current_user
+from app.core.analytics_engine import analytics_engine
+from app.core.config import settings
+from app.core.deps import get_db, get_current_user, get_current_user_stream
+from app.core.events import timer_events
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+from app.core.time_import import SUPPORTED_FORMATS, import_time_entries as run_import
+from app.schemas.time_entry import TimeEntryImportResult
 
 router = APIRouter(
     prefix="/time",
-    tags=["time-tracking"]
+    tags=["time-tracking"],
+    route_class=UnitOfWorkRoute
 )
 
 # =========================
 # START stopwatch
 # =========================
 
+def start_error(task, user_id: int) -> HTTPException:
+    """Lý do start thất bại (chỉ tra cứu ở nhánh lỗi, nhánh thành công 1 statement)"""
+    if not task:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task không tồn tại"
+        )
+
+    if task.assigned_to and task.assigned_to != user_id:
+        return HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Bạn không được assign task này"
+        )
+
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Bạn đang bấm giờ cho task khác"
+    )
+
+
 @router.post("/start", response_model=TimeEntryResponse)
 def start_timer(
     payload: TimeStart,
@@ -36,41 +71,64 @@ def start_timer(
     """
     Bắt đầu bấm giờ cho 1 task
     - 1 user chỉ được chạy 1 timer tại 1 thời điểm
+    - Kiểm tra task / quyền / timer đang chạy nằm trong 1 INSERT ... SELECT
     """
-    task = task_repository.get(db, payload.task_id)
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task không tồn tại"
-        )
+    entry = time_entry_repository.start_atomic(
+        db=db,
+        user_id=current_user.id,
+        task_id=payload.task_id,
+        started_at=datetime.utcnow(),
+        note=payload.note
+    )
+    if entry is None:
+        raise start_error(task_repository.get(db, payload.task_id), current_user.id)
 
-    # Kiểm tra task có được assign cho user không
-    if task.assigned_to and task.assigned_to != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Bạn không được assign task này"
-        )
+    response = TimeEntryResponse.from_orm(entry)
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.started",
+        "entry": jsonable_encoder(response),
+    }))
+    return response
 
-    # Kiểm tra timer đang chạy
-    running = time_entry_repository.get_running_by_user(
-        db,
-        current_user.id
-    )
-    if running:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Bạn đang bấm giờ cho task khác"
-        )
 
-    entry = time_entry_repository.start(
+# =========================
+# SWITCH stopwatch
+# =========================
+
+@router.post("/switch", response_model=TimeSwitchResponse)
+def switch_timer(
+    payload: TimeStart,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Dừng timer đang chạy (nếu có) và bắt đầu timer cho task mới
+    trong 1 transaction: lỗi -> timer cũ vẫn chạy
+    """
+    stopped, started = time_entry_repository.switch(
         db=db,
         user_id=current_user.id,
         task_id=payload.task_id,
-        started_at=datetime.utcnow(),
+        switched_at=datetime.utcnow(),
         note=payload.note
     )
+    if started is None:
+        raise start_error(task_repository.get(db, payload.task_id), current_user.id)
 
-    return TimeEntryResponse.from_orm(entry)
+    response = TimeSwitchResponse(
+        stopped=TimeEntryResponse.from_orm(stopped) if stopped else None,
+        started=TimeEntryResponse.from_orm(started)
+    )
+    if response.stopped:
+        on_commit(db, partial(timer_events.publish, current_user.id, {
+            "type": "timer.stopped",
+            "entry": jsonable_encoder(response.stopped),
+        }))
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.started",
+        "entry": jsonable_encoder(response.started),
+    }))
+    return response
 
 
 # =========================
@@ -106,8 +164,19 @@ def stop_timer(
         entry=entry,
         stopped_at=datetime.utcnow()
     )
+    if not stopped:
+        # Request khác vừa dừng timer này
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Không có timer đang chạy"
+        )
 
-    return TimeEntryResponse.from_orm(stopped)
+    response = TimeEntryResponse.from_orm(stopped)
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.stopped",
+        "entry": jsonable_encoder(response),
+    }))
+    return response
 
 
 # =========================
@@ -131,6 +200,103 @@ def get_running_timer(
     return TimeEntryResponse.from_orm(entry)
 
 
+# =========================
+# Running timer stream (SSE)
+# =========================
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event['entry'])}\n\n"
+
+
+def timer_stream_response(request: Request, user_id: int, running_entry) -> StreamingResponse:
+    """SSE: snapshot timer đang chạy, sau đó các event start/stop của user"""
+    snapshot = {
+        "type": "timer.snapshot",
+        "entry": jsonable_encoder(TimeEntryResponse.from_orm(running_entry)) if running_entry else None,
+    }
+    queue = timer_events.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield _sse(snapshot)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(),
+                        timeout=settings.SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(event)
+        finally:
+            timer_events.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@router.get("/stream")
+async def stream_running_timer(
+    request: Request,
+    current_user: User = Depends(get_current_user_stream),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events thay cho polling /time/running
+    - Event đầu tiên "timer.snapshot": timer đang chạy (hoặc null)
+    - Sau đó "timer.started" / "timer.stopped" khi user start/stop ở bất kỳ tab nào
+    Token có thể gửi qua header hoặc ?access_token=
+    """
+    entry = await run_in_threadpool(
+        time_entry_repository.get_running_by_user,
+        db,
+        current_user.id
+    )
+    # Trả connection về pool, stream có thể mở rất lâu
+    await run_in_threadpool(db.close)
+
+    return timer_stream_response(request, current_user.id, entry)
+
+
+# =========================
+# Bulk import
+# =========================
+
+@router.post("/import", response_model=TimeEntryImportResult)
+def import_time_entries(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv | ndjson (mặc định theo đuôi file)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Import timesheet từ tool khác (CSV có header hoặc NDJSON)
+    - Cột: task_id, user_id (mặc định: user hiện tại), start_time, end_time, notes
+    - User thường chỉ import cho chính mình, admin import cho mọi user
+    - Ghi theo chunk (COPY trên Postgres), mỗi chunk 1 transaction
+    - Trả về lỗi theo từng dòng + throughput (rows/s)
+    """
+    fmt = format
+    if fmt is None:
+        filename = (file.filename or "").lower()
+        fmt = "ndjson" if filename.endswith((".ndjson", ".jsonl")) else "csv"
+
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format phải là csv hoặc ndjson"
+        )
+
+    return run_import(db, file.file, fmt, current_user)
+
+
 # =========================
 # Daily report
 # =========================
@@ -179,7 +345,12 @@ def statistics(
             detail="Ngày bắt đầu phải nhỏ hơn ngày kết thúc"
         )
 
-    stats = time_entry_repository.statistics(
+    # Khoảng dài: tính trong RAM (analytics engine), None -> SQL
+    stats = analytics_engine.statistics(current_user.id, start_date, end_date)
+    if stats is not None:
+        return stats
+
+    stats = report_repository.statistics(
         db,
         user_id=current_user.id,
         start_date=start_date,
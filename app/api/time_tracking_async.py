@@ -0,0 +1,270 @@
+from datetime import datetime, date
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.database.async_connection import get_async_db
+from app.database.async_repository import (
+    async_task_repository,
+    async_time_entry_repository,
+    async_report_repository,
+)
+from app.database.models import User
+from app.schemas.time import (
+    TimeEntryResponse,
+    TimeStart,
+    TimeStop,
+    TimeSwitchResponse,
+    DailyReportResponse,
+    StatisticsResponse,
+)
+from app.core.analytics_engine import analytics_engine
+from app.core.deps import get_current_user_async, get_current_user_stream_async
+from app.core.events import timer_events
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+from app.api.time_tracking import timer_stream_response, import_time_entries, start_error
+from app.schemas.time_entry import TimeEntryImportResult
+
+# Bản async def của app/api/time_tracking.py (DB_ASYNC=True)
+router = APIRouter(
+    prefix="/time",
+    tags=["time-tracking"],
+    route_class=UnitOfWorkRoute
+)
+
+# =========================
+# START stopwatch
+# =========================
+
+@router.post("/start", response_model=TimeEntryResponse)
+async def start_timer(
+    payload: TimeStart,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Bắt đầu bấm giờ cho 1 task
+    - 1 user chỉ được chạy 1 timer tại 1 thời điểm
+    - Kiểm tra task / quyền / timer đang chạy nằm trong 1 INSERT ... SELECT
+    """
+    entry = await async_time_entry_repository.start_atomic(
+        db=db,
+        user_id=current_user.id,
+        task_id=payload.task_id,
+        started_at=datetime.utcnow(),
+        note=payload.note
+    )
+    if entry is None:
+        raise start_error(await async_task_repository.get(db, payload.task_id), current_user.id)
+
+    response = TimeEntryResponse.from_orm(entry)
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.started",
+        "entry": jsonable_encoder(response),
+    }))
+    return response
+
+
+# =========================
+# SWITCH stopwatch
+# =========================
+
+@router.post("/switch", response_model=TimeSwitchResponse)
+async def switch_timer(
+    payload: TimeStart,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Dừng timer đang chạy (nếu có) và bắt đầu timer mới trong 1 transaction"""
+    stopped, started = await async_time_entry_repository.switch(
+        db=db,
+        user_id=current_user.id,
+        task_id=payload.task_id,
+        switched_at=datetime.utcnow(),
+        note=payload.note
+    )
+    if started is None:
+        raise start_error(await async_task_repository.get(db, payload.task_id), current_user.id)
+
+    response = TimeSwitchResponse(
+        stopped=TimeEntryResponse.from_orm(stopped) if stopped else None,
+        started=TimeEntryResponse.from_orm(started)
+    )
+    if response.stopped:
+        on_commit(db, partial(timer_events.publish, current_user.id, {
+            "type": "timer.stopped",
+            "entry": jsonable_encoder(response.stopped),
+        }))
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.started",
+        "entry": jsonable_encoder(response.started),
+    }))
+    return response
+
+
+# =========================
+# STOP stopwatch
+# =========================
+
+@router.post("/stop", response_model=TimeEntryResponse)
+async def stop_timer(
+    payload: TimeStop,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Dừng stopwatch"""
+    entry = await async_time_entry_repository.get_running_by_user(
+        db,
+        current_user.id
+    )
+
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Không có timer đang chạy"
+        )
+
+    if payload.task_id and entry.task_id != payload.task_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Task không khớp với timer đang chạy"
+        )
+
+    stopped = await async_time_entry_repository.stop(
+        db=db,
+        entry=entry,
+        stopped_at=datetime.utcnow()
+    )
+    if not stopped:
+        # Request khác vừa dừng timer này
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Không có timer đang chạy"
+        )
+
+    response = TimeEntryResponse.from_orm(stopped)
+    on_commit(db, partial(timer_events.publish, current_user.id, {
+        "type": "timer.stopped",
+        "entry": jsonable_encoder(response),
+    }))
+    return response
+
+
+# =========================
+# My running timer
+# =========================
+
+@router.get("/running", response_model=Optional[TimeEntryResponse])
+async def get_running_timer(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Lấy timer đang chạy (frontend polling)"""
+    entry = await async_time_entry_repository.get_running_by_user(
+        db,
+        current_user.id
+    )
+
+    if not entry:
+        return None
+
+    return TimeEntryResponse.from_orm(entry)
+
+
+# =========================
+# Running timer stream (SSE)
+# =========================
+
+@router.get("/stream")
+async def stream_running_timer(
+    request: Request,
+    current_user: User = Depends(get_current_user_stream_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Server-Sent Events thay cho polling /time/running"""
+    entry = await async_time_entry_repository.get_running_by_user(
+        db,
+        current_user.id
+    )
+    # Trả connection về pool, stream có thể mở rất lâu
+    await db.close()
+
+    return timer_stream_response(request, current_user.id, entry)
+
+
+# =========================
+# Bulk import
+# =========================
+
+# Dùng lại route sync: import là job ghi nặng, chạy trong threadpool với session sync
+router.add_api_route(
+    "/import",
+    import_time_entries,
+    methods=["POST"],
+    response_model=TimeEntryImportResult,
+)
+
+
+# =========================
+# Daily report
+# =========================
+
+@router.get("/daily-report", response_model=DailyReportResponse)
+async def daily_report(
+    report_date: date = Query(default=date.today()),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Báo cáo thời gian làm việc theo ngày"""
+    entries = await async_time_entry_repository.get_by_user_and_date(
+        db,
+        user_id=current_user.id,
+        report_date=report_date
+    )
+
+    total_seconds = sum(e.duration_seconds for e in entries)
+
+    return DailyReportResponse(
+        date=report_date,
+        total_seconds=total_seconds,
+        entries=[TimeEntryResponse.from_orm(e) for e in entries]
+    )
+
+
+# =========================
+# Statistics
+# =========================
+
+@router.get("/statistics", response_model=StatisticsResponse)
+async def statistics(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Thống kê thời gian làm việc
+    - Theo task
+    - Theo ngày
+    """
+    if start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ngày bắt đầu phải nhỏ hơn ngày kết thúc"
+        )
+
+    # Khoảng dài: tính trong RAM (analytics engine), None -> SQL
+    stats = analytics_engine.statistics(current_user.id, start_date, end_date)
+    if stats is not None:
+        return stats
+
+    stats = await async_report_repository.statistics(
+        db,
+        user_id=current_user.id,
+        start_date=start_date,
+        end_date=end_date
+    )
+
+    return stats
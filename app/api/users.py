@@ -1,3 +1,5 @@
+import time
+from functools import partial
 from fastapi import APIRouter, HTTPException, status, Depends
 from sqlalchemy.orm import Session
 from typing import List
@@ -7,16 +9,36 @@ from app.schemas.user import (
     UserUpdate,
     PasswordChange
 )
-from app.database import user_repository
+from app.database import user_repository, refresh_token_repository, time_entry_repository
 from app.database.models import User
 from app.core.deps import (
     get_db,
     get_current_user,
-    get_current_admin_user
+    get_current_admin_user,
+    load_user_snapshot
 )
-from app.core.security import verify_password
+from app.core.security import (
+    access_token_claims,
+    create_access_token,
+    get_password_hash,
+    password_pool,
+    verify_password,
+)
+from app.core.principal import invalidate_user, revoke_user_tokens
+from app.database.unit_of_work import UnitOfWorkRoute, on_commit
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=UnitOfWorkRoute)
+
 
-router = APIRouter(prefix="/users", tags=["users"])
+def _after_user_change(user_id: int, update_data: dict):
+    """
+    Sau commit: đổi role / khóa tài khoản -> access token đang lưu hành (mang role / active cũ)
+    bị từ chối, client refresh để nhận token mới (user bị khóa không refresh được)
+    """
+    if {"role", "is_active"} & set(update_data):
+        revoke_user_tokens(user_id)
+    else:
+        invalidate_user(user_id)
 
 
 # =========================
@@ -25,10 +47,12 @@ router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserResponse)
 def get_current_user_profile(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """Lấy thông tin user hiện tại"""
-    return UserResponse.from_orm(current_user)
+    # current_user từ token chỉ có id / role -> hồ sơ lấy từ cache user
+    return UserResponse.from_orm(load_user_snapshot(db, current_user.id))
 
 
 @router.put("/me", response_model=UserResponse)
@@ -46,8 +70,11 @@ def update_current_user(
             detail="Không có quyền thay đổi role"
         )
 
+    # current_user là snapshot / claims của token -> load bản ghi thật để ghi
+    user = user_repository.get(db, current_user.id)
+
     # Email conflict
-    if user_update.email and user_update.email != current_user.email:
+    if user_update.email and user_update.email != user.email:
         existing = user_repository.get_by_email(db, user_update.email)
         if existing and existing.id != current_user.id:
             raise HTTPException(
@@ -57,9 +84,10 @@ def update_current_user(
 
     updated_user = user_repository.update(
         db,
-        db_obj=current_user,
+        db_obj=user,
         obj_in=update_data
     )
+    on_commit(db, partial(_after_user_change, current_user.id, update_data))
     return UserResponse.from_orm(updated_user)
 
 
@@ -70,9 +98,11 @@ def change_password(
     db: Session = Depends(get_db)
 ):
     """Đổi mật khẩu user hiện tại"""
-    if not verify_password(
+    user = user_repository.get(db, current_user.id)
+    if not password_pool.run_blocking(
+        verify_password,
         password_change.current_password,
-        current_user.password_hash
+        user.password_hash
     ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -81,10 +111,23 @@ def change_password(
 
     user_repository.update_password(
         db,
-        current_user,
-        password_change.new_password
+        user,
+        password_pool.run_blocking(get_password_hash, password_change.new_password)
     )
-    return {"message": "Đổi mật khẩu thành công"}
+
+    # Đăng xuất mọi phiên cũ, cấp phiên mới cho client đang đổi mật khẩu.
+    # Thời điểm thu hồi lấy trước khi cấp access token mới: token mới không bị thu hồi theo
+    revoked_at = time.time()
+    refresh_token_repository.revoke_user(db, user.id)
+    refresh_token = refresh_token_repository.issue(db, user.id)
+    access_token = create_access_token(subject=user.id, claims=access_token_claims(user))
+    on_commit(db, partial(revoke_user_tokens, current_user.id, revoked_at))
+    return {
+        "message": "Đổi mật khẩu thành công",
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
 
 
 # =========================
@@ -153,11 +196,15 @@ def admin_update_user(
                 detail="Email đã được sử dụng"
             )
 
+    if update_data.get("is_active") is False:
+        refresh_token_repository.revoke_user(db, user_id)
+
     updated_user = user_repository.update(
         db,
         db_obj=user,
         obj_in=update_data
     )
+    on_commit(db, partial(_after_user_change, user_id, update_data))
     return UserResponse.from_orm(updated_user)
 
 
@@ -181,7 +228,9 @@ def admin_delete_user(
             detail="Không thể xóa chính mình"
         )
 
+    time_entry_repository.delete_by_user(db, user_id)
     user_repository.delete(db, id=user_id)
+    on_commit(db, partial(revoke_user_tokens, user_id))
     return {
         "message": f"Đã xóa user {user.username}",
         "deleted_user_id": user_id
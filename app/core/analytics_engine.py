@@ -0,0 +1,339 @@
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import BigInteger, cast, func, select
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.database.models import Task, TimeEntry
+
+try:
+    import numpy as np
+except ImportError:  # tùy chọn, chỉ cần khi ANALYTICS_ENGINE_ENABLED
+    np = None
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Cột của mảng đọc từ DB (_load)
+ID, USER, TASK, STARTED, DURATION = range(5)
+
+# Số task mỗi lần reload (task_id IN (...))
+RELOAD_CHUNK = 1000
+
+
+def to_epoch(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def _epoch_column(column, dialect: str):
+    """started_at -> epoch giây (int) tính ở DB, tránh convert datetime từng dòng trong Python"""
+    if dialect == "postgresql":
+        return cast(func.floor(func.extract("epoch", column)), BigInteger)
+    return cast(func.strftime("%s", column), BigInteger)
+
+
+# =========================
+# Column store
+# =========================
+
+class ColumnStore:
+    """
+    Ảnh chụp bất biến các entry đã dừng, sắp theo (user_id, started):
+    user_id / task_id / duration int32, started int64 (epoch giây) -> 20 byte / entry.
+    Refresh tạo bản mới rồi thay reference: request đọc không cần lock.
+    """
+
+    def __init__(self, user_id, task_id, started, duration):
+        self.user_id = user_id
+        self.task_id = task_id
+        self.started = started
+        self.duration = duration
+
+    @classmethod
+    def from_rows(cls, rows) -> "ColumnStore":
+        """rows: mảng int64 (N, 5) theo thứ tự cột của _load, chưa sắp"""
+        order = np.lexsort((rows[:, STARTED], rows[:, USER]))
+        rows = rows[order]
+        return cls(
+            rows[:, USER].astype(np.int32),
+            rows[:, TASK].astype(np.int32),
+            rows[:, STARTED].copy(),
+            rows[:, DURATION].astype(np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    @property
+    def nbytes(self) -> int:
+        return self.user_id.nbytes + self.task_id.nbytes + self.started.nbytes + self.duration.nbytes
+
+    def _keys(self):
+        return (self.user_id.astype(np.int64) << 34) + self.started
+
+    def merge(self, other: "ColumnStore") -> "ColumnStore":
+        """Chèn other vào đúng vị trí sắp xếp: O(N) copy, không sort lại toàn bộ"""
+        if not len(self):
+            return other
+        positions = np.searchsorted(self._keys(), other._keys(), side="right")
+        return ColumnStore(
+            np.insert(self.user_id, positions, other.user_id),
+            np.insert(self.task_id, positions, other.task_id),
+            np.insert(self.started, positions, other.started),
+            np.insert(self.duration, positions, other.duration),
+        )
+
+    def without_tasks(self, task_ids) -> "ColumnStore":
+        keep = ~np.isin(self.task_id, task_ids)
+        return ColumnStore(self.user_id[keep], self.task_id[keep], self.started[keep], self.duration[keep])
+
+    def user_range(self, user_id: int, start: int, end: int):
+        """Vị trí [a, b) các entry của user có start <= started < end (2 lần binary search)"""
+        lo = int(np.searchsorted(self.user_id, user_id, side="left"))
+        hi = int(np.searchsorted(self.user_id, user_id, side="right"))
+        started = self.started[lo:hi]
+        return (
+            lo + int(np.searchsorted(started, start, side="left")),
+            lo + int(np.searchsorted(started, end, side="left")),
+        )
+
+
+# =========================
+# Engine
+# =========================
+
+class AnalyticsEngine:
+    """
+    Thống kê thời gian cho khoảng dài (>= min_days ngày) tính trong RAM bằng NumPy
+    thay vì đọc toàn bộ entry của khoảng từ DB.
+
+    Job nền refresh mỗi refresh_seconds:
+    - Entry đã dừng có id > watermark: nạp thêm (tăng dần, không đọc lại dữ liệu cũ)
+    - Sửa / xóa entry, entry id cũ dừng sau, entry commit muộn: phát hiện qua
+      tasks.total_seconds / entry_count (đọc bảng tasks, O(số task)) lệch với số đã thấy
+      + phần vừa nạp -> nạp lại entry của các task đó
+    statistics() trả None (caller dùng SQL) khi engine tắt / chưa nạp xong / quá 3 chu kỳ
+    chưa refresh / user vừa đổi entry trong worker này (tới lần refresh sau).
+    Worker khác đổi entry: kết quả trễ tối đa 1 chu kỳ refresh.
+    """
+
+    def __init__(self, enabled: bool, refresh_seconds: int, min_days: int, batch_size: int):
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self.min_days = min_days
+        self.batch_size = batch_size
+        self._store: Optional[ColumnStore] = None
+        self._watermark = 0
+        # tasks (id, total_seconds, entry_count) ở lần refresh trước, sắp theo id
+        self._tasks = None
+        self._refreshed_at: Optional[float] = None
+        self._dirty: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+        self.last_refresh_ms = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if not self.enabled or self.refresh_seconds <= 0:
+            return
+        if np is None:
+            raise RuntimeError("ANALYTICS_ENGINE_ENABLED=true nhưng chưa cài numpy")
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def mark_dirty(self, user_id: int):
+        """Gọi sau commit (on_commit): user đọc từ SQL tới lần refresh sau"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty[user_id] = time.monotonic()
+
+    # ====================
+    # Refresh
+    # ====================
+
+    def run_once(self) -> int:
+        """Refresh 1 lần, trả về số entry đã nạp (mới + nạp lại)"""
+        with self._refresh_lock:
+            started = time.monotonic()
+            db = SessionLocal()
+            try:
+                loaded = self._refresh(db)
+            finally:
+                db.rollback()
+                db.close()
+            with self._lock:
+                # Thay đổi commit trước lúc bắt đầu refresh đã nằm trong store
+                self._dirty = {user: at for user, at in self._dirty.items() if at >= started}
+                self._refreshed_at = started
+                self.last_refresh_ms = (time.monotonic() - started) * 1000
+            return loaded
+
+    def _load(self, db, *conditions):
+        """Entry đã dừng thỏa conditions -> mảng int64 (N, 5): id, user, task, started, duration"""
+        dialect = db.get_bind().dialect.name
+        query = select(
+            TimeEntry.id,
+            TimeEntry.user_id,
+            TimeEntry.task_id,
+            _epoch_column(TimeEntry.started_at, dialect),
+            func.coalesce(TimeEntry.duration_seconds, 0),
+        ).where(TimeEntry.stopped_at.isnot(None), *conditions)
+        result = db.execute(query.execution_options(yield_per=self.batch_size))
+        chunks = [np.array(chunk, dtype=np.int64) for chunk in result.partitions()]
+        return np.concatenate(chunks) if chunks else np.empty((0, 5), dtype=np.int64)
+
+    def _expected_tasks(self, task_ids, rows):
+        """(total_seconds, entry_count) mỗi task nếu chỉ có thêm các entry vừa nạp"""
+        totals = np.zeros(len(task_ids), dtype=np.int64)
+        counts = np.zeros(len(task_ids), dtype=np.int64)
+        if not len(task_ids):
+            return totals, counts
+
+        if self._tasks is not None and len(self._tasks):
+            seen = self._tasks
+            index = np.minimum(np.searchsorted(seen[:, 0], task_ids), len(seen) - 1)
+            found = seen[index, 0] == task_ids
+            totals[found] = seen[index[found], 1]
+            counts[found] = seen[index[found], 2]
+
+        if len(rows):
+            index = np.minimum(np.searchsorted(task_ids, rows[:, TASK]), len(task_ids) - 1)
+            found = task_ids[index] == rows[:, TASK]
+            np.add.at(totals, index[found], rows[found, DURATION])
+            np.add.at(counts, index[found], 1)
+        return totals, counts
+
+    def _refresh(self, db) -> int:
+        rows = self._load(db, TimeEntry.id > self._watermark)
+        watermark = max(self._watermark, int(rows[:, ID].max())) if len(rows) else self._watermark
+
+        tasks = np.array(
+            db.execute(select(Task.id, Task.total_seconds, Task.entry_count).order_by(Task.id)).all(),
+            dtype=np.int64
+        ).reshape(-1, 3)
+        totals, counts = self._expected_tasks(tasks[:, 0], rows)
+        changed = tasks[(tasks[:, 1] != totals) | (tasks[:, 2] != counts), 0]
+        removed = (
+            np.setdiff1d(self._tasks[:, 0], tasks[:, 0])
+            if self._tasks is not None else np.empty(0, dtype=np.int64)
+        )
+
+        store = self._store
+        stale = np.concatenate([changed, removed])
+        if len(stale):
+            rows = rows[~np.isin(rows[:, TASK], stale)]
+            if store is not None:
+                store = store.without_tasks(stale)
+            reloaded = [rows]
+            for i in range(0, len(changed), RELOAD_CHUNK):
+                reloaded.append(self._load(
+                    db,
+                    TimeEntry.task_id.in_(changed[i:i + RELOAD_CHUNK].tolist()),
+                    TimeEntry.id <= watermark,
+                ))
+            rows = np.concatenate(reloaded)
+
+        if len(rows):
+            added = ColumnStore.from_rows(rows)
+            store = store.merge(added) if store is not None else added
+        elif store is None:
+            store = ColumnStore.from_rows(rows)
+
+        self._store = store
+        self._watermark = watermark
+        self._tasks = tasks
+        return len(rows)
+
+    def _run(self):
+        while True:
+            try:
+                loaded = self.run_once()
+                if loaded:
+                    logger.info("Analytics engine loaded %d entries (%d total)", loaded, len(self._store))
+            except Exception:
+                logger.exception("Analytics engine refresh failed")
+            if self._stopped.wait(self.refresh_seconds):
+                return
+
+    # ====================
+    # Queries
+    # ====================
+
+    def _fresh(self) -> bool:
+        return (
+            self._refreshed_at is not None
+            and time.monotonic() - self._refreshed_at < 3 * self.refresh_seconds
+        )
+
+    def statistics(self, user_id: int, start_date: date, end_date: date) -> Optional[dict]:
+        """
+        Cùng kết quả với report_repository.statistics (thời gian cắt theo khoảng ngày,
+        task distinct của entry giao khoảng), None -> caller dùng SQL
+        """
+        days = (end_date - start_date).days + 1
+        if not self.enabled or days < self.min_days:
+            return None
+        store = self._store
+        with self._lock:
+            usable = store is not None and self._fresh() and user_id not in self._dirty
+            if not usable:
+                self.fallbacks += 1
+                return None
+            self.hits += 1
+
+        range_start = to_epoch(datetime.combine(start_date, datetime.min.time()))
+        range_end = range_start + days * 86400
+        # Cùng cận dưới started_at với overlapping() (entry dài nhất TIME_ENTRY_MAX_SPAN_DAYS)
+        a, b = store.user_range(user_id, range_start - settings.TIME_ENTRY_MAX_SPAN_DAYS * 86400, range_end)
+        started = store.started[a:b]
+        stopped = started + store.duration[a:b]
+        seconds = np.minimum(stopped, range_end) - np.maximum(started, range_start)
+        total_seconds = int(seconds[seconds > 0].sum())
+        task_count = int(np.unique(store.task_id[a:b][stopped > range_start]).size)
+
+        return {
+            "total_seconds": total_seconds,
+            "task_count": task_count,
+            "average_per_day": total_seconds / days,
+        }
+
+    def stats(self) -> dict:
+        store = self._store
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "ready": store is not None and self._fresh(),
+                "entries": len(store) if store is not None else 0,
+                "memory_bytes": store.nbytes if store is not None else 0,
+                "watermark": self._watermark,
+                "refreshed_seconds_ago": (
+                    time.monotonic() - self._refreshed_at if self._refreshed_at is not None else None
+                ),
+                "last_refresh_ms": self.last_refresh_ms,
+                "dirty_users": len(self._dirty),
+                "hits": self.hits,
+                "fallbacks": self.fallbacks,
+            }
+
+
+analytics_engine = AnalyticsEngine(
+    enabled=settings.ANALYTICS_ENGINE_ENABLED,
+    refresh_seconds=settings.ANALYTICS_REFRESH_SECONDS,
+    min_days=settings.ANALYTICS_MIN_DAYS,
+    batch_size=settings.ANALYTICS_LOAD_BATCH_SIZE,
+)
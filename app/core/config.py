@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -8,11 +8,128 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str = "CHANGE_ME"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    # Access token ngắn hạn, mang role + trạng thái active (phân quyền không cần query DB)
+    # Refresh token xoay vòng lưu ở bảng refresh_tokens
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    REVOCATION_LIST_MAX_SIZE: int = 10000
+
+    # Ký / xác thực JWT: "hmac" (HS256/384/512 cài trực tiếp, nhanh nhất), "pyjwt", "jose"
+    # Claims đã xác thực cache theo hash của token tới lúc exp (tối đa TTL), 0 = tắt
+    TOKEN_BACKEND: str = "hmac"
+    TOKEN_CACHE_TTL_SECONDS: int = 3600
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Hash mật khẩu: scheme đầu tiên dùng cho hash mới, scheme sau chỉ để verify hash cũ
+    # (tự rehash khi login). argon2 cần cài argon2-cffi
+    PASSWORD_SCHEMES: List[str] = ["bcrypt_sha256", "bcrypt"]
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536  # KiB
+    PASSWORD_ARGON2_PARALLELISM: int = 1
+
+    # Pool riêng cho hash / verify mật khẩu: "thread" hoặc "process"
+    # Quá PASSWORD_HASH_MAX_PENDING việc đang chờ -> 503
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Cache user đang đăng nhập (get_current_user)
+    # TTL = thời gian stale tối đa sau khi user bị sửa/khóa ở worker khác, 0 = tắt
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+
+    # Cache owner / is_public của board (kiểm tra quyền), xóa khi board bị sửa / xóa
+    BOARD_CACHE_TTL_SECONDS: int = 30
+    BOARD_CACHE_MAX_SIZE: int = 10000
 
     # Database
     DATABASE_URL: str
 
+    # Connection pool
+    # DB_PRE_PING: "always" (ping mỗi checkout), "idle" (chỉ ping connection
+    # nằm trong pool lâu hơn DB_PRE_PING_IDLE_SECONDS), "never"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_PRE_PING: str = "idle"
+    DB_PRE_PING_IDLE_SECONDS: int = 60
+
+    # Profiler query theo request (header X-DB-Queries / Server-Timing, GET /health/queries)
+    # DB_SLOW_QUERY_MS: log statement chậm hơn ngưỡng, 0 = tắt
+    # DB_QUERY_BUDGETS: ghi đè budget theo route, vd {"GET /boards/": 2}
+    # DB_QUERY_BUDGET_STRICT: request vượt budget trả 500 (dùng khi test)
+    DB_PROFILER_ENABLED: bool = True
+    DB_SLOW_QUERY_MS: int = 200
+    DB_PROFILE_TOP_N: int = 3
+    DB_QUERY_BUDGETS: Dict[str, int] = {}
+    DB_QUERY_BUDGET_STRICT: bool = False
+
+    # Async stack (asyncpg): True -> /time và /reports chạy route async def
+    # ASYNC_DATABASE_URL mặc định suy ra từ DATABASE_URL
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Import time entries (POST /time/import)
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 1000
+    # start_time cũ hơn số ngày này / end_time ở tương lai -> lỗi dòng
+    # (mỗi tháng có entry có thể tạo 1 partition mới trên Postgres)
+    IMPORT_MAX_AGE_DAYS: int = 730
+
+    # Export time entries (GET /reports/export): số dòng mỗi lần fetch từ cursor
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Job nền (POST /reports/jobs): export dài, rebuild rollup chạy ở process pool riêng
+    # JOB_RUNNER: "embedded" (runner chạy trong process API; nhiều worker uvicorn trên Postgres:
+    # chỉ 1 worker giữ khóa advisory và chạy job) hoặc "external" (chạy scripts/run_jobs.py
+    # như 1 service riêng, API chỉ xếp hàng)
+    # JOB_WORKERS: số process chạy job cùng lúc của runner (không phụ thuộc số worker uvicorn)
+    JOB_RUNNER: str = "embedded"
+    JOB_WORKERS: int = 2
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_STALE_SECONDS: int = 300
+    JOB_RESULT_DIR: str = "var/jobs"
+    JOB_RESULT_TTL_HOURS: int = 24
+    JOB_MAX_ACTIVE_PER_USER: int = 3
+
+    # Cache kết quả /reports (weekly, by-task, summary) + ETag / 304 theo version dữ liệu time của user
+    # "memory": LRU trong process (nhiều worker: mỗi worker 1 bản, cũ tối đa TTL)
+    # "redis": chia sẻ giữa các worker (pip install redis), 0 giây = tắt
+    REPORT_CACHE_BACKEND: str = "memory"
+    REPORT_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    REPORT_CACHE_TTL_SECONDS: int = 300
+    REPORT_CACHE_MAX_SIZE: int = 10000
+
+    # Analytics engine (tùy chọn, pip install numpy): cột NumPy các entry đã dừng trong RAM,
+    # refresh tăng dần theo id mỗi ANALYTICS_REFRESH_SECONDS. /time/statistics, /reports/summary
+    # cho khoảng >= ANALYTICS_MIN_DAYS ngày tính từ đây; chưa sẵn sàng / cũ -> SQL
+    ANALYTICS_ENGINE_ENABLED: bool = False
+    ANALYTICS_REFRESH_SECONDS: int = 60
+    ANALYTICS_MIN_DAYS: int = 31
+    ANALYTICS_LOAD_BATCH_SIZE: int = 100000
+
+    # Partition theo tháng của time_entries (Postgres, migration 0007)
+    # Job nền tạo trước partition cho TIME_ENTRY_PARTITIONS_AHEAD tháng tới, 0 giây = tắt
+    # TIME_ENTRY_MAX_SPAN_DAYS: entry dài nhất mà query theo khoảng ngày còn thấy
+    # (cận dưới của started_at để planner bỏ qua partition cũ). Stop cắt entry dài hơn,
+    # import báo lỗi dòng
+    TIME_ENTRY_PARTITIONS_AHEAD: int = 3
+    TIME_ENTRY_PARTITION_CHECK_SECONDS: int = 86400
+    TIME_ENTRY_MAX_SPAN_DAYS: int = 31
+
+    # Kanban: position thưa, job nền rebalance cột khi khoảng cách < MIN_GAP
+    TASK_POSITION_GAP: int = 1024
+    TASK_REBALANCE_MIN_GAP: int = 16
+    TASK_REBALANCE_INTERVAL_SECONDS: int = 300  # 0 = tắt
+
+    # Timer events (SSE /time/stream)
+    # "local": 1 worker, "postgres": LISTEN/NOTIFY chia sẻ giữa nhiều worker
+    EVENTS_BACKEND: str = "local"
+    EVENTS_CHANNEL: str = "timer_events"
+    SSE_HEARTBEAT_SECONDS: int = 15
+
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
 
@@ -1,51 +1,159 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Union
 
-from app.core.config import settings
-from app.database.connection import SessionLocal
+from app.database.connection import get_db
+from app.database.async_connection import get_async_db
 from app.database import user_repository
-from app.database.models import User
+from app.database.async_repository import async_user_repository
+from app.core.principal import TokenPrincipal, UserSnapshot, revocation_list, user_cache
+from app.core.tokens import token_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def load_user_snapshot(db: Session, user_id: int) -> Optional[UserSnapshot]:
+    """
+    Lấy user từ cache, miss thì query DB rồi lưu snapshot.
+    Trả về None nếu user không tồn tại
+    """
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    user = user_repository.get(db, user_id)
+    if not user:
+        return None
 
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+
+async def load_user_snapshot_async(db: AsyncSession, user_id: int) -> Optional[UserSnapshot]:
+    """Bản async của load_user_snapshot, dùng chung cache"""
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    user = await async_user_repository.get(db, user_id)
+    if not user:
+        return None
+
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Claims của access token hợp lệ và chưa bị thu hồi (claims đã verify được cache trong token_service)"""
+    claims = token_service.verify(token)
+    if claims is None or revocation_list.is_revoked(claims):
+        return None
+    return claims
+
+
+def _user_id(claims: dict) -> Optional[int]:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = user_repository.get_by_id(db, int(user_id))
+        return int(claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _principal(claims: dict) -> Optional[TokenPrincipal]:
+    """Token mang role + active -> phân quyền không cần DB. Token cũ (chỉ có sub) -> None"""
+    if "role" not in claims or "active" not in claims:
+        return None
+    return TokenPrincipal(id=int(claims["sub"]), role=claims["role"], is_active=bool(claims["active"]))
+
+
+CurrentUser = Union[TokenPrincipal, UserSnapshot]
+
+
+def _resolve_user(token: str, db: Session) -> Optional[CurrentUser]:
+    """User đang active ứng với token, None nếu token / user không hợp lệ"""
+    claims = decode_access_token(token)
+    if claims is None or _user_id(claims) is None:
+        return None
+
+    user = _principal(claims) or load_user_snapshot(db, _user_id(claims))
+    if not user or not user.is_active:
+        return None
+    return user
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    user = _resolve_user(token, db)
+    if user is None:
+        raise _credentials_exception()
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    """get_current_user cho route async def (DB_ASYNC=True)"""
+    claims = decode_access_token(token)
+    if claims is None or _user_id(claims) is None:
+        raise _credentials_exception()
+
+    user = _principal(claims) or await load_user_snapshot_async(db, _user_id(claims))
     if not user or not user.is_active:
-        raise credentials_exception
+        raise _credentials_exception()
 
     return user
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_user_stream(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """
+    Như get_current_user nhưng nhận thêm token qua query ?access_token=
+    (EventSource của trình duyệt không gửi được header Authorization)
+    """
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_current_user(token=token, db=db)
+
+
+async def get_current_user_stream_async(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> CurrentUser:
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user_async(token=token, db=db)
+
+
+def get_current_admin_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Dependency để lấy user hiện tại và kiểm tra quyền admin"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -55,7 +163,7 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)) -> Us
     return current_user
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     """Hàm check quyền admin, dùng trong các API cần quyền cao"""
     if current_user.role != "admin":
         raise HTTPException(
@@ -66,9 +174,9 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
 
 
 def optional_current_user(
-    token: Optional[str] = Depends(oauth2_scheme),
+    token: Optional[str] = Depends(oauth2_scheme_optional),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[CurrentUser]:
     """
     Dependency cho phép user không đăng nhập vẫn truy cập.
     Nếu có token hợp lệ -> trả về User
@@ -76,17 +184,4 @@ def optional_current_user(
     """
     if not token:
         return None
-
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
-        return None
-
-    user = user_repository.get_by_id(db, int(user_id))
-    if not user or not user.is_active:
-        return None
-
-    return user
\ No newline at end of file
+    return _resolve_user(token, db)
\ No newline at end of file
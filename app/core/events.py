@@ -0,0 +1,168 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# =========================
+# Backends
+# =========================
+
+class LocalBackend:
+    """
+    Chỉ phát trong process hiện tại (1 uvicorn worker / dev)
+    """
+
+    def __init__(self):
+        self.hub: Optional["EventHub"] = None
+
+    def start(self, hub: "EventHub"):
+        self.hub = hub
+
+    def stop(self):
+        pass
+
+    def publish(self, user_id: int, event: dict):
+        if self.hub:
+            self.hub.dispatch(user_id, event)
+
+
+class PostgresNotifyBackend:
+    """
+    Chia sẻ event giữa nhiều worker qua Postgres LISTEN/NOTIFY.
+    publish -> pg_notify(channel, payload), mỗi worker có 1 thread LISTEN
+    nhận lại và dispatch cho subscriber cục bộ (kể cả worker đã publish).
+    """
+
+    def __init__(self, channel: str = "timer_events"):
+        self.channel = channel
+        self.hub: Optional["EventHub"] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self, hub: "EventHub"):
+        self.hub = hub
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, name="pg-listen", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def publish(self, user_id: int, event: dict):
+        from sqlalchemy import text
+        from app.database.connection import engine
+
+        payload = json.dumps({"user_id": user_id, "event": event}, default=str)
+        with engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": payload}
+            )
+
+    def _listen(self):
+        from app.database.connection import engine
+
+        while not self._stopped.is_set():
+            try:
+                raw = engine.raw_connection()
+                try:
+                    dbapi_conn = raw.driver_connection
+                    dbapi_conn.autocommit = True
+                    with dbapi_conn.cursor() as cursor:
+                        cursor.execute(f'LISTEN "{self.channel}"')
+
+                    while not self._stopped.is_set():
+                        if select.select([dbapi_conn], [], [], 1.0) == ([], [], []):
+                            continue
+                        dbapi_conn.poll()
+                        while dbapi_conn.notifies:
+                            notify = dbapi_conn.notifies.pop(0)
+                            data = json.loads(notify.payload)
+                            self.hub.dispatch(data["user_id"], data["event"])
+                finally:
+                    raw.invalidate()
+            except Exception:
+                logger.exception("LISTEN connection lost, reconnecting")
+                self._stopped.wait(1.0)
+
+
+# =========================
+# Hub
+# =========================
+
+class EventHub:
+    """
+    Pub/sub theo user trong process.
+    - Route sync (threadpool) gọi publish()
+    - Route async (SSE) subscribe() lấy asyncio.Queue
+    """
+
+    def __init__(self, backend, queue_size: int = 100):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.backend.start(self)
+
+    def stop(self):
+        self.backend.stop()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append((loop, queue))
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, [])
+            self._subscribers[user_id] = [s for s in subscribers if s[1] is not queue]
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, user_id: int, event: dict):
+        """Gửi event cho mọi tab/worker đang nghe user này. Lỗi backend không làm hỏng request."""
+        try:
+            self.backend.publish(user_id, event)
+        except Exception:
+            logger.exception("Publish event failed")
+
+    def dispatch(self, user_id: int, event: dict):
+        """Đẩy event vào queue của subscriber cục bộ (gọi được từ bất kỳ thread nào)"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, []))
+
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: dict):
+        if queue.full():
+            # Client chậm: bỏ event cũ nhất, client luôn nhận được trạng thái mới nhất
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+def _create_backend():
+    if settings.EVENTS_BACKEND == "postgres":
+        return PostgresNotifyBackend(channel=settings.EVENTS_CHANNEL)
+    return LocalBackend()
+
+
+timer_events = EventHub(_create_backend())
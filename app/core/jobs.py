@@ -0,0 +1,408 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, text
+
+# app.database trước: process con (spawn) import module này đầu tiên,
+# analytics_engine <-> time_entry_repository cần app.database được nạp trước
+from app.database.connection import SessionLocal, engine
+from app.database.job_repository import job_repository
+from app.database.models import Job, User
+from app.database.report_repository import report_repository
+from app.database.time_entry_repository import time_entry_repository
+from app.core.analytics_engine import analytics_engine
+from app.core.config import settings
+from app.core.report_cache import report_cache
+from app.core.time_export import write_time_entries_export
+
+logger = logging.getLogger(__name__)
+
+# Ghi tiến độ / kiểm tra cờ hủy tối đa 1 lần mỗi khoảng này (giây)
+PROGRESS_INTERVAL_SECONDS = 1.0
+# Dọn job treo / kết quả hết hạn mỗi khoảng này (giây)
+MAINTENANCE_INTERVAL_SECONDS = 60
+# Khóa advisory (Postgres) của runner embedded: trong các worker uvicorn chỉ 1 runner lấy job
+JOB_RUNNER_LOCK_KEY = 7_250_003
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def result_path(job_id: int, ext: str) -> str:
+    return os.path.abspath(os.path.join(settings.JOB_RESULT_DIR, f"job_{job_id}.{ext}"))
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value) if value else None
+
+
+class JobProgress:
+    """
+    Ghi processed / total của job bằng session + transaction riêng (thấy được ngay khi job
+    còn đang chạy), tối đa 1 lần / PROGRESS_INTERVAL_SECONDS. Job bị hủy -> JobCancelled.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.total: Optional[int] = None
+        self._reported_at = 0.0
+
+    def update(self, processed: int, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._reported_at < PROGRESS_INTERVAL_SECONDS:
+            return
+        self._reported_at = now
+        db = SessionLocal()
+        try:
+            cancelled = job_repository.report_progress(db, self.job_id, processed, self.total)
+            db.commit()
+        finally:
+            db.close()
+        if cancelled:
+            raise JobCancelled()
+
+
+# =========================
+# Job kinds (chạy trong process của pool)
+# =========================
+
+def _run_export(job_id: int, params: dict, progress: JobProgress) -> Optional[str]:
+    """Export CSV / NDJSON ra file, tiến độ theo số dòng"""
+    filters = {
+        "start_date": _parse_date(params.get("start_date")),
+        "end_date": _parse_date(params.get("end_date")),
+        "user_id": params.get("user_id"),
+        "board_id": params.get("board_id"),
+    }
+    db = SessionLocal()
+    try:
+        progress.total = time_entry_repository.count_export(db, **filters)
+    finally:
+        db.close()
+    progress.update(0, force=True)
+
+    path = result_path(job_id, params["format"])
+    partial = path + ".part"
+    try:
+        with open(partial, "w", newline="", encoding="utf-8") as fileobj:
+            written = write_time_entries_export(fileobj, params["format"], on_batch=progress.update, **filters)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    progress.update(written, force=True)
+    return path
+
+
+def _run_rebuild_reports(job_id: int, params: dict, progress: JobProgress) -> Optional[str]:
+    """Rebuild rollup theo ngày, mỗi user 1 transaction (hủy giữa chừng: user đã xong vẫn giữ)"""
+    start_date = _parse_date(params.get("start_date"))
+    end_date = _parse_date(params.get("end_date"))
+    db = SessionLocal()
+    try:
+        if params.get("user_id") is not None:
+            user_ids = [params["user_id"]]
+        else:
+            user_ids = db.scalars(select(User.id).order_by(User.id)).all()
+        progress.total = len(user_ids)
+        progress.update(0, force=True)
+        for done, user_id in enumerate(user_ids, start=1):
+            report_repository.rebuild(db, user_id=user_id, start_date=start_date, end_date=end_date)
+            db.commit()
+            progress.update(done, force=done == len(user_ids))
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return None
+
+
+JOB_KINDS = {
+    "export": _run_export,
+    "rebuild_reports": _run_rebuild_reports,
+}
+
+
+def run_job(job_id: int, kind: str, params: dict):
+    """
+    Điểm vào trong process con: chạy job rồi tự ghi trạng thái cuối
+    (runner tắt giữa chừng thì job đang chạy vẫn kết thúc đúng)
+    """
+    status, path, size, error = "succeeded", None, None, None
+    try:
+        path = JOB_KINDS[kind](job_id, params, JobProgress(job_id))
+        size = os.path.getsize(path) if path else None
+    except JobCancelled:
+        status = "cancelled"
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, kind)
+        status, error = "failed", f"{type(e).__name__}: {e}"
+
+    db = SessionLocal()
+    try:
+        job_repository.finish(db, job_id, status, result_path=path, result_bytes=size, error=error)
+        db.commit()
+    finally:
+        db.close()
+
+
+# =========================
+# Runner
+# =========================
+
+class JobRunner:
+    """
+    Lấy job queued từ bảng jobs, chạy ở process pool riêng (workers process, spawn),
+    không chiếm threadpool / connection của request.
+    - Nhiều runner (nhiều worker uvicorn hoặc scripts/run_jobs.py trên nhiều máy) dùng chung
+      1 bảng: claim bằng UPDATE có điều kiện, mỗi job chỉ 1 runner chạy
+    - Mỗi vòng: heartbeat các job đang chạy; job running của runner khác quá stale_seconds
+      không heartbeat -> failed; job kết thúc quá result_ttl_hours -> xóa file + dòng
+    - Process con chết (OOM, kill) -> job failed, tạo lại pool
+    - exclusive (runner embedded): giữ khóa advisory trên 1 connection riêng, worker uvicorn
+      không giữ được khóa thì không lấy job / không tạo pool -> tổng số process chạy job
+      luôn là JOB_WORKERS, không nhân theo số worker uvicorn. Worker giữ khóa chết
+      -> connection đóng, worker khác nhận khóa ở vòng sau
+    - Rebuild rollup xong -> đổi version cache báo cáo + analytics của các user bị ảnh hưởng
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        poll_seconds: float,
+        stale_seconds: int,
+        result_ttl_hours: int,
+        exclusive: bool = False
+    ):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.result_ttl_hours = result_ttl_hours
+        self.exclusive = exclusive
+        self.worker_id: Optional[str] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # job_id -> (future, kind, params)
+        self._running: Dict[int, Tuple[Future, str, dict]] = {}
+        self._lock_conn = None
+        self._leader = False
+        self._maintained_at = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        if self.workers <= 0:
+            return
+        os.makedirs(settings.JOB_RESULT_DIR, exist_ok=True)
+        # pid lấy lúc start: mỗi worker uvicorn là 1 runner riêng
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor is not None:
+            # Job đang chạy trong process con vẫn chạy tới hết và tự ghi trạng thái
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._release_lock()
+        self._leader = False
+
+    def _holds_lock(self) -> bool:
+        """Runner exclusive: giữ (hoặc vừa lấy được) khóa advisory. SQLite: 1 process, luôn True"""
+        if not self.exclusive or engine.dialect.name != "postgresql":
+            return True
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.exec_driver_sql("SELECT 1")
+                return True
+            except Exception:
+                # Connection chết -> khóa đã mất theo, lấy lại từ đầu
+                logger.warning("Job runner lost its lock connection")
+                self._lock_conn.invalidate()
+                self._lock_conn.close()
+                self._lock_conn = None
+
+        # AUTOCOMMIT: khóa theo session giữ lâu dài, không để transaction mở
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": JOB_RUNNER_LOCK_KEY}
+            ).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+        self._lock_conn = conn
+        logger.info("Job runner %s acquired the runner lock", self.worker_id)
+        return True
+
+    def _release_lock(self):
+        if self._lock_conn is None:
+            return
+        try:
+            self._lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": JOB_RUNNER_LOCK_KEY})
+        except Exception:
+            # Không unlock được: bỏ connection khỏi pool (đóng hẳn -> khóa tự nhả)
+            self._lock_conn.invalidate()
+        finally:
+            self._lock_conn.close()
+            self._lock_conn = None
+
+    def wake(self):
+        """Gọi sau commit job mới: lấy job ngay, không chờ hết poll_seconds"""
+        self._wake.set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: process con không kế thừa connection pool / thread của process cha
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _collect(self):
+        """
+        Bỏ job đã xong khỏi danh sách; process con lỗi -> ghi failed thay nó.
+        Rebuild rollup kết thúc (kể cả hủy / lỗi giữa chừng: user đã xong đã commit)
+        -> cache báo cáo của các user đó hết hiệu lực
+        """
+        failed = {}
+        rebuilt = []
+        for job_id, (future, kind, params) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[job_id]
+            if kind == "rebuild_reports":
+                rebuilt.append(params)
+            error = future.exception()
+            if error is None:
+                continue
+            if isinstance(error, BrokenProcessPool) and self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            failed[job_id] = f"Worker process lỗi: {type(error).__name__}: {error}"
+
+        if failed:
+            db = SessionLocal()
+            try:
+                for job_id, error in failed.items():
+                    job_repository.finish(db, job_id, "failed", error=error)
+                db.commit()
+            finally:
+                db.close()
+
+        if rebuilt:
+            self._after_rebuild(rebuilt)
+
+    def _after_rebuild(self, rebuilt):
+        """Đổi version cache báo cáo (ETag / 304) + đánh dấu analytics cho user đã rebuild"""
+        user_ids = {params["user_id"] for params in rebuilt if params.get("user_id") is not None}
+        if any(params.get("user_id") is None for params in rebuilt):
+            db = SessionLocal()
+            try:
+                user_ids.update(db.scalars(select(User.id)).all())
+            finally:
+                db.close()
+        for user_id in user_ids:
+            report_cache.bump_version(user_id)
+            analytics_engine.mark_dirty(user_id)
+
+    def _maintain(self, db):
+        stale = job_repository.fail_stale(db, self.stale_seconds)
+        if stale:
+            logger.warning("Marked %d stale jobs as failed", stale)
+        expired = job_repository.list_expired(db, self.result_ttl_hours)
+        for job in expired:
+            if job.result_path and os.path.exists(job.result_path):
+                os.remove(job.result_path)
+        job_repository.delete_many(db, [job.id for job in expired])
+
+    def run_once(self) -> int:
+        """1 vòng của runner, trả về số job vừa bắt đầu"""
+        self._collect()
+
+        # Runner exclusive không giữ khóa: chỉ heartbeat job còn đang chạy (nếu vừa mất khóa)
+        self._leader = self._holds_lock()
+
+        db = SessionLocal()
+        try:
+            job_repository.heartbeat(db, list(self._running))
+            if not self._leader:
+                db.commit()
+                return 0
+            if time.monotonic() - self._maintained_at >= MAINTENANCE_INTERVAL_SECONDS:
+                self._maintain(db)
+                self._maintained_at = time.monotonic()
+
+            free = self.workers - len(self._running)
+            claimed = job_repository.claim(db, self.worker_id, free) if free > 0 else []
+            jobs = [
+                (job.id, job.kind, json.loads(job.params))
+                for job in db.query(Job).filter(Job.id.in_(claimed)).order_by(Job.id)
+            ] if claimed else []
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for job_id, kind, params in jobs:
+            try:
+                future = self._get_executor().submit(run_job, job_id, kind, params)
+            except BrokenProcessPool:
+                self._executor = None
+                future = self._get_executor().submit(run_job, job_id, kind, params)
+            future.add_done_callback(lambda _: self._wake.set())
+            self._running[job_id] = (future, kind, params)
+        return len(jobs)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                started = self.run_once()
+                if started:
+                    logger.info("Started %d jobs (%d running)", started, len(self._running))
+            except Exception:
+                logger.exception("Job runner failed")
+            self._wake.wait(self.poll_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "worker": self.worker_id,
+            "workers": self.workers,
+            "exclusive": self.exclusive,
+            "leader": self._leader,
+            "running": sorted(self._running),
+        }
+
+
+# Runner embedded (JOB_RUNNER=embedded): mỗi worker uvicorn có 1 bản, chỉ bản giữ khóa chạy job
+job_runner = JobRunner(
+    workers=settings.JOB_WORKERS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    stale_seconds=settings.JOB_STALE_SECONDS,
+    result_ttl_hours=settings.JOB_RESULT_TTL_HOURS,
+    exclusive=True,
+)
@@ -0,0 +1,46 @@
+import threading
+from bisect import bisect_left
+from typing import Sequence
+
+# Bucket mặc định (ms)
+DEFAULT_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """
+    Histogram đơn giản kiểu Prometheus (bucket cộng dồn "le").
+    Thread-safe, dùng cho latency tính bằng ms.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self.count
+            return {
+                "count": self.count,
+                "sum": round(self.total, 3),
+                "avg": round(self.total / self.count, 3) if self.count else 0.0,
+                "max": round(self.max, 3),
+                "buckets": buckets,
+            }
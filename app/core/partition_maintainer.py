@@ -0,0 +1,65 @@
+import logging
+import threading
+from typing import List, Optional
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.database.partition_repository import partition_repository
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionMaintainer:
+    """
+    Job nền: tạo trước partition time_entries cho tháng hiện tại + months_ahead tháng tới,
+    để INSERT không bao giờ gặp tháng chưa có partition.
+    Chạy ngay khi start rồi lặp lại mỗi interval_seconds. DB chưa partition -> không làm gì.
+    """
+
+    def __init__(self, interval_seconds: int, months_ahead: int):
+        self.interval_seconds = interval_seconds
+        self.months_ahead = months_ahead
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self.interval_seconds <= 0:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def run_once(self) -> List[str]:
+        """Tạo partition còn thiếu, trả về tên đã tạo"""
+        db = SessionLocal()
+        try:
+            created = partition_repository.ensure_future(db, self.months_ahead)
+            db.commit()
+            return created
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while True:
+            try:
+                created = self.run_once()
+                if created:
+                    logger.info("Created time_entries partitions: %s", ", ".join(created))
+            except Exception:
+                logger.exception("Partition maintainer failed")
+            if self._stopped.wait(self.interval_seconds):
+                return
+
+
+partition_maintainer = PartitionMaintainer(
+    interval_seconds=settings.TIME_ENTRY_PARTITION_CHECK_SECONDS,
+    months_ahead=settings.TIME_ENTRY_PARTITIONS_AHEAD,
+)
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.deps import CurrentUser, get_db, get_current_user, optional_current_user
+from app.database.models import Board
+
+
+@dataclass(frozen=True)
+class BoardAccess:
+    """Những gì cần để quyết định quyền trên 1 board (không phụ thuộc user)"""
+    id: int
+    owner_id: Optional[int]
+    is_public: bool
+
+    @classmethod
+    def from_board(cls, board) -> "BoardAccess":
+        return cls(id=board.id, owner_id=board.owner_id, is_public=bool(board.is_public))
+
+
+# board_id -> BoardAccess, dùng chung giữa các request
+# Worker khác sửa board -> stale tối đa BOARD_CACHE_TTL_SECONDS
+board_access_cache = TTLCache(
+    max_size=settings.BOARD_CACHE_MAX_SIZE,
+    ttl_seconds=settings.BOARD_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_board(board_id: int):
+    """Gọi sau khi board bị sửa (owner / is_public) hoặc bị xóa"""
+    board_access_cache.invalidate(board_id)
+
+
+class BoardPermissions:
+    """
+    Quyền của 1 user trên các board, sống trong 1 request.
+    Mỗi board chỉ được resolve 1 lần: memo trong request -> cache chung -> 1 query cho cả batch.
+    Luật:
+    - admin: mọi quyền
+    - owner: mọi quyền
+    - board public: chỉ read (kể cả chưa đăng nhập)
+    """
+
+    def __init__(self, db: Session, user: Optional[CurrentUser]):
+        self.db = db
+        self.user = user
+        self._boards: Dict[int, Optional[BoardAccess]] = {}
+
+    def remember(self, board):
+        """Đã load Board ở route -> dùng luôn, không query lại"""
+        access = BoardAccess.from_board(board)
+        self._boards[board.id] = access
+        board_access_cache.set(board.id, access)
+
+    def load(self, board_ids: Iterable[int]) -> Dict[int, Optional[BoardAccess]]:
+        """Batch: các board chưa có trong memo / cache được lấy trong 1 query"""
+        ids = set(board_ids)
+        missing = []
+        for board_id in ids - set(self._boards):
+            access = board_access_cache.get(board_id)
+            if access is None:
+                missing.append(board_id)
+            else:
+                self._boards[board_id] = access
+
+        if missing:
+            rows = self.db.execute(
+                select(Board.id, Board.owner_id, Board.is_public).where(Board.id.in_(missing))
+            ).all()
+            for row in rows:
+                access = BoardAccess.from_board(row)
+                self._boards[row.id] = access
+                board_access_cache.set(row.id, access)
+            for board_id in missing:
+                # Board không tồn tại: chỉ nhớ trong request
+                self._boards.setdefault(board_id, None)
+
+        return {board_id: self._boards[board_id] for board_id in ids}
+
+    def _allowed(self, access: BoardAccess, action: str) -> bool:
+        if self.user is not None and (self.user.role == "admin" or access.owner_id == self.user.id):
+            return True
+        return access.is_public and action == "read"
+
+    def exists(self, board_id: int) -> bool:
+        return self.load([board_id])[board_id] is not None
+
+    def can(self, board_id: int, action: str = "read") -> bool:
+        access = self.load([board_id])[board_id]
+        return access is not None and self._allowed(access, action)
+
+    def can_many(self, board_ids: Iterable[int], action: str = "read") -> Dict[int, bool]:
+        """board_id -> có quyền không (board không tồn tại -> False)"""
+        return {
+            board_id: access is not None and self._allowed(access, action)
+            for board_id, access in self.load(board_ids).items()
+        }
+
+    def require(self, board_id: int, action: str = "read", detail: str = "Không có quyền truy cập board này"):
+        """404 nếu board không tồn tại, 403 nếu không có quyền"""
+        self.require_many([board_id], action, detail)
+
+    def require_many(self, board_ids: Iterable[int], action: str = "read", detail: str = "Không có quyền truy cập board này"):
+        for board_id, access in sorted(self.load(board_ids).items()):
+            if access is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Board không tồn tại"
+                )
+            if not self._allowed(access, action):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=detail
+                )
+
+
+def get_board_permissions(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> BoardPermissions:
+    """Dependency: FastAPI cache theo request nên mọi chỗ trong 1 request dùng chung 1 instance"""
+    return BoardPermissions(db, current_user)
+
+
+def get_board_permissions_optional(
+    current_user: Optional[CurrentUser] = Depends(optional_current_user),
+    db: Session = Depends(get_db)
+) -> BoardPermissions:
+    """Như get_board_permissions nhưng cho phép chưa đăng nhập (chỉ board public)"""
+    return BoardPermissions(db, current_user)
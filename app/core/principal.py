@@ -0,0 +1,117 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.database.models import User
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """
+    Bản chụp bất biến của user đang đăng nhập (không gắn với Session).
+    Không chứa password_hash. Cần ghi -> load lại User từ DB.
+    """
+    id: int
+    username: str
+    email: Optional[str]
+    full_name: Optional[str]
+    role: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            role=user.role,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """
+    User đã xác thực, dựng hoàn toàn từ claims của access token (role, active): không query DB.
+    Đủ cho phân quyền (id, role). Cần username / email... -> load_user_snapshot(db, id).
+    """
+    id: int
+    role: str
+    is_active: bool
+
+
+# user_id -> UserSnapshot
+# Staleness giữa các worker bị chặn bởi USER_CACHE_TTL_SECONDS
+user_cache = TTLCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+
+
+def invalidate_user(user_id: int):
+    """Gọi sau khi user bị sửa / khóa / xóa"""
+    user_cache.invalidate(user_id)
+
+
+class RevocationList:
+    """
+    Danh sách thu hồi access token trong process, che khoảng trống của token stateless:
+    - theo user: token cấp trước thời điểm thu hồi (iat_us < revoked_at, micro giây) bị từ chối
+      (đổi mật khẩu, khóa tài khoản, đổi role, xóa user). Token cũ không có iat_us: so theo iat (giây)
+    - theo jti: 1 token cụ thể (logout)
+    Mỗi mục chỉ cần sống bằng thời hạn access token, sau đó token cũ đã tự hết hạn.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int = 10000):
+        self._users = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._tokens = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def revoke_user(self, user_id: int, revoked_at: Optional[float] = None):
+        """revoked_at (epoch giây): lấy trước khi cấp token thay thế, mặc định là bây giờ"""
+        revoked_us = int((revoked_at if revoked_at is not None else time.time()) * 1_000_000)
+        current = self._users.get(user_id)
+        self._users.set(user_id, max(revoked_us, current or 0))
+
+    def revoke_token(self, jti: str, expires_at: float):
+        ttl = expires_at - time.time()
+        if ttl > 0:
+            self._tokens.set(jti, True, ttl_seconds=ttl)
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if jti is not None and self._tokens.get(jti):
+            return True
+
+        try:
+            revoked_at = self._users.get(int(claims["sub"]))
+        except (KeyError, TypeError, ValueError):
+            return False
+        if revoked_at is None:
+            return False
+        issued_us = claims.get("iat_us")
+        if issued_us is None:
+            issued_us = claims.get("iat", 0) * 1_000_000
+        return issued_us < revoked_at
+
+
+revocation_list = RevocationList(
+    ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    max_size=settings.REVOCATION_LIST_MAX_SIZE,
+)
+
+
+def revoke_user_tokens(user_id: int, revoked_at: Optional[float] = None):
+    """
+    Access token đang lưu hành của user hết hiệu lực ngay (ở worker này) + xóa cache user.
+    revoked_at: thời điểm lấy trước khi cấp token mới cho chính user (đổi mật khẩu)
+    """
+    revocation_list.revoke_user(user_id, revoked_at)
+    invalidate_user(user_id)
@@ -0,0 +1,253 @@
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Bucket cho số query / request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 20, 30, 50, 100)
+
+# Số query tối đa cho mỗi route ("METHOD path template"), đo với cache user / board nguội.
+# Vượt budget -> log warning + đếm ở /health/queries; DB_QUERY_BUDGET_STRICT=True -> trả 500
+# (dùng khi chạy scripts/queries_per_endpoint.py --check-budgets hoặc test).
+# Ghi đè / bổ sung qua DB_QUERY_BUDGETS (JSON trong .env).
+QUERY_BUDGETS: Dict[str, int] = {
+    "GET /users/me": 1,
+    "PUT /users/me": 2,
+    "GET /boards/": 1,
+    "POST /boards/": 2,
+    "GET /boards/{board_id}": 3,
+    "PUT /boards/{board_id}": 4,
+    "DELETE /boards/{board_id}": 9,  # + xóa time entries, rebuild rollup (+3 mỗi user có entry)
+    "GET /tasks/": 2,
+    "POST /tasks/": 3,
+    "GET /tasks/{task_id}": 2,
+    "PUT /tasks/{task_id}": 3,
+    "DELETE /tasks/{task_id}": 8,  # + xóa time entries, rebuild rollup (+3 mỗi user có entry)
+    "PATCH /tasks/{task_id}/move": 6,  # + pg_advisory_xact_lock của board (Postgres)
+    "PATCH /tasks/{task_id}/assign": 4,
+    "PATCH /tasks/batch": 4,
+    "POST /time/start": 1,
+    "GET /time/running": 1,
+    "POST /time/switch": 6,  # + UPDATE tasks.total_seconds
+    "POST /time/stop": 5,  # + UPDATE tasks.total_seconds
+    "GET /reports/summary": 2,
+    "GET /reports/team": 1,  # 1 query GROUPING SETS, không phụ thuộc số user
+    "GET /reports/board/{board_id}": 2,
+    "POST /reports/jobs": 3,  # đếm job đang chạy + INSERT (+ quyền board), việc nặng ở JobRunner
+    "GET /reports/jobs/{job_id}": 1,
+    "POST /reports/jobs/{job_id}/cancel": 3,
+}
+QUERY_BUDGETS.update(settings.DB_QUERY_BUDGETS)
+
+
+class QueryProfile:
+    """Số query, tổng thời gian DB và các statement chậm nhất của 1 request"""
+
+    def __init__(self, top_n: int = 3):
+        self.top_n = top_n
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if len(self.slowest) < self.top_n or elapsed_ms > self.slowest[-1][0]:
+            self.slowest.append((elapsed_ms, _shorten(statement)))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self.top_n:]
+
+
+# Profile của request hiện tại. Route sync chạy trong threadpool (context được copy),
+# AsyncSession chạy trong greenlet của cùng task -> cùng thấy object này
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def setup_query_profiler(engine):
+    """
+    Đo mọi statement của engine (sync engine, hoặc async_engine.sync_engine):
+    cộng vào profile của request đang chạy + log statement chậm hơn DB_SLOW_QUERY_MS
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed_ms)
+
+        if settings.DB_SLOW_QUERY_MS and elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms): %s", elapsed_ms, _shorten(statement, 1000))
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Statement lỗi không tới after_cursor_execute -> bỏ mốc thời gian của nó
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+class RouteQueryStats:
+    def __init__(self, budget: Optional[int], top_n: int):
+        self.budget = budget
+        self.top_n = top_n
+        self.requests = 0
+        self.budget_exceeded = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_time_ms = Histogram()
+        self.slowest: List[Tuple[float, str]] = []
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "budget": self.budget,
+            "budget_exceeded": self.budget_exceeded,
+            "queries": self.queries.snapshot(),
+            "db_time_ms": self.db_time_ms.snapshot(),
+            "slowest": [
+                {"ms": round(ms, 3), "statement": statement}
+                for ms, statement in self.slowest
+            ],
+        }
+
+
+class QueryMetrics:
+    """Histogram số query / thời gian DB theo route, dùng chung giữa các request"""
+
+    def __init__(self, top_n: int = 3):
+        self.top_n = top_n
+        self._routes: Dict[str, RouteQueryStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route: str, profile: QueryProfile) -> bool:
+        """Ghi nhận 1 request, trả về True nếu vượt query budget của route"""
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteQueryStats(QUERY_BUDGETS.get(route), self.top_n)
+
+            stats.requests += 1
+            exceeded = stats.budget is not None and profile.count > stats.budget
+            if exceeded:
+                stats.budget_exceeded += 1
+
+            stats.slowest = sorted(stats.slowest + profile.slowest, key=lambda item: item[0], reverse=True)[:self.top_n]
+
+        stats.queries.observe(profile.count)
+        stats.db_time_ms.observe(profile.total_ms)
+        return exceeded
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = dict(self._routes)
+        return {route: stats.snapshot() for route, stats in sorted(routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+query_metrics = QueryMetrics(top_n=settings.DB_PROFILE_TOP_N)
+
+
+def _route_key(scope) -> Optional[str]:
+    # APIRoute.matches ghi route vào scope -> dùng path template (/tasks/{task_id}), không dùng path thật
+    route = scope.get("route")
+    path = getattr(route, "path_format", None)
+    if path is None:
+        return None
+    return f"{scope['method']} {path}"
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware: đo số query + thời gian DB của mỗi request, thêm header
+    - X-DB-Queries: số statement
+    - Server-Timing: db (tổng thời gian), db-slowest (statement chậm nhất)
+    và cộng vào query_metrics theo route (GET /health/queries).
+    Chỉ tính query chạy trước khi response bắt đầu gửi (StreamingResponse: phần stream không tính).
+    """
+
+    def __init__(self, app, strict: bool = False):
+        self.app = app
+        self.strict = strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(top_n=query_metrics.top_n)
+        token = _current_profile.set(profile)
+        rejected = False
+
+        async def send_wrapper(message):
+            nonlocal rejected
+            if message["type"] == "http.response.start":
+                route = _route_key(scope)
+                exceeded = route is not None and query_metrics.observe(route, profile)
+                if exceeded:
+                    logger.warning(
+                        "Query budget exceeded: %s ran %d queries (budget %d)",
+                        route, profile.count, QUERY_BUDGETS[route]
+                    )
+                    if self.strict:
+                        rejected = True
+                        await _send_budget_error(send, route, profile)
+                        return
+
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.count).encode()))
+                headers.append((b"server-timing", _server_timing(profile).encode()))
+                message = {**message, "headers": headers}
+            elif rejected:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+
+
+def _server_timing(profile: QueryProfile) -> str:
+    timing = f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries"'
+    if profile.slowest:
+        timing += f", db-slowest;dur={profile.slowest[0][0]:.1f}"
+    return timing
+
+
+async def _send_budget_error(send, route: str, profile: QueryProfile):
+    body = json.dumps({
+        "detail": f"Vượt query budget: {route} chạy {profile.count} query (budget {QUERY_BUDGETS[route]})",
+        "slowest": [statement for _, statement in profile.slowest],
+    }).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 500,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-db-queries", str(profile.count).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
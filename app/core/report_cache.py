@@ -0,0 +1,184 @@
+import hashlib
+import secrets
+import threading
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Trình duyệt luôn hỏi lại (If-None-Match) trước khi dùng bản đã lưu
+CACHE_CONTROL = "private, no-cache"
+
+
+# =========================
+# Backends
+# =========================
+
+class MemoryCacheBackend:
+    """
+    LRU + TTL trong process. Cùng chữ ký với tập con của redis-py mà ReportCache dùng
+    (get / set(ex=...) / delete, value là bytes) -> thay được bằng redis.Redis.
+    Nhiều worker: mỗi worker 1 bản, dữ liệu cũ tối đa TTL (version cũng hết hạn theo TTL).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        self._cache.set(key, value, ttl_seconds=ex)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        for key in keys:
+            self._cache.invalidate(key)
+        return len(keys)
+
+
+def create_cache_backend(backend: str = None):
+    backend = backend or settings.REPORT_CACHE_BACKEND
+    if backend == "memory":
+        return MemoryCacheBackend(
+            max_size=settings.REPORT_CACHE_MAX_SIZE,
+            ttl_seconds=settings.REPORT_CACHE_TTL_SECONDS,
+        )
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("REPORT_CACHE_BACKEND=redis nhưng chưa cài redis") from e
+        # Eviction LRU do Redis lo (maxmemory-policy allkeys-lru)
+        return redis.Redis.from_url(settings.REPORT_CACHE_REDIS_URL)
+    raise RuntimeError("REPORT_CACHE_BACKEND phải là memory hoặc redis")
+
+
+# =========================
+# Cache
+# =========================
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # So sánh yếu: bỏ tiền tố W/
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
+class ReportLookup:
+    """
+    Kết quả tra cache của 1 request báo cáo:
+    - response: 304 / bản đã cache (route trả về luôn, không query DB)
+    - store(data): serialize theo response_model, lưu cache, trả Response kèm ETag
+    """
+
+    def __init__(self, cache: "ReportCache", key: Optional[str], etag: Optional[str], response_model: Any):
+        self.cache = cache
+        self.key = key
+        self.etag = etag
+        self.response_model = response_model
+        self.response: Optional[Response] = None
+
+    def store(self, data: Any):
+        if self.key is None:
+            # Cache tắt: FastAPI serialize như bình thường
+            return data
+        adapter = TypeAdapter(self.response_model)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        self.cache.backend.set(self.key, body, ex=self.cache.ttl_seconds)
+        return self.cache.response(body, self.etag)
+
+
+class ReportCache:
+    """
+    Cache kết quả báo cáo theo (user, endpoint, tham số, version dữ liệu time của user).
+    Version đổi (bump_version) sau khi entry bị dừng / sửa / xóa / import commit:
+    key + ETag mới, bản cũ không còn được đọc và tự bị LRU / TTL đẩy ra.
+    Version là token ngẫu nhiên (không phải bộ đếm): bị evict rồi tạo lại cũng không trùng bản cũ.
+    """
+
+    def __init__(self, backend, ttl_seconds: int, prefix: str = "report:"):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}v:{user_id}"
+
+    def version(self, user_id: int) -> str:
+        value = self.backend.get(self._version_key(user_id))
+        if value is None:
+            return self.bump_version(user_id)
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    def bump_version(self, user_id: int) -> str:
+        """Gọi sau commit (on_commit): trước commit request khác có thể cache dữ liệu cũ dưới version mới"""
+        value = secrets.token_hex(6)
+        self.backend.set(self._version_key(user_id), value.encode(), ex=self.ttl_seconds)
+        return value
+
+    def _count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def response(self, body: bytes, etag: str) -> Response:
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+        )
+
+    def lookup(self, request: Request, user_id: int, endpoint: str, response_model: Any, **params) -> ReportLookup:
+        if not self.enabled:
+            return ReportLookup(self, None, None, response_model)
+
+        version = self.version(user_id)
+        query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        key = f"{self.prefix}{user_id}:{endpoint}:{query}:{version}"
+        etag = '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+        lookup = ReportLookup(self, key, etag, response_model)
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self._count("not_modified")
+            lookup.response = Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+            )
+            return lookup
+
+        body = self.backend.get(key)
+        if body is not None:
+            self._count("hits")
+            lookup.response = self.response(body, etag)
+        else:
+            self._count("misses")
+        return lookup
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses + self.not_modified
+            return {
+                "backend": type(self.backend).__name__,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_ratio": (self.hits + self.not_modified) / total if total else 0.0,
+            }
+
+
+report_cache = ReportCache(create_cache_backend(), ttl_seconds=settings.REPORT_CACHE_TTL_SECONDS)
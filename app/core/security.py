@@ -1,29 +1,163 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import jwt
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.tokens import token_service
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+def build_password_context(
+    schemes: List[str],
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 3,
+    argon2_memory_cost: int = 65536,
+    argon2_parallelism: int = 1
+) -> CryptContext:
+    """
+    Scheme đầu tiên dùng để hash mật khẩu mới, các scheme sau chỉ để verify hash cũ.
+    Hash khác scheme đầu / khác cost cấu hình -> needs_update, được rehash khi login.
+    """
+    options = {}
+    for scheme in schemes:
+        if scheme in ("bcrypt", "bcrypt_sha256"):
+            # min = max = rounds: tăng hay giảm cost đều rehash dần khi user login
+            options[f"{scheme}__rounds"] = bcrypt_rounds
+            options[f"{scheme}__min_rounds"] = bcrypt_rounds
+            options[f"{scheme}__max_rounds"] = bcrypt_rounds
+        elif scheme == "argon2":
+            from passlib.hash import argon2
+            if not argon2.has_backend():
+                raise RuntimeError("PASSWORD_SCHEMES có argon2 nhưng chưa cài argon2-cffi")
+            options.update({
+                "argon2__rounds": argon2_time_cost,
+                "argon2__min_rounds": argon2_time_cost,
+                "argon2__memory_cost": argon2_memory_cost,
+                "argon2__parallelism": argon2_parallelism,
+            })
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
 
+
+pwd_context = build_password_context(
+    settings.PASSWORD_SCHEMES,
+    bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+)
+
+
+# Các hàm dưới chạy ngay trên thread gọi (script, seed data).
+# Trong request dùng password_pool để không chiếm threadpool / event loop.
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(đúng mật khẩu?, hash mới nếu hash cũ cần nâng scheme / cost)"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(subject: int, expires_delta: Optional[timedelta] = None) -> str:
+class PasswordHashPool:
+    """
+    Executor riêng cho hash / verify mật khẩu (CPU nặng, cố ý chậm).
+    - Tối đa `workers` phép tính cùng lúc: login burst không ăn hết CPU của route timer
+    - "thread": đủ cho bcrypt / argon2-cffi (nhả GIL khi hash); "process": scheme giữ GIL
+    - Quá `max_pending` việc đang chờ -> 503 ngay thay vì xếp hàng vô hạn
+    Executor tạo lazy (process pool fork sau khi app đã cấu hình xong).
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64, kind: str = "thread"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.kind = kind
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _done(self, future: Future):
+        with self._lock:
+            self.pending -= 1
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Hệ thống đang bận, vui lòng thử lại",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except Exception:
+                self.pending -= 1
+                raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn, *args):
+        """Dùng trong route async def: chờ kết quả mà không giữ thread nào"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def run_blocking(self, fn, *args):
+        """Dùng trong route sync (đang ở threadpool): vẫn giới hạn số phép hash đồng thời"""
+        return self.submit(fn, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+)
+
+
+def create_access_token(
+    subject: int,
+    expires_delta: Optional[timedelta] = None,
+    claims: Optional[dict] = None
+) -> str:
+    issued_at = time.time()
+    now = datetime.utcfromtimestamp(issued_at)
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
     to_encode = {
+        **(claims or {}),
         "exp": expire,
+        "iat": now,
+        # iat chuẩn chỉ tới giây: so với thời điểm thu hồi cần micro giây (RevocationList)
+        "iat_us": int(issued_at * 1_000_000),
+        "jti": uuid.uuid4().hex,
         "sub": str(subject)
     }
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return token_service.encode(to_encode)
+
+
+def access_token_claims(user) -> dict:
+    """Claims phân quyền: get_current_user dựng TokenPrincipal từ đây, không query DB"""
+    return {"role": user.role, "active": bool(user.is_active)}
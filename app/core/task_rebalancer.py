@@ -0,0 +1,70 @@
+import logging
+import threading
+from typing import Optional
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.database.task_repository import task_repository
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRebalancer:
+    """
+    Job nền: định kỳ tìm cột kanban có 2 card kề nhau cách < TASK_REBALANCE_MIN_GAP
+    và đánh lại position, để lần kéo thả sau vẫn chỉ ghi 1 dòng.
+    Mỗi cột rebalance trong 1 UPDATE + 1 transaction riêng, giữ khóa advisory của board
+    (Postgres) như move_task.
+    """
+
+    def __init__(self, interval_seconds: int, min_gap: int):
+        self.interval_seconds = interval_seconds
+        self.min_gap = min_gap
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self.interval_seconds <= 0:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="task-rebalancer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def run_once(self) -> int:
+        """Rebalance mọi cột đang chật, trả về số cột đã xử lý"""
+        db = SessionLocal()
+        try:
+            columns = task_repository.get_crowded_columns(db, self.min_gap)
+            db.rollback()
+            for board_id, status in columns:
+                try:
+                    # Khóa theo board + kiểm tra lại: nhiều worker uvicorn cùng chạy job này,
+                    # chỉ worker đầu tiên đánh lại cột, không chen giữa move_task
+                    task_repository.rebalance_column(db, board_id, status, min_gap=self.min_gap)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    logger.exception("Rebalance board %s / %s failed", board_id, status)
+            return len(columns)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_seconds):
+            try:
+                count = self.run_once()
+                if count:
+                    logger.info("Rebalanced %d kanban columns", count)
+            except Exception:
+                logger.exception("Task rebalancer failed")
+
+
+task_rebalancer = TaskRebalancer(
+    interval_seconds=settings.TASK_REBALANCE_INTERVAL_SECONDS,
+    min_gap=settings.TASK_REBALANCE_MIN_GAP,
+)
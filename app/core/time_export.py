@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+from datetime import date
+from typing import Callable, Iterator, Optional, TextIO, Tuple
+
+from app.core.config import settings
+from app.database.connection import SessionLocal
+from app.database.time_entry_repository import time_entry_repository
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "username",
+    "task_id",
+    "task_title",
+    "board_id",
+    "started_at",
+    "stopped_at",
+    "duration_seconds",
+    "note",
+]
+
+
+def _row_values(row) -> list:
+    mapping = row._mapping
+    return [
+        mapping[c].isoformat() if hasattr(mapping[c], "isoformat") else mapping[c]
+        for c in EXPORT_COLUMNS
+    ]
+
+
+def _iter_export_batches(
+    fmt: str,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    user_id: Optional[int],
+    board_id: Optional[int]
+) -> Iterator[Tuple[str, int]]:
+    """(nội dung, số dòng) theo từng batch; tự mở / đóng session riêng"""
+    batch_size = settings.EXPORT_BATCH_SIZE
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+
+    db = SessionLocal()
+    try:
+        pending = 0
+        for row in time_entry_repository.stream_export(
+            db,
+            start_date=start_date,
+            end_date=end_date,
+            user_id=user_id,
+            board_id=board_id,
+            batch_size=batch_size
+        ):
+            values = _row_values(row)
+            if writer:
+                writer.writerow(["" if v is None else v for v in values])
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values)), ensure_ascii=False))
+                buffer.write("\n")
+
+            pending += 1
+            if pending >= batch_size:
+                yield buffer.getvalue(), pending
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        if buffer.tell():
+            yield buffer.getvalue(), pending
+    finally:
+        db.close()
+
+
+def iter_time_entries_export(
+    fmt: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user_id: Optional[int] = None,
+    board_id: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Sinh nội dung export theo từng batch (dùng cho StreamingResponse).
+    Tự mở session riêng: generator chạy sau khi route đã return,
+    không phụ thuộc vòng đời của session trong Depends(get_db).
+    Bộ nhớ phẳng: mỗi lần chỉ giữ 1 batch dòng + 1 buffer text.
+    """
+    for text, _ in _iter_export_batches(fmt, start_date, end_date, user_id, board_id):
+        yield text
+
+
+def write_time_entries_export(
+    fileobj: TextIO,
+    fmt: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    user_id: Optional[int] = None,
+    board_id: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """Ghi export ra file (job nền), gọi on_batch(số dòng đã ghi) sau mỗi batch, trả về tổng số dòng"""
+    written = 0
+    for text, rows in _iter_export_batches(fmt, start_date, end_date, user_id, board_id):
+        fileobj.write(text)
+        written += rows
+        if on_batch:
+            on_batch(written)
+    return written
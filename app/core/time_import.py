@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.analytics_engine import analytics_engine
+from app.core.config import settings
+from app.core.report_cache import report_cache
+from app.database.models import Task, User
+from app.database.partition_repository import month_start, partition_repository
+from app.database.time_entry_repository import time_entry_repository
+from app.database.report_repository import report_repository
+from app.database.task_repository import task_repository
+from app.schemas.time_entry import TimeEntryCreate
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+
+def _iter_raw_rows(fileobj: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Đọc từng dòng (không load cả file vào RAM)
+    Trả về (số dòng, dict thô, lỗi parse)
+    """
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Dòng 1 là header
+            yield reader.line_num, {k: (v if v != "" else None) for k, v in row.items()}, None
+        return
+
+    for line_num, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_num, None, f"JSON không hợp lệ: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield line_num, None, "Mỗi dòng phải là 1 JSON object"
+            continue
+        yield line_num, data, None
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _validate(raw: dict, current_user) -> Tuple[Optional[dict], Optional[str]]:
+    """Validate theo rules của schemas/time_entry.py, trả về dict theo cột của model"""
+    if raw.get("user_id") is None:
+        raw = {**raw, "user_id": current_user.id}
+
+    try:
+        entry = TimeEntryCreate(**raw)
+    except ValidationError as e:
+        first = e.errors()[0]
+        field = ".".join(str(p) for p in first.get("loc", ()))
+        return None, f"{field}: {first['msg']}" if field else first["msg"]
+
+    if entry.end_time is None:
+        return None, "end_time: bắt buộc khi import"
+
+    if current_user.role != "admin" and entry.user_id != current_user.id:
+        return None, "user_id: không có quyền import cho user khác"
+
+    # Cột timestamp không có timezone: lưu UTC (có offset -> đổi sang UTC), giống datetime.utcnow()
+    started_at, stopped_at = _naive_utc(entry.start_time), _naive_utc(entry.end_time)
+    now = datetime.utcnow()
+    if started_at < now - timedelta(days=settings.IMPORT_MAX_AGE_DAYS):
+        return None, f"start_time: cũ hơn {settings.IMPORT_MAX_AGE_DAYS} ngày"
+    if stopped_at > now:
+        return None, "end_time: không được ở tương lai"
+    if stopped_at - started_at > timedelta(days=settings.TIME_ENTRY_MAX_SPAN_DAYS):
+        return None, f"end_time: entry dài quá {settings.TIME_ENTRY_MAX_SPAN_DAYS} ngày"
+
+    return {
+        "task_id": entry.task_id,
+        "user_id": entry.user_id,
+        "started_at": started_at,
+        "stopped_at": stopped_at,
+        "duration_seconds": int((stopped_at - started_at).total_seconds()),
+        "note": entry.notes,
+    }, None
+
+
+def _flush_chunk(db: Session, chunk: List[Tuple[int, dict]], on_error) -> List[dict]:
+    """
+    Kiểm tra task/user tồn tại (1 query mỗi loại), ghi chunk, commit.
+    Cùng rule với POST /time/start: task chưa assign hoặc assign cho user của dòng
+    """
+    task_ids = {row["task_id"] for _, row in chunk}
+    user_ids = {row["user_id"] for _, row in chunk}
+    # task_id -> assigned_to
+    tasks = dict(db.execute(select(Task.id, Task.assigned_to).where(Task.id.in_(task_ids))).all())
+    existing_users = set(db.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+
+    valid = []
+    for line_num, row in chunk:
+        if row["task_id"] not in tasks:
+            on_error(line_num, f"task_id: task {row['task_id']} không tồn tại")
+        elif tasks[row["task_id"]] is not None and tasks[row["task_id"]] != row["user_id"]:
+            on_error(line_num, f"task_id: task {row['task_id']} không được assign cho user {row['user_id']}")
+        elif row["user_id"] not in existing_users:
+            on_error(line_num, f"user_id: user {row['user_id']} không tồn tại")
+        else:
+            valid.append(row)
+
+    try:
+        # Entry của tháng cũ chưa có partition (Postgres đã partition):
+        # chỉ tạo các tháng thực sự có entry, không lấp khoảng giữa
+        if valid and partition_repository.ensure_months(
+            db,
+            {month_start(row["started_at"]) for row in valid}
+        ):
+            db.commit()
+        time_entry_repository.bulk_insert(db, valid)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return valid
+
+
+def _refresh_aggregates(db: Session, touched: Dict[int, list], touched_tasks: Set[int]):
+    """Rebuild rollup theo ngày + tổng thời gian task cho các chunk đã commit"""
+    if not touched:
+        return
+    try:
+        for user_id, (start_day, end_day) in touched.items():
+            report_repository.rebuild(db, user_id=user_id, start_date=start_day, end_date=end_day)
+        if touched_tasks:
+            task_repository.repair_totals(db, task_ids=list(touched_tasks))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # Import tự commit: đổi version ngay, không chờ on_commit của request
+    for user_id in touched:
+        report_cache.bump_version(user_id)
+        analytics_engine.mark_dirty(user_id)
+
+
+def import_time_entries(db: Session, fileobj: BinaryIO, fmt: str, current_user) -> dict:
+    """
+    Import CSV/NDJSON theo chunk, mỗi chunk 1 transaction.
+    Cột: task_id, user_id (mặc định user hiện tại), start_time, end_time, notes
+    Sau cùng (kể cả khi chunk sau lỗi) rebuild rollup theo ngày cho các user/khoảng ngày
+    của các chunk đã commit và tính lại tổng thời gian của các task có entry mới.
+    """
+    started = time.perf_counter()
+    batch_size = settings.IMPORT_BATCH_SIZE
+    errors: List[dict] = []
+    failed = 0
+    imported = 0
+    chunk: List[Tuple[int, dict]] = []
+    # user_id -> [min ngày, max ngày] để rebuild rollup
+    touched: Dict[int, list] = defaultdict(lambda: [None, None])
+    # task có entry mới -> tính lại total_seconds / entry_count
+    touched_tasks: Set[int] = set()
+
+    def on_error(line_num: int, error: str):
+        # Chỉ giữ IMPORT_MAX_ERRORS lỗi đầu tiên, vẫn đếm đủ
+        nonlocal failed
+        failed += 1
+        if len(errors) < settings.IMPORT_MAX_ERRORS:
+            errors.append({"row": line_num, "error": error})
+
+    def flush():
+        nonlocal imported
+        for row in _flush_chunk(db, chunk, on_error):
+            span = touched[row["user_id"]]
+            start_day, end_day = row["started_at"].date(), row["stopped_at"].date()
+            span[0] = start_day if span[0] is None else min(span[0], start_day)
+            span[1] = end_day if span[1] is None else max(span[1], end_day)
+            touched_tasks.add(row["task_id"])
+            imported += 1
+        chunk.clear()
+
+    try:
+        for line_num, raw, parse_error in _iter_raw_rows(fileobj, fmt):
+            row, error = (None, parse_error) if parse_error else _validate(raw, current_user)
+            if error:
+                on_error(line_num, error)
+                continue
+
+            chunk.append((line_num, row))
+            if len(chunk) >= batch_size:
+                flush()
+
+        if chunk:
+            flush()
+    finally:
+        _refresh_aggregates(db, touched, touched_tasks)
+
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda e: e["row"])
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round((imported + failed) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
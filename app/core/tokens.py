@@ -0,0 +1,213 @@
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class InvalidTokenError(Exception):
+    """Token sai chữ ký / sai định dạng / hết hạn"""
+
+
+def _timestamp(value) -> int:
+    if isinstance(value, datetime):
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
+
+
+def _normalize_claims(claims: dict) -> dict:
+    # exp / nbf / iat dạng datetime -> NumericDate (giây UTC) như jose / PyJWT
+    return {
+        key: _timestamp(value) if key in ("exp", "nbf", "iat") else value
+        for key, value in claims.items()
+    }
+
+
+# =========================
+# Backends
+# =========================
+
+class JoseBackend:
+    """python-jose: hỗ trợ mọi thuật toán, chậm nhất (parse key + claims mỗi lần)"""
+
+    def __init__(self, secret_key: str, algorithm: str):
+        from jose import jwt, JWTError
+        self._jwt = jwt
+        self._error = JWTError
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(_normalize_claims(claims), self.secret_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except self._error as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class PyJWTBackend:
+    """PyJWT (pip install pyjwt), nhanh hơn python-jose"""
+
+    def __init__(self, secret_key: str, algorithm: str):
+        try:
+            import jwt
+        except ImportError as e:
+            raise RuntimeError("TOKEN_BACKEND=pyjwt nhưng chưa cài pyjwt") from e
+        self._jwt = jwt
+        self._error = jwt.InvalidTokenError
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return self._jwt.encode(_normalize_claims(claims), self.secret_key, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        try:
+            return self._jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+        except self._error as e:
+            raise InvalidTokenError(str(e)) from e
+
+
+class HmacBackend:
+    """
+    JWT HS256 / HS384 / HS512 tự cài bằng hmac + hashlib (không phụ thuộc thư viện JWT).
+    Chỉ nhận token có header alg đúng bằng ALGORITHM; kiểm tra exp / nbf.
+    Token tương thích với python-jose / PyJWT (đổi backend không làm mất phiên đăng nhập).
+    """
+
+    DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def __init__(self, secret_key: str, algorithm: str):
+        if algorithm not in self.DIGESTS:
+            raise RuntimeError(f"TOKEN_BACKEND=hmac chỉ hỗ trợ {', '.join(self.DIGESTS)}")
+        self.algorithm = algorithm
+        self._key = secret_key.encode()
+        self._digest = self.DIGESTS[algorithm]
+        self._header = self._b64encode(
+            json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode()
+        )
+
+    @staticmethod
+    def _b64encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+    @staticmethod
+    def _b64decode(data: str) -> bytes:
+        return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        return hmac.new(self._key, signing_input, self._digest).digest()
+
+    def encode(self, claims: dict) -> str:
+        payload = self._b64encode(
+            json.dumps(_normalize_claims(claims), separators=(",", ":"), default=str).encode()
+        )
+        signing_input = f"{self._header}.{payload}"
+        return f"{signing_input}.{self._b64encode(self._sign(signing_input.encode()))}"
+
+    def decode(self, token: str) -> dict:
+        try:
+            header_b64, payload_b64, signature_b64 = token.split(".")
+            header = json.loads(self._b64decode(header_b64))
+            signature = self._b64decode(signature_b64)
+        except (ValueError, TypeError) as e:
+            raise InvalidTokenError("Token sai định dạng") from e
+
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise InvalidTokenError("Thuật toán không hợp lệ")
+
+        expected = self._sign(f"{header_b64}.{payload_b64}".encode())
+        if not hmac.compare_digest(signature, expected):
+            raise InvalidTokenError("Chữ ký không hợp lệ")
+
+        try:
+            claims = json.loads(self._b64decode(payload_b64))
+        except ValueError as e:
+            raise InvalidTokenError("Payload sai định dạng") from e
+        if not isinstance(claims, dict):
+            raise InvalidTokenError("Payload sai định dạng")
+
+        now = time.time()
+        try:
+            if "exp" in claims and now >= float(claims["exp"]):
+                raise InvalidTokenError("Token đã hết hạn")
+            if "nbf" in claims and now < float(claims["nbf"]):
+                raise InvalidTokenError("Token chưa có hiệu lực")
+        except (TypeError, ValueError) as e:
+            raise InvalidTokenError("exp / nbf không hợp lệ") from e
+        return claims
+
+
+BACKENDS = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+    "hmac": HmacBackend,
+}
+
+
+# =========================
+# Service
+# =========================
+
+class TokenService:
+    """
+    Ký / xác thực JWT qua backend cấu hình (TOKEN_BACKEND).
+    Claims đã xác thực được cache theo sha256(token) tới lúc exp
+    (tối đa TOKEN_CACHE_TTL_SECONDS): request sau với cùng token không verify lại chữ ký.
+    Key cache là hash -> không giữ token gốc trong RAM.
+    """
+
+    def __init__(self, backend, cache: TTLCache):
+        self.backend = backend
+        self.cache = cache
+
+    def encode(self, claims: dict) -> str:
+        return self.backend.encode(claims)
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Claims nếu token hợp lệ, None nếu không"""
+        key = hashlib.sha256(token.encode()).digest()
+        claims = self.cache.get(key)
+        if claims is not None:
+            # Cache có thể giữ lâu hơn exp vài ms (TTL tính từ lúc set)
+            if "exp" not in claims or time.time() < float(claims["exp"]):
+                return claims
+            self.cache.invalidate(key)
+            return None
+
+        try:
+            claims = self.backend.decode(token)
+        except InvalidTokenError:
+            return None
+
+        if "exp" in claims:
+            ttl = float(claims["exp"]) - time.time()
+            if ttl > 0:
+                self.cache.set(key, claims, ttl_seconds=ttl)
+        else:
+            self.cache.set(key, claims)
+        return claims
+
+
+def create_token_service(backend: str = None) -> TokenService:
+    backend_class = BACKENDS.get(backend or settings.TOKEN_BACKEND)
+    if backend_class is None:
+        raise RuntimeError(f"TOKEN_BACKEND phải là 1 trong: {', '.join(BACKENDS)}")
+    return TokenService(
+        backend_class(settings.SECRET_KEY, settings.ALGORITHM),
+        TTLCache(
+            max_size=settings.TOKEN_CACHE_MAX_SIZE,
+            ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+        ),
+    )
+
+
+token_service = create_token_service()
@@ -0,0 +1,8 @@
+from app.database.user_repository import user_repository
+from app.database.board_repository import board_repository
+from app.database.task_repository import task_repository
+from app.database.time_entry_repository import time_entry_repository
+from app.database.report_repository import report_repository
+from app.database.refresh_token_repository import refresh_token_repository
+from app.database.partition_repository import partition_repository
+from app.database.job_repository import job_repository
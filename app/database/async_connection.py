@@ -0,0 +1,62 @@
+from functools import lru_cache
+
+from fastapi import Request
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import settings
+from app.core.profiler import setup_query_profiler
+from app.database.pool import setup_idle_pre_ping
+
+
+def get_async_database_url() -> str:
+    """
+    ASYNC_DATABASE_URL nếu có, nếu không đổi driver của DATABASE_URL sang asyncpg
+    postgresql+psycopg2://... -> postgresql+asyncpg://...
+    """
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+
+    url = settings.DATABASE_URL
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# Tạo lazy: chỉ cần driver async (asyncpg) khi bật DB_ASYNC
+@lru_cache
+def get_async_engine():
+    engine = create_async_engine(
+        get_async_database_url(),
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_PRE_PING == "always",
+    )
+    if settings.DB_PRE_PING == "idle":
+        # Event pool đăng ký trên sync_engine, cursor của driver async chạy qua greenlet
+        setup_idle_pre_ping(engine.sync_engine, settings.DB_PRE_PING_IDLE_SECONDS)
+    if settings.DB_PROFILER_ENABLED:
+        setup_query_profiler(engine.sync_engine)
+    return engine
+
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        autoflush=False,
+        expire_on_commit=False,
+        class_=AsyncSession,
+    )
+
+
+# Dependency để lấy async session
+async def get_async_db(request: Request):
+    # Commit / rollback do UnitOfWorkRoute thực hiện
+    async with get_async_sessionmaker()() as db:
+        request.state.async_db = db
+        yield db
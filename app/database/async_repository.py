@@ -0,0 +1,142 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+
+from app.database.models import User, Task, TimeEntry, StatusEnum
+from app.database.time_entry_repository import time_entry_repository
+from app.database.report_repository import report_repository
+
+# Bản async của các repository (dùng khi DB_ASYNC=True). Chỉ flush, commit do UnitOfWorkRoute.
+# Query phức tạp (rollup, aggregate) tái sử dụng code sync qua AsyncSession.run_sync:
+# chạy trên cùng connection async, không chiếm thread.
+# Ghi dữ liệu chỉ qua run_sync trên repository sync (position, rollup, tasks.total_seconds,
+# cascade ORM nằm ở đó), không tự INSERT / DELETE ở đây.
+
+# ====================
+# USER REPOSITORY
+# ====================
+class AsyncUserRepository:
+    async def get(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        return await db.get(User, user_id)
+
+    async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
+
+    async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
+        result = await db.execute(select(User).order_by(User.id).offset(skip).limit(limit))
+        return list(result.scalars())
+
+
+async_user_repository = AsyncUserRepository()
+
+
+# ====================
+# TASK REPOSITORY
+# ====================
+class AsyncTaskRepository:
+    async def get(self, db: AsyncSession, task_id: int) -> Optional[Task]:
+        return await db.get(Task, task_id)
+
+    async def get_multi(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Task]:
+        result = await db.execute(select(Task).order_by(Task.id).offset(skip).limit(limit))
+        return list(result.scalars())
+
+    async def get_by_board(self, db: AsyncSession, board_id: int) -> List[Task]:
+        result = await db.execute(
+            select(Task).where(Task.board_id == board_id).order_by(Task.position)
+        )
+        return list(result.scalars())
+
+    async def get_by_status(self, db: AsyncSession, board_id: int, status: StatusEnum) -> List[Task]:
+        result = await db.execute(
+            select(Task).where(Task.board_id == board_id, Task.status == status).order_by(Task.position)
+        )
+        return list(result.scalars())
+
+    async def get_by_assigned_user(self, db: AsyncSession, user_id: int) -> List[Task]:
+        result = await db.execute(select(Task).where(Task.assigned_to == user_id))
+        return list(result.scalars())
+
+
+async_task_repository = AsyncTaskRepository()
+
+
+# ====================
+# TIME ENTRY REPOSITORY
+# ====================
+class AsyncTimeEntryRepository:
+    async def get(self, db: AsyncSession, entry_id: int) -> Optional[TimeEntry]:
+        return await db.get(TimeEntry, entry_id)
+
+    async def get_by_task(self, db: AsyncSession, task_id: int) -> List[TimeEntry]:
+        result = await db.execute(
+            select(TimeEntry).where(TimeEntry.task_id == task_id).order_by(TimeEntry.started_at)
+        )
+        return list(result.scalars())
+
+    async def get_running_by_user(self, db: AsyncSession, user_id: int) -> Optional[TimeEntry]:
+        result = await db.execute(
+            select(TimeEntry).where(
+                TimeEntry.user_id == user_id,
+                TimeEntry.stopped_at.is_(None)
+            )
+        )
+        return result.scalars().first()
+
+    async def get_by_user_and_date(self, db: AsyncSession, user_id: int, report_date: date) -> List[TimeEntry]:
+        day_start = datetime.combine(report_date, time.min)
+        result = await db.execute(
+            select(TimeEntry).where(
+                TimeEntry.user_id == user_id,
+                TimeEntry.stopped_at.isnot(None),
+                TimeEntry.started_at >= day_start,
+                TimeEntry.started_at < day_start + timedelta(days=1)
+            ).order_by(TimeEntry.started_at)
+        )
+        return list(result.scalars())
+
+    async def get_group_by_task(self, db: AsyncSession, user_id: int, start_date: date, end_date: date) -> List[dict]:
+        return await db.run_sync(time_entry_repository.get_group_by_task, user_id, start_date, end_date)
+
+    async def start_atomic(self, db: AsyncSession, user_id: int, task_id: int, started_at: datetime, note: Optional[str] = None) -> Optional[TimeEntry]:
+        return await db.run_sync(time_entry_repository.start_atomic, user_id, task_id, started_at, note)
+
+    async def stop(self, db: AsyncSession, entry: TimeEntry, stopped_at: datetime) -> Optional[TimeEntry]:
+        """Dừng entry + cập nhật rollup trong cùng transaction (logic dùng chung bản sync)"""
+        return await db.run_sync(time_entry_repository.stop, entry, stopped_at)
+
+    async def switch(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        task_id: int,
+        switched_at: datetime,
+        note: Optional[str] = None
+    ) -> Tuple[Optional[TimeEntry], Optional[TimeEntry]]:
+        return await db.run_sync(time_entry_repository.switch, user_id, task_id, switched_at, note)
+
+    async def delete(self, db: AsyncSession, entry_id: int):
+        await db.run_sync(time_entry_repository.delete, entry_id)
+
+
+async_time_entry_repository = AsyncTimeEntryRepository()
+
+
+# ====================
+# REPORT REPOSITORY
+# ====================
+class AsyncReportRepository:
+    async def get_daily_totals(self, db: AsyncSession, user_id: int, start_date: date, end_date: date) -> List[dict]:
+        return await db.run_sync(report_repository.get_daily_totals, user_id, start_date, end_date)
+
+    async def statistics(self, db: AsyncSession, user_id: int, start_date: date, end_date: date) -> dict:
+        return await db.run_sync(report_repository.statistics, user_id, start_date, end_date)
+
+
+async_report_repository = AsyncReportRepository()
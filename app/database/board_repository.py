@@ -1,6 +1,7 @@
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database.models import Board
+from app.database.models import Board, Task, User
 
 class BoardRepository:
     def get(self, db: Session, board_id: int) -> Optional[Board]:
@@ -23,23 +24,74 @@ class BoardRepository:
     def get_public_boards(self, db: Session) -> List[Board]:
         return db.query(Board).filter(Board.is_public == True).all()
 
+    def get_summaries(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        public_only: bool = False,
+        skip: int = 0,
+        limit: int = 100
+    ):
+        """
+        Danh sách board dạng BoardResponse trong 1 query:
+        phân trang, COUNT(tasks), tổng thời gian và owner_name đều tính ở SQL
+        - user_id: chỉ board của user + public
+        - public_only: chỉ public boards
+        """
+        tasks_count = (
+            select(func.count(Task.id))
+            .where(Task.board_id == Board.id)
+            .correlate(Board)
+            .scalar_subquery()
+        )
+        # Cộng cột tasks.total_seconds, không đụng tới time_entries
+        total_seconds = (
+            select(func.coalesce(func.sum(Task.total_seconds), 0))
+            .where(Task.board_id == Board.id)
+            .correlate(Board)
+            .scalar_subquery()
+        )
+
+        query = (
+            select(
+                Board.id,
+                Board.name,
+                Board.description,
+                Board.is_public,
+                Board.owner_id,
+                Board.created_at,
+                Board.updated_at,
+                func.coalesce(User.full_name, User.username).label("owner_name"),
+                tasks_count.label("tasks_count"),
+                total_seconds.label("total_seconds"),
+            )
+            .outerjoin(User, User.id == Board.owner_id)
+        )
+
+        if public_only:
+            query = query.where(Board.is_public == True)
+        elif user_id is not None:
+            query = query.where(
+                (Board.owner_id == user_id) | (Board.is_public == True)
+            )
+
+        query = query.order_by(Board.id).offset(skip).limit(limit)
+        return db.execute(query).all()
+
     def create(self, db: Session, obj_in: dict) -> Board:
         board = Board(**obj_in)
         db.add(board)
-        db.commit()
-        db.refresh(board)
+        db.flush()
         return board
 
     def update(self, db: Session, db_obj: Board, obj_in: dict) -> Board:
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def delete(self, db: Session, id: int):
         db.query(Board).filter(Board.id == id).delete()
-        db.commit()
 
 
 # Singleton instance
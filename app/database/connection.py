@@ -1,14 +1,30 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.profiler import setup_query_profiler
+from app.database.pool import InstrumentedQueuePool, setup_idle_pre_ping
 
-# Tạo engine
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# Tạo engine (cấu hình pool trong app/core/config.py)
 engine = create_engine(
-    settings.DATABASE_URL,   # dùng đúng tên biến trong Settings
-    pool_pre_ping=True,
+    SQLALCHEMY_DATABASE_URL,   # dùng đúng tên biến trong Settings
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_PRE_PING == "always",
     future=True,  # SQLAlchemy 2.0 style
 )
 
+if settings.DB_PRE_PING == "idle":
+    setup_idle_pre_ping(engine, settings.DB_PRE_PING_IDLE_SECONDS)
+
+if settings.DB_PROFILER_ENABLED:
+    setup_query_profiler(engine)
+
 # Tạo SessionLocal class
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -17,10 +33,12 @@ SessionLocal = sessionmaker(
     future=True
 )
 
-# Dependency để lấy session
-def get_db():
+# Dependency để lấy session (dùng chung cho mọi router qua app.core.deps)
+# Commit / rollback do UnitOfWorkRoute (app/database/unit_of_work.py) thực hiện
+def get_db(request: Request):
     db = SessionLocal()
+    request.state.db = db
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
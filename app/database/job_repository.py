@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+from app.database.models import Job
+
+# Trạng thái chưa kết thúc (tính vào giới hạn job mỗi user)
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobRepository:
+    """
+    Hàng đợi job trên bảng jobs. Chuyển trạng thái bằng UPDATE có điều kiện trên status
+    (nhiều runner cùng lấy 1 job -> chỉ 1 runner thắng, như refresh token revoke).
+    Các hàm chỉ flush / execute, commit do caller.
+    """
+
+    def get(self, db: Session, job_id: int) -> Optional[Job]:
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    def create(self, db: Session, user_id: int, kind: str, params: dict) -> Job:
+        job = Job(user_id=user_id, kind=kind, params=json.dumps(params, default=str), status="queued")
+        db.add(job)
+        db.flush()
+        return job
+
+    def count_active(self, db: Session, user_id: int) -> int:
+        return db.execute(
+            select(func.count(Job.id)).where(Job.user_id == user_id, Job.status.in_(ACTIVE_STATUSES))
+        ).scalar_one()
+
+    def claim(self, db: Session, worker: str, limit: int) -> List[int]:
+        """Lấy tối đa limit job queued cũ nhất cho worker, trả về id đã lấy được"""
+        candidates = db.execute(
+            select(Job.id).where(Job.status == "queued").order_by(Job.id).limit(limit * 2)
+        ).scalars().all()
+        claimed = []
+        now = datetime.utcnow()
+        for job_id in candidates:
+            if len(claimed) >= limit:
+                break
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", worker=worker, started_at=now, heartbeat_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        return claimed
+
+    def heartbeat(self, db: Session, job_ids: List[int]):
+        if job_ids:
+            db.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status == "running")
+                .values(heartbeat_at=datetime.utcnow())
+            )
+
+    def report_progress(self, db: Session, job_id: int, processed: int, total: Optional[int]) -> bool:
+        """Ghi tiến độ, trả về True nếu job đã bị yêu cầu hủy"""
+        db.execute(
+            update(Job).where(Job.id == job_id).values(processed=processed, total=total)
+        )
+        return bool(db.execute(select(Job.cancel_requested).where(Job.id == job_id)).scalar())
+
+    def finish(
+        self,
+        db: Session,
+        job_id: int,
+        status: str,
+        result_path: Optional[str] = None,
+        result_bytes: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running")
+            .values(
+                status=status,
+                result_path=result_path,
+                result_bytes=result_bytes,
+                error=error,
+                finished_at=datetime.utcnow(),
+            )
+        )
+
+    def request_cancel(self, db: Session, job: Job) -> bool:
+        """
+        Job queued: hủy ngay. Job running: đặt cờ, worker dừng ở lần báo tiến độ sau.
+        False nếu job đã kết thúc
+        """
+        result = db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == "queued")
+            .values(status="cancelled", cancel_requested=True, finished_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == "running")
+                .values(cancel_requested=True)
+            )
+        return result.rowcount == 1
+
+    def fail_stale(self, db: Session, stale_seconds: int) -> int:
+        """Job running mà runner không còn heartbeat (process chết giữa chừng) -> failed"""
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+        result = db.execute(
+            update(Job)
+            .where(Job.status == "running", Job.heartbeat_at < cutoff)
+            .values(status="failed", error="Runner không còn phản hồi", finished_at=datetime.utcnow())
+        )
+        return result.rowcount
+
+    def list_expired(self, db: Session, ttl_hours: int) -> List[Job]:
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+        return db.query(Job).filter(
+            Job.status.in_(FINISHED_STATUSES),
+            Job.finished_at < cutoff
+        ).all()
+
+    def delete_many(self, db: Session, job_ids: List[int]) -> int:
+        if not job_ids:
+            return 0
+        return db.execute(delete(Job).where(Job.id.in_(job_ids))).rowcount
+
+
+# Singleton instance
+job_repository = JobRepository()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Text, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 import enum
@@ -60,6 +60,11 @@ class Board(Base):
 # ====================
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # get_by_board / get_by_status: lọc board (+ status), sắp theo position
+        Index("ix_tasks_board_status_position", "board_id", "status", "position"),
+        Index("ix_tasks_assigned_to", "assigned_to"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     board_id = Column(Integer, ForeignKey("boards.id"))
@@ -70,6 +75,10 @@ class Task(Base):
     position = Column(Integer, default=0)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     due_date = Column(DateTime, nullable=True)
+    # Tổng thời gian / số entry đã dừng, cộng dồn ở time_entry_repository
+    # (sửa lệch: scripts/repair_task_totals.py)
+    total_seconds = Column(Integer, nullable=False, default=0, server_default="0")
+    entry_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -82,6 +91,21 @@ class Task(Base):
 # ====================
 class TimeEntry(Base):
     __tablename__ = "time_entries"
+    # Postgres: partition theo tháng trên started_at (migration 0007, PK thực tế (id, started_at),
+    # unique index timer đang chạy nằm trên từng partition). Query theo khoảng thời gian
+    # nên luôn lọc started_at để planner bỏ qua partition cũ.
+    __table_args__ = (
+        # Mỗi user tối đa 1 timer đang chạy (partial unique index)
+        Index(
+            "uq_time_entries_running_user",
+            "user_id",
+            unique=True,
+            postgresql_where=text("stopped_at IS NULL"),
+            sqlite_where=text("stopped_at IS NULL"),
+        ),
+        Index("ix_time_entries_user_started", "user_id", "started_at"),
+        Index("ix_time_entries_task_started", "task_id", "started_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"))
@@ -99,6 +123,9 @@ class TimeEntry(Base):
 # ====================
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        UniqueConstraint("user_id", "report_date", name="uq_reports_user_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -107,4 +134,57 @@ class Report(Base):
     task_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+# ====================
+# REFRESH TOKEN
+# ====================
+class RefreshToken(Base):
+    """
+    Refresh token xoay vòng: mỗi lần /auth/refresh thu hồi token cũ, cấp token mới cùng family.
+    Chỉ lưu sha256 của token. Token đã thu hồi bị dùng lại -> thu hồi cả family.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(String(32), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
+
+    user = relationship("User")
+
+# ====================
+# JOB
+# ====================
+class Job(Base):
+    """
+    Việc nền (export dài, rebuild rollup) chạy ở process pool của JobRunner, không trong request.
+    status: queued -> running -> succeeded / failed / cancelled.
+    Runner giữ heartbeat_at cho job đang chạy; quá JOB_STALE_SECONDS (runner chết) -> failed.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    kind = Column(String(30), nullable=False)
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    status = Column(String(20), nullable=False, default="queued")
+    processed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)  # None = chưa biết
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    result_path = Column(String(255), nullable=True)
+    result_bytes = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    user = relationship("User")
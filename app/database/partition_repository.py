@@ -0,0 +1,137 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.models import TimeEntry
+
+# time_entries_y2026m10: partition tháng 10/2026 (migration 0007 đặt tên giống hệt)
+PARTITION_NAME = re.compile(r"^time_entries_y(\d{4})m(\d{2})$")
+# Khóa advisory: nhiều worker cùng tạo partition không đụng nhau
+PARTITION_LOCK_KEY = 7_250_001
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"time_entries_y{month.year}m{month.month:02d}"
+
+
+def overlapping(range_start: datetime, range_end: datetime) -> Tuple:
+    """
+    Điều kiện "entry giao với [range_start, range_end)" kèm cận dưới của started_at,
+    để planner chỉ quét vài partition thay vì toàn bộ lịch sử.
+    Entry dài hơn TIME_ENTRY_MAX_SPAN_DAYS bắt đầu trước cận dưới sẽ bị bỏ qua.
+    """
+    return (
+        TimeEntry.started_at >= range_start - timedelta(days=settings.TIME_ENTRY_MAX_SPAN_DAYS),
+        TimeEntry.started_at < range_end,
+        TimeEntry.stopped_at > range_start,
+    )
+
+
+class PartitionRepository:
+    """
+    Partition theo tháng của time_entries (RANGE trên started_at, chỉ Postgres).
+    DB chưa partition (SQLite, chưa chạy migration 0007) -> mọi hàm là no-op.
+    Không commit: DDL khóa bảng cha tới khi caller commit, nên commit ngay sau khi gọi.
+    """
+
+    def is_partitioned(self, db: Session) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('time_entries'))"
+        )).scalar())
+
+    def list(self, db: Session) -> List[dict]:
+        """Partition đang gắn vào time_entries: tên, tháng, số dòng ước lượng (reltuples)"""
+        if not self.is_partitioned(db):
+            return []
+        rows = db.execute(text(
+            "SELECT c.relname, c.reltuples::bigint AS estimated_rows "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'time_entries'::regclass ORDER BY c.relname"
+        ))
+        partitions = []
+        for name, estimated_rows in rows:
+            match = PARTITION_NAME.match(name)
+            if match:
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                partitions.append({"name": name, "month": month, "estimated_rows": max(estimated_rows, 0)})
+        return partitions
+
+    def ensure(self, db: Session, start: date, end: date) -> List[str]:
+        """Tạo partition còn thiếu cho các tháng từ start tới end (tính cả 2 đầu), trả về tên đã tạo"""
+        months = []
+        month = month_start(start)
+        while month <= month_start(end):
+            months.append(month)
+            month = add_months(month, 1)
+        return self.ensure_months(db, months)
+
+    def ensure_months(self, db: Session, months: Iterable[date]) -> List[str]:
+        """
+        Tạo partition còn thiếu cho đúng các tháng được truyền vào (không lấp khoảng giữa),
+        vd các tháng thực sự có entry trong 1 chunk import. Trả về tên đã tạo
+        """
+        if not self.is_partitioned(db):
+            return []
+        existing = {p["month"] for p in self.list(db)}
+        missing = sorted({month_start(month) for month in months} - existing)
+        if not missing:
+            return []
+
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        for month in missing:
+            name = partition_name(month)
+            db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF time_entries "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            # Unique index trên bảng cha bắt buộc chứa started_at -> chặn 2 timer chạy
+            # cùng lúc bằng partial unique index của từng partition
+            db.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{name}_running_user "
+                f"ON {name} (user_id) WHERE stopped_at IS NULL"
+            ))
+        return [partition_name(month) for month in missing]
+
+    def ensure_future(self, db: Session, months_ahead: Optional[int] = None) -> List[str]:
+        """Partition cho tháng hiện tại + months_ahead tháng tới"""
+        current = month_start(datetime.utcnow())
+        ahead = settings.TIME_ENTRY_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+        return self.ensure(db, current, add_months(current, ahead))
+
+    def detach(self, db: Session, name: str):
+        """Tách partition khỏi time_entries: thành bảng thường, query của app không còn thấy"""
+        self._check_name(name)
+        db.execute(text(f"ALTER TABLE time_entries DETACH PARTITION {name}"))
+
+    def archive(self, db: Session, name: str, fileobj: BinaryIO, drop: bool = True) -> None:
+        """Ghi partition đã detach ra CSV (COPY TO STDOUT), sau đó DROP TABLE"""
+        self._check_name(name)
+        dbapi_conn = db.connection().connection.driver_connection
+        with dbapi_conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", fileobj)
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+
+    @staticmethod
+    def _check_name(name: str):
+        # Tên partition ghép thẳng vào DDL
+        if not PARTITION_NAME.match(name):
+            raise ValueError(f"Tên partition không hợp lệ: {name}")
+
+
+# Singleton instance
+partition_repository = PartitionRepository()
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Số liệu checkout của connection pool (wait time, latency, timeout)"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.pings = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        # Toàn bộ checkout: chờ pool + tạo connection mới + pre-ping
+        self.checkout_latency_ms = Histogram()
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "pre_pings": self.pings,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "checkout_latency_ms": self.checkout_latency_ms.snapshot(),
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool đo thời gian chờ lấy connection và tổng thời gian checkout.
+    Metrics để ở module-level vì pool.recreate() không truyền kwargs tùy biến.
+    """
+
+    _local = threading.local()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with pool_metrics._lock:
+                pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.checkout_latency_ms.observe((time.perf_counter() - started) * 1000)
+            with pool_metrics._lock:
+                pool_metrics.checkouts += 1
+
+    def _do_get(self):
+        # _do_get gọi đệ quy chính nó -> chỉ đo ở lớp ngoài cùng
+        if getattr(self._local, "depth", 0):
+            return super()._do_get()
+
+        self._local.depth = 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self._local.depth = 0
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+
+def setup_idle_pre_ping(engine, idle_seconds: int):
+    """
+    Pre-ping "idle": chỉ ping connection đã nằm trong pool lâu hơn idle_seconds,
+    thay vì ping ở mọi checkout (pool_pre_ping=True tốn thêm 1 round trip mỗi request).
+    Connection chết -> DisconnectionError -> pool tự lấy connection khác.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is None or time.monotonic() - last_checkin < idle_seconds:
+            return
+
+        with pool_metrics._lock:
+            pool_metrics.pings += 1
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            logger.warning("Idle connection failed pre-ping, reconnecting")
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+        })
+    return status
@@ -0,0 +1,74 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database.models import RefreshToken
+
+
+def hash_refresh_token(raw_token: str) -> str:
+    return hashlib.sha256(raw_token.encode()).hexdigest()
+
+
+class RefreshTokenRepository:
+    """Chỉ flush, commit do UnitOfWorkRoute"""
+
+    def get_by_token(self, db: Session, raw_token: str) -> Optional[RefreshToken]:
+        return db.query(RefreshToken).filter(
+            RefreshToken.token_hash == hash_refresh_token(raw_token)
+        ).first()
+
+    def issue(self, db: Session, user_id: int, family_id: Optional[str] = None) -> str:
+        """Tạo refresh token mới (family mới khi login), trả về token gốc (chỉ client giữ)"""
+        raw_token = secrets.token_urlsafe(32)
+        db.add(RefreshToken(
+            user_id=user_id,
+            token_hash=hash_refresh_token(raw_token),
+            family_id=family_id or uuid.uuid4().hex,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        ))
+        db.flush()
+        return raw_token
+
+    def revoke(self, db: Session, token_id: int) -> bool:
+        """
+        Thu hồi có điều kiện (revoked_at IS NULL): False nếu token đã bị dùng / thu hồi,
+        kể cả khi 2 request refresh cùng token chạy song song
+        """
+        result = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == token_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        return result.rowcount == 1
+
+    def revoke_family(self, db: Session, family_id: str) -> int:
+        result = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        return result.rowcount
+
+    def revoke_user(self, db: Session, user_id: int) -> int:
+        """Thu hồi mọi phiên của user (đổi mật khẩu, khóa tài khoản, đổi role)"""
+        result = db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
+        return result.rowcount
+
+    def delete_expired(self, db: Session, before: Optional[datetime] = None) -> int:
+        """Xóa token đã hết hạn (không còn cần để phát hiện dùng lại)"""
+        result = db.execute(
+            delete(RefreshToken).where(RefreshToken.expires_at < (before or datetime.utcnow()))
+        )
+        return result.rowcount
+
+
+# Singleton instance
+refresh_token_repository = RefreshTokenRepository()
@@ -0,0 +1,334 @@
+from sqlalchemy import Date, cast, delete, func, literal, null, select, text, tuple_, union_all
+from sqlalchemy.orm import Session, aliased
+from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+from app.core.config import settings
+from app.database.models import Board, Report, Task, TimeEntry, User
+from app.database.partition_repository import overlapping
+
+
+def split_by_day(started_at: datetime, stopped_at: datetime) -> List[Tuple[date, int]]:
+    """
+    Chia 1 time entry thành các đoạn theo ngày (cắt tại nửa đêm)
+    Trả về [(ngày, số giây trong ngày đó), ...]
+    """
+    segments = []
+    cursor = started_at
+    while cursor < stopped_at:
+        next_midnight = datetime.combine(cursor.date() + timedelta(days=1), time.min)
+        segment_end = min(next_midnight, stopped_at)
+        segments.append((cursor.date(), int((segment_end - cursor).total_seconds())))
+        cursor = segment_end
+    return segments
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+# Báo cáo team: các cột có thể group (thứ tự = thứ tự tham số của GROUPING())
+TEAM_KEYS = ("user_id", "board_id", "task_id", "day")
+# tên nhóm -> cột được group
+TEAM_GROUPING_SETS = {
+    "by_user": ("user_id",),
+    "by_task": ("board_id", "task_id"),
+    "by_board": ("board_id",),
+    "by_day": ("day",),
+    "by_user_day": ("user_id", "day"),
+    "total": (),
+}
+
+
+def _grouping_mask(columns: Tuple[str, ...]) -> int:
+    """Giá trị GROUPING(user_id, board_id, task_id, day) của 1 grouping set: bit = 1 nếu cột không được group"""
+    return sum(1 << (len(TEAM_KEYS) - 1 - i) for i, key in enumerate(TEAM_KEYS) if key not in columns)
+
+
+class ReportRepository:
+    """
+    Rollup theo ngày (user_id, report_date) cho time entries đã dừng.
+    Các hàm ghi chỉ flush, commit do caller quyết định
+    để rollup nằm cùng transaction với time entry.
+    """
+
+    def get_by_user_and_date(self, db: Session, user_id: int, report_date: date) -> Optional[Report]:
+        return db.query(Report).filter(
+            Report.user_id == user_id,
+            Report.report_date == _day_start(report_date)
+        ).first()
+
+    def get_range(self, db: Session, user_id: int, start_date: date, end_date: date) -> List[Report]:
+        return db.query(Report).filter(
+            Report.user_id == user_id,
+            Report.report_date >= _day_start(start_date),
+            Report.report_date <= _day_start(end_date)
+        ).order_by(Report.report_date).all()
+
+    def _task_seen_on_day(self, db: Session, entry: TimeEntry, day: date) -> bool:
+        """Task của entry đã có entry khác (đã dừng) giao với ngày này chưa"""
+        day_start = _day_start(day)
+        day_end = day_start + timedelta(days=1)
+        query = select(TimeEntry.id).where(
+            TimeEntry.user_id == entry.user_id,
+            TimeEntry.task_id == entry.task_id,
+            TimeEntry.id != entry.id,
+            TimeEntry.stopped_at.isnot(None),
+            *overlapping(day_start, day_end),
+        ).limit(1)
+        return db.execute(query).first() is not None
+
+    def _upsert(self, db: Session, user_id: int, day: date, seconds: int, tasks: int):
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+
+            stmt = insert(Report).values(
+                user_id=user_id,
+                report_date=_day_start(day),
+                total_seconds=seconds,
+                task_count=tasks,
+                created_at=datetime.utcnow(),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Report.user_id, Report.report_date],
+                set_={
+                    "total_seconds": Report.total_seconds + stmt.excluded.total_seconds,
+                    "task_count": Report.task_count + stmt.excluded.task_count,
+                }
+            )
+            db.execute(stmt)
+            return
+
+        report = db.query(Report).filter(
+            Report.user_id == user_id,
+            Report.report_date == _day_start(day)
+        ).with_for_update().first()
+        if report:
+            report.total_seconds += seconds
+            report.task_count += tasks
+        else:
+            db.add(Report(
+                user_id=user_id,
+                report_date=_day_start(day),
+                total_seconds=seconds,
+                task_count=tasks,
+            ))
+        db.flush()
+
+    def apply_entry(self, db: Session, entry: TimeEntry, sign: int = 1):
+        """
+        Cộng (sign=1) hoặc trừ (sign=-1) 1 entry đã dừng vào rollup.
+        Entry qua nửa đêm được chia cho từng ngày.
+        Không commit.
+        """
+        if entry.stopped_at is None:
+            return
+
+        for day, seconds in split_by_day(entry.started_at, entry.stopped_at):
+            new_task = 0 if self._task_seen_on_day(db, entry, day) else 1
+            self._upsert(db, entry.user_id, day, sign * seconds, sign * new_task)
+
+    def rebuild(
+        self,
+        db: Session,
+        user_id: Optional[int] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        batch_size: int = 1000
+    ) -> int:
+        """
+        Tính lại rollup từ time_entries (backfill / sửa lệch).
+        Xóa các report trong phạm vi rồi ghi lại. Không commit.
+        Trả về số report đã ghi.
+        """
+        range_start = _day_start(start_date) if start_date else None
+        range_end = _day_start(end_date) + timedelta(days=1) if end_date else None
+
+        cleanup = delete(Report)
+        query = select(
+            TimeEntry.user_id,
+            TimeEntry.task_id,
+            TimeEntry.started_at,
+            TimeEntry.stopped_at
+        ).where(TimeEntry.stopped_at.isnot(None))
+
+        if user_id is not None:
+            cleanup = cleanup.where(Report.user_id == user_id)
+            query = query.where(TimeEntry.user_id == user_id)
+        if range_start is not None:
+            cleanup = cleanup.where(Report.report_date >= range_start)
+            # Cận dưới started_at: chỉ quét các partition quanh phạm vi
+            query = query.where(
+                TimeEntry.stopped_at > range_start,
+                TimeEntry.started_at >= range_start - timedelta(days=settings.TIME_ENTRY_MAX_SPAN_DAYS)
+            )
+        if range_end is not None:
+            cleanup = cleanup.where(Report.report_date < range_end)
+            query = query.where(TimeEntry.started_at < range_end)
+
+        db.execute(cleanup)
+
+        totals: Dict[Tuple[int, date], int] = {}
+        tasks: Dict[Tuple[int, date], set] = {}
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for row in result:
+            for day, seconds in split_by_day(row.started_at, row.stopped_at):
+                day_start = _day_start(day)
+                if range_start is not None and day_start < range_start:
+                    continue
+                if range_end is not None and day_start >= range_end:
+                    continue
+                key = (row.user_id, day)
+                totals[key] = totals.get(key, 0) + seconds
+                tasks.setdefault(key, set()).add(row.task_id)
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": key[0],
+                "report_date": _day_start(key[1]),
+                "total_seconds": seconds,
+                "task_count": len(tasks[key]),
+                "created_at": now,
+            }
+            for key, seconds in totals.items()
+        ]
+        for i in range(0, len(rows), batch_size):
+            db.bulk_insert_mappings(Report, rows[i:i + batch_size])
+        db.flush()
+        return len(rows)
+
+    def get_daily_totals(self, db: Session, user_id: int, start_date: date, end_date: date) -> List[dict]:
+        """Tổng giây theo từng ngày trong khoảng (ngày không có dữ liệu = 0)"""
+        by_day = {
+            r.report_date.date(): r.total_seconds
+            for r in self.get_range(db, user_id, start_date, end_date)
+        }
+        days = []
+        day = start_date
+        while day <= end_date:
+            days.append({"date": day, "total_seconds": by_day.get(day, 0)})
+            day += timedelta(days=1)
+        return days
+
+    def statistics(self, db: Session, user_id: int, start_date: date, end_date: date) -> dict:
+        """
+        Tổng thời gian lấy từ rollup (O(số ngày)),
+        số task distinct đếm bằng 1 aggregate ở SQL
+        """
+        total_seconds = db.execute(
+            select(func.coalesce(func.sum(Report.total_seconds), 0)).where(
+                Report.user_id == user_id,
+                Report.report_date >= _day_start(start_date),
+                Report.report_date <= _day_start(end_date)
+            )
+        ).scalar_one()
+
+        range_start = _day_start(start_date)
+        range_end = _day_start(end_date) + timedelta(days=1)
+        task_count = db.execute(
+            select(func.count(func.distinct(TimeEntry.task_id))).where(
+                TimeEntry.user_id == user_id,
+                TimeEntry.stopped_at.isnot(None),
+                *overlapping(range_start, range_end)
+            )
+        ).scalar_one()
+
+        days = (end_date - start_date).days + 1
+        return {
+            "total_seconds": int(total_seconds),
+            "task_count": task_count,
+            "average_per_day": total_seconds / days if days > 0 else 0,
+        }
+
+    def team_rollup(
+        self,
+        db: Session,
+        start_date: date,
+        end_date: date,
+        board_id: Optional[int] = None
+    ) -> Dict[str, List[dict]]:
+        """
+        Tổng giây / số entry đã dừng (theo ngày bắt đầu) của mọi user trong khoảng,
+        cho tất cả TEAM_GROUPING_SETS trong 1 statement:
+        - Postgres: GROUP BY GROUPING SETS, GROUPING() cho biết dòng thuộc nhóm nào
+        - Dialect khác: UNION ALL các GROUP BY (cùng kết quả)
+        Tên user / task / board join sau khi đã aggregate (chỉ join số dòng kết quả).
+        Trả về {tên nhóm: [dòng]}
+        """
+        range_start = _day_start(start_date)
+        range_end = _day_start(end_date) + timedelta(days=1)
+        postgres = db.get_bind().dialect.name == "postgresql"
+
+        keys = {
+            "user_id": TimeEntry.user_id,
+            "board_id": Task.board_id,
+            "task_id": TimeEntry.task_id,
+            "day": cast(TimeEntry.started_at, Date) if postgres else func.date(TimeEntry.started_at),
+        }
+        measures = (
+            func.coalesce(func.sum(TimeEntry.duration_seconds), 0).label("total_seconds"),
+            func.count(TimeEntry.id).label("entry_count"),
+        )
+        conditions = [
+            TimeEntry.stopped_at.isnot(None),
+            TimeEntry.started_at >= range_start,
+            TimeEntry.started_at < range_end,
+        ]
+        if board_id is not None:
+            conditions.append(Task.board_id == board_id)
+
+        if postgres:
+            grouped = (
+                select(
+                    *(column.label(name) for name, column in keys.items()),
+                    *measures,
+                    func.grouping(*keys.values()).label("grouping_id"),
+                )
+                .join(Task, Task.id == TimeEntry.task_id)
+                .where(*conditions)
+                .group_by(func.grouping_sets(*(
+                    tuple_(*(keys[name] for name in columns)) if columns else text("()")
+                    for columns in TEAM_GROUPING_SETS.values()
+                )))
+            )
+        else:
+            grouped = union_all(*(
+                select(
+                    *((keys[name] if name in columns else null()).label(name) for name in TEAM_KEYS),
+                    *measures,
+                    literal(_grouping_mask(columns)).label("grouping_id"),
+                )
+                .join(Task, Task.id == TimeEntry.task_id)
+                .where(*conditions)
+                .group_by(*(keys[name] for name in columns))
+                for columns in TEAM_GROUPING_SETS.values()
+            ))
+
+        g = grouped.subquery("g")
+        task = aliased(Task)
+        query = (
+            select(
+                g,
+                func.coalesce(User.full_name, User.username).label("user_name"),
+                task.title.label("task_title"),
+                Board.name.label("board_name"),
+            )
+            .outerjoin(User, User.id == g.c.user_id)
+            .outerjoin(task, task.id == g.c.task_id)
+            .outerjoin(Board, Board.id == g.c.board_id)
+            .order_by(g.c.grouping_id, *(g.c[name] for name in TEAM_KEYS))
+        )
+
+        names = {_grouping_mask(columns): name for name, columns in TEAM_GROUPING_SETS.items()}
+        result: Dict[str, List[dict]] = {name: [] for name in TEAM_GROUPING_SETS}
+        for row in db.execute(query).mappings():
+            result[names[row["grouping_id"]]].append(dict(row))
+        return result
+
+
+# Singleton instance
+report_repository = ReportRepository()
@@ -1,6 +1,53 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import case, func, or_, select, text, tuple_, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database.models import Task, StatusEnum
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.database.models import Task, TimeEntry, StatusEnum, PriorityEnum
+
+# Khóa advisory theo board (Postgres): move_task và rebalance của cùng board chạy lần lượt,
+# position giữa 2 card không bị tính trên cột đang được đánh lại
+TASK_POSITION_LOCK_KEY = 7_250_002
+
+# sort -> (cột keyset, giảm dần?). Luôn kèm Task.id làm tie-breaker
+TASK_SORTS = {
+    "position": (Task.position, False),
+    "-position": (Task.position, True),
+    "updated_at": (Task.updated_at, False),
+    "-updated_at": (Task.updated_at, True),
+}
+
+
+def encode_cursor(sort: str, value, task_id: int) -> str:
+    """Cursor opaque: base64url(JSON [sort, giá trị cột sort, id])"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, task_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, int]:
+    """ValueError nếu cursor hỏng hoặc được tạo với sort khác"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, task_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor không hợp lệ")
+
+    if cursor_sort != sort:
+        raise ValueError("Cursor không khớp với sort")
+    try:
+        if sort.lstrip("-") == "updated_at":
+            value = datetime.fromisoformat(value)
+        else:
+            value = int(value)
+        return value, int(task_id)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor không hợp lệ")
+
 
 class TaskRepository:
     def get(self, db: Session, task_id: int) -> Optional[Task]:
@@ -18,40 +65,362 @@ class TaskRepository:
     def get_by_assigned_user(self, db: Session, user_id: int) -> List[Task]:
         return db.query(Task).filter(Task.assigned_to == user_id).all()
 
+    def build_query(
+        self,
+        board_id: Optional[int] = None,
+        statuses: Optional[Sequence[StatusEnum]] = None,
+        assigned_to: Optional[int] = None,
+        priorities: Optional[Sequence[PriorityEnum]] = None,
+        due_from: Optional[date] = None,
+        due_to: Optional[date] = None,
+        text: Optional[str] = None
+    ) -> Select:
+        """
+        Ghép các filter (AND) thành 1 SELECT, filter None thì bỏ qua
+        due_from / due_to: khoảng ngày, tính cả 2 đầu
+        """
+        query = select(Task)
+        if board_id is not None:
+            query = query.where(Task.board_id == board_id)
+        if statuses:
+            query = query.where(Task.status.in_(statuses))
+        if assigned_to is not None:
+            query = query.where(Task.assigned_to == assigned_to)
+        if priorities:
+            query = query.where(Task.priority.in_(priorities))
+        if due_from is not None:
+            query = query.where(Task.due_date >= datetime.combine(due_from, time.min))
+        if due_to is not None:
+            query = query.where(Task.due_date < datetime.combine(due_to, time.min) + timedelta(days=1))
+        if text:
+            query = query.where(or_(
+                Task.title.icontains(text, autoescape=True),
+                Task.description.icontains(text, autoescape=True)
+            ))
+        return query
+
+    def get_page(
+        self,
+        db: Session,
+        query: Select,
+        sort: str = "position",
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Task], Optional[str]]:
+        """
+        Keyset pagination trên (cột sort, id): WHERE (col, id) > (cursor) thay cho OFFSET,
+        chi phí mỗi trang không tăng theo độ sâu.
+        Trả về (tasks, cursor trang sau hoặc None)
+        """
+        column, descending = TASK_SORTS[sort]
+        if cursor:
+            value, last_id = decode_cursor(cursor, sort)
+            key = tuple_(column, Task.id)
+            query = query.where(key < tuple_(value, last_id) if descending else key > tuple_(value, last_id))
+
+        order = (column.desc(), Task.id.desc()) if descending else (column.asc(), Task.id.asc())
+        # Lấy dư 1 dòng để biết còn trang sau không
+        tasks = list(db.scalars(query.order_by(*order).limit(limit + 1)))
+
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+        return tasks, next_cursor
+
     def create(self, db: Session, obj_in: dict) -> Task:
         task = Task(**obj_in)
         db.add(task)
-        db.commit()
-        db.refresh(task)
+        db.flush()
         return task
 
     def update(self, db: Session, db_obj: Task, obj_in: dict) -> Task:
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def delete(self, db: Session, id: int):
         db.query(Task).filter(Task.id == id).delete()
-        db.commit()
 
-    def move_task(self, db: Session, task_id: int, new_status: StatusEnum, new_position: Optional[int] = None) -> Task:
+    def get_board_ids(self, db: Session, task_ids: Sequence[int]) -> Dict[int, int]:
+        """task_id -> board_id trong 1 query (task không tồn tại thì không có key)"""
+        return dict(db.execute(select(Task.id, Task.board_id).where(Task.id.in_(task_ids))).all())
+
+    # ====================
+    # Thời gian đã track (total_seconds, entry_count): cộng dồn khi entry
+    # dừng / sửa / xóa, listing đọc thẳng cột thay vì SUM(time_entries)
+    # ====================
+    def add_time(self, db: Session, task_id: int, seconds: int, count: int = 1):
+        """
+        Cộng (số âm = trừ) vào tổng của task bằng 1 UPDATE tương đối (an toàn khi
+        nhiều timer cùng dừng). Giữ nguyên updated_at: không phải user sửa task. Không commit
+        """
+        db.execute(
+            update(Task)
+            .where(Task.id == task_id)
+            .values(
+                total_seconds=Task.total_seconds + seconds,
+                entry_count=Task.entry_count + count,
+                updated_at=Task.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def repair_totals(self, db: Session, task_ids: Optional[Sequence[int]] = None) -> int:
+        """
+        Tính lại total_seconds / entry_count từ các entry đã dừng (sau import, sửa lệch).
+        Chỉ ghi task đang lệch. Không commit. Trả về số task đã sửa
+        """
+        stopped = (TimeEntry.task_id == Task.id, TimeEntry.stopped_at.isnot(None))
+        actual_seconds = (
+            select(func.coalesce(func.sum(TimeEntry.duration_seconds), 0))
+            .where(*stopped)
+            .correlate(Task)
+            .scalar_subquery()
+        )
+        actual_count = select(func.count(TimeEntry.id)).where(*stopped).correlate(Task).scalar_subquery()
+
+        stmt = (
+            update(Task)
+            .where(or_(Task.total_seconds != actual_seconds, Task.entry_count != actual_count))
+            .values(total_seconds=actual_seconds, entry_count=actual_count, updated_at=Task.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        if task_ids is not None:
+            stmt = stmt.where(Task.id.in_(task_ids))
+        return db.execute(stmt).rowcount
+
+    def batch_update(
+        self,
+        db: Session,
+        operations: List[Tuple[List[int], dict]],
+        board_ids: Dict[int, int]
+    ) -> List:
+        """
+        Áp nhiều thao tác [(task_ids, changes)] trong transaction của request,
+        mỗi thao tác 1 UPDATE ... WHERE id IN (...) RETURNING.
+        Đổi status: position = MAX(cột đích theo board) + gap * thứ tự, qua CASE.
+        board_ids: kết quả get_board_ids (caller đã dùng để kiểm tra quyền)
+        Trả về Row (cột của tasks), không cần load lại sau khi ghi. Không commit
+        """
+        returning = db.get_bind().dialect.update_returning
+        columns = list(Task.__table__.c)
+        changed: Dict[int, object] = {}
+
+        for task_ids, changes in operations:
+            values = dict(changes)
+            if not values:
+                continue
+            if "status" in values:
+                boards = {board_ids[i] for i in task_ids}
+                last = dict(db.execute(
+                    select(Task.board_id, func.max(Task.position))
+                    .where(Task.board_id.in_(boards), Task.status == values["status"])
+                    .group_by(Task.board_id)
+                ).all())
+                positions = {}
+                for task_id in task_ids:
+                    board_id = board_ids[task_id]
+                    last[board_id] = (last.get(board_id) or 0) + settings.TASK_POSITION_GAP
+                    positions[task_id] = last[board_id]
+                values["position"] = case(positions, value=Task.id)
+
+            stmt = (
+                update(Task)
+                .where(Task.id.in_(task_ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if returning:
+                for row in db.execute(stmt.returning(*columns)):
+                    changed[row.id] = row
+            else:
+                db.execute(stmt)
+
+        if not returning:
+            ids = list({i for task_ids, _ in operations for i in task_ids})
+            changed = {row.id: row for row in db.execute(select(*columns).where(Task.id.in_(ids)))}
+
+        return list(changed.values())
+
+    # ====================
+    # Thứ tự kanban: position thưa (cách nhau TASK_POSITION_GAP)
+    # Chèn giữa 2 card = lấy trung điểm, chỉ ghi 1 dòng.
+    # Hết khoảng trống -> rebalance cả cột (hiếm, thường do job nền làm trước)
+    # ====================
+
+    def append_position(self, db: Session, board_id: int, status: StatusEnum) -> int:
+        """Position cuối cột: MAX() + gap (không load cả cột)"""
+        last = db.execute(
+            select(func.max(Task.position)).where(Task.board_id == board_id, Task.status == status)
+        ).scalar()
+        return (last or 0) + settings.TASK_POSITION_GAP
+
+    def _column(self, board_id: int, status: StatusEnum, exclude_id: int):
+        return select(Task.position).where(
+            Task.board_id == board_id,
+            Task.status == status,
+            Task.id != exclude_id
+        )
+
+    def _neighbours(
+        self,
+        db: Session,
+        task: Task,
+        status: StatusEnum,
+        index: Optional[int],
+        after_id: Optional[int],
+        before_id: Optional[int]
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """
+        (position card phía trên, position card phía dưới) tại vị trí đích.
+        Ưu tiên after_id / before_id (id card kề), sau đó index (kiểu cũ), không có -> cuối cột
+        """
+        column = self._column(task.board_id, status, task.id)
+
+        if after_id is not None or before_id is not None:
+            if after_id is not None and after_id == before_id:
+                raise ValueError("after_id và before_id phải là 2 card khác nhau")
+            ids = [i for i in (after_id, before_id) if i is not None]
+            positions = dict(db.execute(
+                select(Task.id, Task.position).where(
+                    Task.id.in_(ids),
+                    Task.board_id == task.board_id,
+                    Task.status == status
+                )
+            ).all())
+            if any(i not in positions for i in ids):
+                raise ValueError("Card kề không nằm trong cột đích")
+
+            prev_pos = positions.get(after_id)
+            next_pos = positions.get(before_id)
+            if before_id is None:
+                next_pos = db.execute(
+                    column.where(Task.position > prev_pos).order_by(Task.position).limit(1)
+                ).scalar()
+            elif after_id is None:
+                prev_pos = db.execute(
+                    column.where(Task.position < next_pos).order_by(Task.position.desc()).limit(1)
+                ).scalar()
+            # Bằng nhau: có thể chỉ là position trùng, rebalance rồi kiểm tra lại ở move_task
+            elif prev_pos > next_pos:
+                raise ValueError("after_id phải nằm phía trên before_id")
+            return prev_pos, next_pos
+
+        if index is None:
+            return db.execute(column.with_only_columns(func.max(Task.position))).scalar(), None
+
+        index = max(index, 0)
+        rows = list(db.scalars(
+            column.order_by(Task.position, Task.id).offset(max(index - 1, 0)).limit(2 if index else 1)
+        ))
+        if index == 0:
+            return None, rows[0] if rows else None
+        return (rows[0] if rows else None), (rows[1] if len(rows) > 1 else None)
+
+    @staticmethod
+    def _lock_positions(db: Session, board_id: int):
+        """Khóa position của board tới hết transaction (SQLite: ghi vốn đã tuần tự)"""
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(:key, :board_id)"),
+                {"key": TASK_POSITION_LOCK_KEY, "board_id": board_id}
+            )
+
+    @staticmethod
+    def _between(prev_pos: Optional[int], next_pos: Optional[int]) -> Optional[int]:
+        """Position nằm giữa 2 card, None nếu hết khoảng trống"""
+        if next_pos is None:
+            return (prev_pos or 0) + settings.TASK_POSITION_GAP
+        low = prev_pos if prev_pos is not None else 0
+        if next_pos - low < 2:
+            return None
+        return (low + next_pos) // 2
+
+    def rebalance_column(self, db: Session, board_id: int, status: StatusEnum, min_gap: Optional[int] = None) -> int:
+        """
+        Đánh lại position của 1 cột thành 1*gap, 2*gap, ... (giữ nguyên thứ tự)
+        bằng 1 UPDATE ... FROM (window function). Không commit.
+        min_gap: chỉ đánh lại nếu (sau khi có khóa) cột vẫn còn chật
+        (worker khác vừa rebalance xong -> bỏ qua)
+        """
+        self._lock_positions(db, board_id)
+        if min_gap is not None and (board_id, status) not in self.get_crowded_columns(db, min_gap, board_id):
+            return 0
+        ranked = (
+            select(
+                Task.id.label("id"),
+                func.row_number().over(order_by=(Task.position, Task.id)).label("rank")
+            )
+            .where(Task.board_id == board_id, Task.status == status)
+            .subquery()
+        )
+        result = db.execute(
+            update(Task)
+            .where(Task.id == ranked.c.id)
+            # Giữ nguyên updated_at: không phải user sửa card (sort=-updated_at không bị xáo trộn)
+            .values(position=ranked.c.rank * settings.TASK_POSITION_GAP, updated_at=Task.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def get_crowded_columns(self, db: Session, min_gap: int, board_id: Optional[int] = None) -> List[Tuple[int, StatusEnum]]:
+        """Các cột (board_id, status) có 2 card kề nhau cách < min_gap"""
+        gaps = select(
+            Task.board_id,
+            Task.status,
+            (
+                Task.position
+                - func.lag(Task.position).over(
+                    partition_by=(Task.board_id, Task.status),
+                    order_by=(Task.position, Task.id)
+                )
+            ).label("gap")
+        )
+        if board_id is not None:
+            gaps = gaps.where(Task.board_id == board_id)
+        gaps = gaps.subquery()
+        query = (
+            select(gaps.c.board_id, gaps.c.status)
+            .where(gaps.c.gap < min_gap)
+            .group_by(gaps.c.board_id, gaps.c.status)
+        )
+        return [(row.board_id, row.status) for row in db.execute(query)]
+
+    def move_task(
+        self,
+        db: Session,
+        task_id: int,
+        new_status: StatusEnum,
+        new_position: Optional[int] = None,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None
+    ) -> Task:
+        """
+        Di chuyển task sang (status, vị trí) mới, chỉ UPDATE 1 dòng.
+        new_position: chỉ số (0 = đầu cột) như API cũ; after_id / before_id: card kề
+        """
         task = self.get(db, task_id)
         if not task:
             return None
 
-        # Nếu status thay đổi, lấy số lượng tasks hiện tại của status mới
-        if task.status != new_status:
-            task.status = new_status
-            tasks_in_new_status = db.query(Task).filter(Task.board_id == task.board_id, Task.status == new_status).order_by(Task.position).all()
-            task.position = new_position if new_position is not None else len(tasks_in_new_status)
-        else:
-            if new_position is not None:
-                task.position = new_position
+        self._lock_positions(db, task.board_id)
+        prev_pos, next_pos = self._neighbours(db, task, new_status, new_position, after_id, before_id)
+        position = self._between(prev_pos, next_pos)
+        if position is None:
+            self.rebalance_column(db, task.board_id, new_status)
+            db.expire(task)
+            prev_pos, next_pos = self._neighbours(db, task, new_status, new_position, after_id, before_id)
+            position = self._between(prev_pos, next_pos)
+            if position is None:
+                # Sau rebalance vẫn không có chỗ: after_id không nằm ngay trên before_id
+                raise ValueError("after_id phải nằm phía trên before_id")
 
-        db.commit()
-        db.refresh(task)
+        task.status = new_status
+        task.position = position
+        db.flush()
         return task
 
 
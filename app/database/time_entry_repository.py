@@ -1,7 +1,18 @@
+import csv
+import io
+from functools import partial
+from sqlalchemy import delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
-from app.database.models import TimeEntry
+from typing import Iterator, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+from app.core.analytics_engine import analytics_engine
+from app.core.config import settings
+from app.core.report_cache import report_cache
+from app.database.models import Board, Task, TimeEntry, User
+from app.database.report_repository import report_repository
+from app.database.task_repository import task_repository
+from app.database.unit_of_work import on_commit
 
 class TimeEntryRepository:
     def get(self, db: Session, entry_id: int) -> Optional[TimeEntry]:
@@ -11,33 +22,363 @@ class TimeEntryRepository:
         return db.query(TimeEntry).offset(skip).limit(limit).all()
 
     def get_by_task(self, db: Session, task_id: int) -> List[TimeEntry]:
-        return db.query(TimeEntry).filter(TimeEntry.task_id == task_id).order_by(TimeEntry.start_time).all()
+        return db.query(TimeEntry).filter(TimeEntry.task_id == task_id).order_by(TimeEntry.started_at).all()
 
     def get_by_user(self, db: Session, user_id: int, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[TimeEntry]:
         query = db.query(TimeEntry).filter(TimeEntry.user_id == user_id)
         if start_date:
-            query = query.filter(TimeEntry.start_time >= start_date)
+            query = query.filter(TimeEntry.started_at >= start_date)
         if end_date:
-            query = query.filter(TimeEntry.end_time <= end_date)
-        return query.order_by(TimeEntry.start_time).all()
+            # started_at <= stopped_at: điều kiện thừa về logic, để planner loại partition sau end_date
+            query = query.filter(TimeEntry.stopped_at <= end_date, TimeEntry.started_at <= end_date)
+        return query.order_by(TimeEntry.started_at).all()
+
+    def get_running_by_user(self, db: Session, user_id: int) -> Optional[TimeEntry]:
+        # Timer đang chạy không có cận thời gian: dò partial index (rất nhỏ) của từng partition
+        return db.query(TimeEntry).filter(
+            TimeEntry.user_id == user_id,
+            TimeEntry.stopped_at.is_(None)
+        ).first()
+
+    def get_by_user_and_date(self, db: Session, user_id: int, report_date: date) -> List[TimeEntry]:
+        """Các entry đã dừng, bắt đầu trong ngày report_date"""
+        day_start = datetime.combine(report_date, time.min)
+        return db.query(TimeEntry).filter(
+            TimeEntry.user_id == user_id,
+            TimeEntry.stopped_at.isnot(None),
+            TimeEntry.started_at >= day_start,
+            TimeEntry.started_at < day_start + timedelta(days=1)
+        ).order_by(TimeEntry.started_at).all()
+
+    def get_group_by_task(self, db: Session, user_id: int, start_date: date, end_date: date) -> List[dict]:
+        range_start = datetime.combine(start_date, time.min)
+        range_end = datetime.combine(end_date, time.min) + timedelta(days=1)
+        query = (
+            select(
+                TimeEntry.task_id,
+                Task.title.label("task_title"),
+                func.coalesce(func.sum(TimeEntry.duration_seconds), 0).label("total_seconds"),
+            )
+            .join(Task, Task.id == TimeEntry.task_id)
+            .where(
+                TimeEntry.user_id == user_id,
+                TimeEntry.stopped_at.isnot(None),
+                TimeEntry.started_at >= range_start,
+                TimeEntry.started_at < range_end
+            )
+            .group_by(TimeEntry.task_id, Task.title)
+            .order_by(TimeEntry.task_id)
+        )
+        return [dict(row._mapping) for row in db.execute(query)]
+
+    def _export_conditions(
+        self,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        user_id: Optional[int],
+        board_id: Optional[int]
+    ) -> list:
+        conditions = [TimeEntry.stopped_at.isnot(None)]
+        if start_date:
+            conditions.append(TimeEntry.started_at >= datetime.combine(start_date, time.min))
+        if end_date:
+            conditions.append(TimeEntry.started_at < datetime.combine(end_date, time.min) + timedelta(days=1))
+        if user_id is not None:
+            conditions.append(TimeEntry.user_id == user_id)
+        if board_id is not None:
+            conditions.append(Task.board_id == board_id)
+        return conditions
+
+    def count_export(
+        self,
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        user_id: Optional[int] = None,
+        board_id: Optional[int] = None
+    ) -> int:
+        """Số dòng stream_export sẽ trả về (tổng cho tiến độ của job export)"""
+        return db.execute(
+            select(func.count(TimeEntry.id))
+            .join(Task, Task.id == TimeEntry.task_id)
+            .where(*self._export_conditions(start_date, end_date, user_id, board_id))
+        ).scalar_one()
+
+    def stream_export(
+        self,
+        db: Session,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        user_id: Optional[int] = None,
+        board_id: Optional[int] = None,
+        batch_size: int = 1000
+    ) -> Iterator:
+        """
+        Duyệt entry đã dừng bằng server-side cursor (stream_results + yield_per):
+        chỉ giữ batch_size dòng trong RAM, trả về Row (không tạo ORM object)
+        """
+        conditions = self._export_conditions(start_date, end_date, user_id, board_id)
+        query = (
+            select(
+                TimeEntry.id,
+                TimeEntry.user_id,
+                User.username,
+                TimeEntry.task_id,
+                Task.title.label("task_title"),
+                Task.board_id,
+                TimeEntry.started_at,
+                TimeEntry.stopped_at,
+                TimeEntry.duration_seconds,
+                TimeEntry.note,
+            )
+            .join(User, User.id == TimeEntry.user_id)
+            .join(Task, Task.id == TimeEntry.task_id)
+            .where(*conditions)
+        )
+
+        query = query.order_by(TimeEntry.started_at, TimeEntry.id).execution_options(
+            stream_results=True,
+            yield_per=batch_size
+        )
+        for partition in db.execute(query).partitions():
+            yield from partition
+
+    def start(self, db: Session, user_id: int, task_id: int, started_at: datetime, note: Optional[str] = None) -> TimeEntry:
+        return self.create(db, {
+            "user_id": user_id,
+            "task_id": task_id,
+            "started_at": started_at,
+            "note": note,
+        })
+
+    def _insert_running(self, db: Session, user_id: int, task_id: int, started_at: datetime, note: Optional[str]) -> Optional[TimeEntry]:
+        """
+        INSERT ... SELECT có điều kiện, 1 statement:
+        task tồn tại, user được phép (task chưa assign / assign cho user),
+        user chưa có timer đang chạy. Race giữa 2 request cùng lúc
+        bị chặn bởi partial unique index uq_time_entries_running_user.
+        Trả về None nếu không insert được. Không commit.
+        """
+        no_running = ~exists().where(
+            TimeEntry.user_id == user_id,
+            TimeEntry.stopped_at.is_(None)
+        )
+        source = select(
+            literal(task_id),
+            literal(user_id),
+            literal(started_at),
+            literal(note),
+        ).where(
+            Task.id == task_id,
+            or_(Task.assigned_to.is_(None), Task.assigned_to == user_id),
+            no_running
+        )
+        stmt = insert(TimeEntry).from_select(["task_id", "user_id", "started_at", "note"], source)
+
+        try:
+            if db.get_bind().dialect.insert_returning:
+                return db.scalars(stmt.returning(TimeEntry)).first()
+            if db.execute(stmt).rowcount == 0:
+                return None
+        except IntegrityError:
+            # Request khác vừa start timer cho user này, caller phải rollback
+            return None
+        return self.get_running_by_user(db, user_id)
+
+    def start_atomic(self, db: Session, user_id: int, task_id: int, started_at: datetime, note: Optional[str] = None) -> Optional[TimeEntry]:
+        """
+        Bắt đầu timer trong 1 round trip (thay cho get task + get running + insert).
+        None -> không start được (đã rollback), caller tự xác định lý do (chỉ ở nhánh lỗi)
+        """
+        entry = self._insert_running(db, user_id, task_id, started_at, note)
+        if entry is None:
+            db.rollback()
+        return entry
+
+    @staticmethod
+    def cap_stopped_at(started_at: datetime, stopped_at: datetime) -> datetime:
+        """
+        Entry dài tối đa TIME_ENTRY_MAX_SPAN_DAYS: query theo khoảng ngày (overlapping, rebuild)
+        chỉ thấy entry bắt đầu trong cửa sổ đó, entry dài hơn sẽ mất khỏi báo cáo.
+        Timer quên tắt -> cắt tại started_at + max span
+        """
+        return min(stopped_at, started_at + timedelta(days=settings.TIME_ENTRY_MAX_SPAN_DAYS))
+
+    def _close(self, db: Session, entry: TimeEntry, stopped_at: datetime) -> bool:
+        """
+        Dừng entry bằng UPDATE có điều kiện (stopped_at IS NULL) + cộng rollup và tổng của task.
+        False nếu entry đã bị dừng bởi request khác. Không commit.
+        """
+        stopped_at = self.cap_stopped_at(entry.started_at, stopped_at)
+        duration = int((stopped_at - entry.started_at).total_seconds())
+        result = db.execute(
+            update(TimeEntry)
+            .where(
+                TimeEntry.id == entry.id,
+                # Khóa partition: chỉ chạm 1 partition thay vì dò id ở mọi tháng
+                TimeEntry.started_at == entry.started_at,
+                TimeEntry.stopped_at.is_(None)
+            )
+            .values(stopped_at=stopped_at, duration_seconds=duration)
+        )
+        if result.rowcount == 0:
+            return False
+        self._apply_totals(db, entry)
+        return True
+
+    def stop(self, db: Session, entry: TimeEntry, stopped_at: datetime) -> Optional[TimeEntry]:
+        """Dừng entry và cập nhật rollup theo ngày trong cùng 1 transaction (None nếu đã dừng)"""
+        if not self._close(db, entry, stopped_at):
+            return None
+        return entry
+
+    def switch(
+        self,
+        db: Session,
+        user_id: int,
+        task_id: int,
+        switched_at: datetime,
+        note: Optional[str] = None
+    ) -> Tuple[Optional[TimeEntry], Optional[TimeEntry]]:
+        """
+        Dừng timer đang chạy (nếu có) và bắt đầu timer mới trong 1 transaction.
+        Trả về (entry đã dừng, entry mới); entry mới None -> rollback toàn bộ
+        """
+        running = db.query(TimeEntry).filter(
+            TimeEntry.user_id == user_id,
+            TimeEntry.stopped_at.is_(None)
+        ).with_for_update().first()
+
+        if running is not None and not self._close(db, running, switched_at):
+            running = None
+
+        started = self._insert_running(db, user_id, task_id, switched_at, note)
+        if started is None:
+            # Bỏ cả phần dừng timer cũ
+            db.rollback()
+            return None, None
+        return running, started
+
+    def bulk_insert(self, db: Session, rows: List[dict]) -> int:
+        """
+        Ghi nhiều entry đã dừng trong 1 round trip, không commit
+        - Postgres: COPY ... FROM STDIN
+        - Dialect khác: multi-row INSERT
+        Rollup theo ngày và tổng của task không được cập nhật ở đây
+        (caller rebuild rollup / repair_totals theo phạm vi)
+        """
+        if not rows:
+            return 0
+
+        columns = ["task_id", "user_id", "started_at", "stopped_at", "duration_seconds", "note"]
+        if db.get_bind().dialect.name == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow([
+                    "" if row.get(c) is None else row[c]
+                    for c in columns
+                ])
+            buffer.seek(0)
+
+            dbapi_conn = db.connection().connection.driver_connection
+            with dbapi_conn.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY time_entries ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+        else:
+            db.execute(insert(TimeEntry), [{c: row.get(c) for c in columns} for row in rows])
+
+        return len(rows)
+
+    def _apply_totals(self, db: Session, entry: TimeEntry, sign: int = 1):
+        """
+        Cộng / trừ 1 entry đã dừng vào rollup theo ngày và tổng của task. Không commit.
+        Sau commit: đổi version dữ liệu time của user -> cache / ETag báo cáo hết hiệu lực
+        """
+        if entry.stopped_at is None:
+            return
+        report_repository.apply_entry(db, entry, sign=sign)
+        task_repository.add_time(db, entry.task_id, sign * (entry.duration_seconds or 0), sign)
+        on_commit(db, partial(report_cache.bump_version, entry.user_id))
+        on_commit(db, partial(analytics_engine.mark_dirty, entry.user_id))
 
     def create(self, db: Session, obj_in: dict) -> TimeEntry:
         entry = TimeEntry(**obj_in)
         db.add(entry)
-        db.commit()
-        db.refresh(entry)
+        db.flush()
         return entry
 
     def update(self, db: Session, db_obj: TimeEntry, obj_in: dict) -> TimeEntry:
+        # Sửa thời gian / task của entry đã dừng -> trừ rollup + tổng task cũ, cộng lại giá trị mới
+        touches_rollup = bool({"started_at", "stopped_at", "task_id"} & set(obj_in))
+        if touches_rollup:
+            self._apply_totals(db, db_obj, sign=-1)
+
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        db.commit()
-        db.refresh(db_obj)
+
+        if touches_rollup:
+            if db_obj.stopped_at is not None:
+                db_obj.stopped_at = self.cap_stopped_at(db_obj.started_at, db_obj.stopped_at)
+                db_obj.duration_seconds = int((db_obj.stopped_at - db_obj.started_at).total_seconds())
+            db.flush()
+            self._apply_totals(db, db_obj)
+        db.flush()
         return db_obj
 
     def delete(self, db: Session, entry_id: int):
-        db.query(TimeEntry).filter(TimeEntry.id == entry_id).delete()
-        db.commit()
+        entry = self.get(db, entry_id)
+        if entry is None:
+            return
+        self._apply_totals(db, entry, sign=-1)
+        db.delete(entry)
+        db.flush()
+
+    # ====================
+    # Xóa hàng loạt trước khi xóa task / board / user: FK cascade xóa entry
+    # nhưng không trừ rollup theo ngày -> xóa ở đây rồi tính lại các ngày bị ảnh hưởng
+    # ====================
+    def _delete_where(self, db: Session, condition, repair_tasks: bool = False):
+        """
+        Xóa entry khớp condition, rebuild rollup (user, khoảng ngày có entry đã dừng),
+        repair_tasks: tính lại tổng của các task còn lại. Không commit
+        """
+        spans = db.execute(
+            select(TimeEntry.user_id, func.min(TimeEntry.started_at), func.max(TimeEntry.stopped_at))
+            .where(condition, TimeEntry.stopped_at.isnot(None))
+            .group_by(TimeEntry.user_id)
+        ).all()
+        task_ids = (
+            db.scalars(select(TimeEntry.task_id).where(condition).distinct()).all()
+            if repair_tasks else []
+        )
+        db.execute(delete(TimeEntry).where(condition).execution_options(synchronize_session=False))
+
+        for user_id, started_at, stopped_at in spans:
+            report_repository.rebuild(
+                db, user_id=user_id, start_date=started_at.date(), end_date=stopped_at.date()
+            )
+            on_commit(db, partial(report_cache.bump_version, user_id))
+            on_commit(db, partial(analytics_engine.mark_dirty, user_id))
+        if task_ids:
+            task_repository.repair_totals(db, task_ids=task_ids)
+
+    def delete_by_task(self, db: Session, task_id: int):
+        self._delete_where(db, TimeEntry.task_id == task_id)
+
+    def delete_by_board(self, db: Session, board_id: int):
+        self._delete_where(db, TimeEntry.task_id.in_(select(Task.id).where(Task.board_id == board_id)))
+
+    def delete_by_user(self, db: Session, user_id: int):
+        """Entry của user + mọi entry trên task thuộc board user sở hữu (board bị xóa theo user)"""
+        owned_tasks = select(Task.id).join(Board, Board.id == Task.board_id).where(Board.owner_id == user_id)
+        self._delete_where(
+            db,
+            or_(TimeEntry.user_id == user_id, TimeEntry.task_id.in_(owned_tasks)),
+            repair_tasks=True
+        )
 
 
 # Singleton instance
@@ -0,0 +1,67 @@
+from typing import Callable, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+# Unit of work: 1 transaction / request.
+# Repository chỉ flush; route class này commit 1 lần sau khi endpoint trả về
+# (trước khi response được gửi đi), rollback nếu endpoint raise.
+# GET / HEAD / OPTIONS chỉ đọc -> rollback (như db.close() trước đây), không tốn thêm COMMIT.
+# get_db / get_async_db đăng ký session vào request.state.
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def on_commit(db: Union[Session, AsyncSession], callback: Callable[[], None]):
+    """
+    Chạy callback (sync, trong threadpool) sau khi transaction của request commit thành công:
+    publish event, xóa cache... để bên ngoài không thấy dữ liệu chưa commit
+    """
+    db.info.setdefault("on_commit", []).append(callback)
+
+
+async def _finish(request: Request, commit: bool):
+    callbacks = []
+
+    db = getattr(request.state, "db", None)
+    if db is not None:
+        await run_in_threadpool(db.commit if commit else db.rollback)
+        callbacks += db.info.pop("on_commit", [])
+
+    async_db = getattr(request.state, "async_db", None)
+    if async_db is not None:
+        await (async_db.commit() if commit else async_db.rollback())
+        callbacks += async_db.info.pop("on_commit", [])
+
+    if commit:
+        for callback in callbacks:
+            await run_in_threadpool(callback)
+
+
+class UnitOfWorkRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            try:
+                response = await handler(request)
+            except Exception:
+                await _finish(request, commit=False)
+                raise
+
+            if request.method in READ_ONLY_METHODS:
+                await _finish(request, commit=False)
+                return response
+
+            try:
+                await _finish(request, commit=True)
+            except Exception:
+                await _finish(request, commit=False)
+                raise
+            return response
+
+        return route_handler
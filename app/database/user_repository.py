@@ -15,29 +15,28 @@ class UserRepository:
     def get_multi(self, db: Session, skip: int = 0, limit: int = 100) -> List[User]:
         return db.query(User).offset(skip).limit(limit).all()
 
+    def get_many(self, db: Session, user_ids) -> List[User]:
+        return db.query(User).filter(User.id.in_(user_ids)).all()
+
     def create_user(self, db: Session, user_dict: dict) -> User:
         user = User(**user_dict)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        db.flush()
         return user
 
     def update(self, db: Session, db_obj: User, obj_in: dict) -> User:
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def update_password(self, db: Session, user: User, new_password_hash: str):
         user.password_hash = new_password_hash
-        db.commit()
-        db.refresh(user)
+        db.flush()
         return user
 
     def delete(self, db: Session, id: int):
         db.query(User).filter(User.id == id).delete()
-        db.commit()
 
 
 # Singleton instance để import dễ dàng
@@ -1,6 +1,18 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, users, boards, tasks, time_tracking, reports
+from app.core.config import settings
+from app.core.principal import user_cache
+from app.core.events import timer_events
+from app.core.profiler import QueryProfilerMiddleware, query_metrics
+from app.core.report_cache import report_cache
+from app.core.security import password_pool
+from app.core.task_rebalancer import task_rebalancer
+from app.core.partition_maintainer import partition_maintainer
+from app.core.analytics_engine import analytics_engine
+from app.core.jobs import job_runner
+from app.database.connection import engine
+from app.database.pool import pool_metrics, pool_status
 
 app = FastAPI(
     title="Time Tracking App",
@@ -19,20 +31,131 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Queries", "Server-Timing", "ETag"],
 )
 
+if settings.DB_PROFILER_ENABLED:
+    app.add_middleware(QueryProfilerMiddleware, strict=settings.DB_QUERY_BUDGET_STRICT)
+
+@app.on_event("startup")
+def start_event_hub():
+    timer_events.start()
+
+
+@app.on_event("shutdown")
+def stop_event_hub():
+    timer_events.stop()
+
+
+@app.on_event("startup")
+def start_task_rebalancer():
+    task_rebalancer.start()
+
+
+@app.on_event("shutdown")
+def stop_task_rebalancer():
+    task_rebalancer.stop()
+
+
+@app.on_event("startup")
+def start_partition_maintainer():
+    partition_maintainer.start()
+
+
+@app.on_event("shutdown")
+def stop_partition_maintainer():
+    partition_maintainer.stop()
+
+
+@app.on_event("startup")
+def start_analytics_engine():
+    analytics_engine.start()
+
+
+@app.on_event("shutdown")
+def stop_analytics_engine():
+    analytics_engine.stop()
+
+
+@app.on_event("startup")
+def start_job_runner():
+    # "external": job chạy ở scripts/run_jobs.py, API chỉ xếp hàng
+    if settings.JOB_RUNNER == "embedded":
+        job_runner.start()
+
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    job_runner.stop()
+
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    if settings.DB_ASYNC:
+        from app.database.async_connection import get_async_engine
+        await get_async_engine().dispose()
+
+
 # Health check endpoint
 @app.get("/health", tags=["health"])
 def health_check():
     return {"status": "ok"}
 
+
+@app.get("/health/cache", tags=["health"])
+def cache_stats():
+    """Hit/miss của cache user đăng nhập và cache báo cáo"""
+    return {"user_cache": user_cache.stats(), "report_cache": report_cache.stats()}
+
+
+@app.get("/health/analytics", tags=["health"])
+def analytics_stats():
+    """Số entry / bộ nhớ / lần refresh gần nhất của analytics engine, hit / fallback sang SQL"""
+    return analytics_engine.stats()
+
+
+@app.get("/health/jobs", tags=["health"])
+def job_stats():
+    """Job đang chạy của runner trong process này (JOB_RUNNER=embedded)"""
+    return job_runner.stats()
+
+
+@app.get("/health/db", tags=["health"])
+def db_pool_stats():
+    """Trạng thái connection pool + wait time / checkout latency"""
+    stats = {
+        "pool": pool_status(engine),
+        "metrics": pool_metrics.snapshot(),
+    }
+    if settings.DB_ASYNC:
+        from app.database.async_connection import get_async_engine
+        stats["async_pool"] = pool_status(get_async_engine().sync_engine)
+    return stats
+
+
+@app.get("/health/queries", tags=["health"])
+def query_stats():
+    """Số query / thời gian DB / statement chậm nhất theo route, kèm query budget"""
+    return {"routes": query_metrics.snapshot()}
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(boards.router)
 app.include_router(tasks.router)
-app.include_router(time_tracking.router)
-app.include_router(reports.router)
+# /time và /reports: async def + asyncpg khi DB_ASYNC=True, mặc định dùng bản sync
+if settings.DB_ASYNC:
+    from app.api import time_tracking_async, reports_async
+    app.include_router(time_tracking_async.router)
+    app.include_router(reports_async.router)
+else:
+    app.include_router(time_tracking.router)
+    app.include_router(reports.router)
 
 # Root endpoint
 @app.get("/", tags=["root"])
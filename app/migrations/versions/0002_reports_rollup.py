@@ -0,0 +1,34 @@
+"""Reports table: daily time rollup per user
+
+Revision ID: 0002_reports_rollup
+Revises: 0001_initial
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+
+# revision identifiers, used by Alembic.
+revision = '0002_reports_rollup'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ### Reports table (1 dòng / user / ngày) ###
+    op.create_table(
+        'reports',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('report_date', sa.DateTime, nullable=False),
+        sa.Column('total_seconds', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('task_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime, nullable=False, default=datetime.utcnow),
+        sa.UniqueConstraint('user_id', 'report_date', name='uq_reports_user_date'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('reports')
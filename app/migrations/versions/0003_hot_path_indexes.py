@@ -0,0 +1,95 @@
+"""Composite / partial indexes for time_entries and tasks hot paths
+
+Revision ID: 0003_hot_path_indexes
+Revises: 0002_reports_rollup
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0003_hot_path_indexes'
+down_revision = '0002_reports_rollup'
+branch_labels = None
+depends_on = None
+
+RUNNING_WHERE = sa.text('stopped_at IS NULL')
+
+
+def _create_index(name, table, columns, **kw):
+    # Postgres: CREATE INDEX CONCURRENTLY (không khóa ghi bảng lớn), phải chạy ngoài transaction
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kw)
+    else:
+        op.create_index(name, table, columns, **kw)
+
+
+def _drop_index(name, table):
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def _align_time_entries_columns():
+    """
+    0001_initial tạo time_entries với start_time / end_time / duration,
+    còn models + repository dùng started_at / stopped_at / duration_seconds / note.
+    Đổi tên (nếu DB còn schema cũ) để index nằm trên đúng cột được query.
+    """
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('time_entries')}
+    if 'start_time' not in columns:
+        return
+
+    with op.batch_alter_table('time_entries') as batch:
+        batch.alter_column('start_time', new_column_name='started_at', existing_type=sa.DateTime, existing_nullable=False)
+        batch.alter_column('end_time', new_column_name='stopped_at', existing_type=sa.DateTime, existing_nullable=True)
+        batch.alter_column('duration', new_column_name='duration_seconds', existing_type=sa.Integer, existing_nullable=True)
+        if 'note' not in columns:
+            batch.add_column(sa.Column('note', sa.Text, nullable=True))
+        # Model không ghi 2 cột này
+        batch.alter_column('created_at', existing_type=sa.DateTime, nullable=True)
+        batch.alter_column('updated_at', existing_type=sa.DateTime, nullable=True)
+
+
+def upgrade() -> None:
+    _align_time_entries_columns()
+
+    # ### Dọn timer chạy trùng trước khi tạo unique index: giữ entry mới nhất mỗi user ###
+    op.execute(
+        "UPDATE time_entries SET stopped_at = started_at, duration_seconds = 0 "
+        "WHERE stopped_at IS NULL AND id NOT IN ("
+        "SELECT max_id FROM (SELECT MAX(id) AS max_id FROM time_entries "
+        "WHERE stopped_at IS NULL GROUP BY user_id) AS latest)"
+    )
+
+    # ### time_entries ###
+    # get_running_by_user: user_id + stopped_at IS NULL
+    _create_index(
+        'uq_time_entries_running_user', 'time_entries', ['user_id'],
+        unique=True,
+        postgresql_where=RUNNING_WHERE,
+        sqlite_where=RUNNING_WHERE,
+    )
+    # get_by_user_and_date / get_by_user / reports: user_id + khoảng started_at
+    _create_index('ix_time_entries_user_started', 'time_entries', ['user_id', 'started_at'])
+    # get_by_task: task_id, sắp theo started_at
+    _create_index('ix_time_entries_task_started', 'time_entries', ['task_id', 'started_at'])
+
+    # ### tasks ###
+    # get_by_board / get_by_status: board_id (+ status), sắp theo position
+    _create_index('ix_tasks_board_status_position', 'tasks', ['board_id', 'status', 'position'])
+    # get_by_assigned_user (/tasks/my/assigned)
+    _create_index('ix_tasks_assigned_to', 'tasks', ['assigned_to'])
+
+
+def downgrade() -> None:
+    _drop_index('ix_tasks_assigned_to', 'tasks')
+    _drop_index('ix_tasks_board_status_position', 'tasks')
+    _drop_index('ix_time_entries_task_started', 'time_entries')
+    _drop_index('ix_time_entries_user_started', 'time_entries')
+    _drop_index('uq_time_entries_running_user', 'time_entries')
+    # Không đổi lại tên cột: code hiện tại chỉ chạy với started_at / stopped_at
@@ -0,0 +1,36 @@
+"""Sparse task positions: renumber each kanban column to 1024, 2048, ...
+
+Revision ID: 0004_sparse_task_positions
+Revises: 0003_hot_path_indexes
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0004_sparse_task_positions'
+down_revision = '0003_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+# Phải khớp settings.TASK_POSITION_GAP mặc định
+POSITION_GAP = 1024
+
+
+def _renumber(expression: str):
+    # 1 UPDATE ... FROM cho toàn bảng, giữ thứ tự (position, id) trong từng cột
+    op.execute(
+        f"UPDATE tasks SET position = {expression} "
+        "FROM (SELECT id, ROW_NUMBER() OVER ("
+        "PARTITION BY board_id, status ORDER BY position, id) AS rn FROM tasks) AS ranked "
+        "WHERE tasks.id = ranked.id"
+    )
+
+
+def upgrade() -> None:
+    # ### position liên tiếp 0, 1, 2 -> thưa 1024, 2048, ... ###
+    _renumber(f'ranked.rn * {POSITION_GAP}')
+
+
+def downgrade() -> None:
+    _renumber('ranked.rn - 1')
@@ -0,0 +1,34 @@
+"""Refresh tokens table (rotating, family-based reuse detection)
+
+Revision ID: 0005_refresh_tokens
+Revises: 0004_sparse_task_positions
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+
+# revision identifiers, used by Alembic.
+revision = '0005_refresh_tokens'
+down_revision = '0004_sparse_task_positions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ### Refresh tokens (chỉ lưu sha256 của token) ###
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True),
+        sa.Column('token_hash', sa.String(64), nullable=False, unique=True),
+        sa.Column('family_id', sa.String(32), nullable=False, index=True),
+        sa.Column('expires_at', sa.DateTime, nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=False, default=datetime.utcnow),
+        sa.Column('revoked_at', sa.DateTime, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,36 @@
+"""Denormalized tracked time on tasks (total_seconds, entry_count)
+
+Revision ID: 0006_task_time_totals
+Revises: 0005_refresh_tokens
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_task_time_totals'
+down_revision = '0005_refresh_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ### Cột cộng dồn, mặc định 0 cho task cũ ###
+    op.add_column('tasks', sa.Column('total_seconds', sa.Integer, nullable=False, server_default='0'))
+    op.add_column('tasks', sa.Column('entry_count', sa.Integer, nullable=False, server_default='0'))
+
+    # ### Backfill từ các entry đã dừng (1 UPDATE, subquery tương quan) ###
+    op.execute(
+        "UPDATE tasks SET "
+        "total_seconds = (SELECT COALESCE(SUM(duration_seconds), 0) FROM time_entries "
+        "WHERE time_entries.task_id = tasks.id AND time_entries.stopped_at IS NOT NULL), "
+        "entry_count = (SELECT COUNT(*) FROM time_entries "
+        "WHERE time_entries.task_id = tasks.id AND time_entries.stopped_at IS NOT NULL)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('tasks') as batch:
+        batch.drop_column('entry_count')
+        batch.drop_column('total_seconds')
@@ -0,0 +1,126 @@
+"""Monthly range partitions for time_entries (Postgres only)
+
+Revision ID: 0007_partition_time_entries
+Revises: 0006_task_time_totals
+Create Date: 2026-10-17 15:00:00.000000
+
+time_entries -> bảng partition theo RANGE (started_at), mỗi tháng 1 partition
+(time_entries_y2026m10). Dữ liệu được copy sang bảng mới trong 1 transaction:
+bảng lớn nên chạy trong cửa sổ bảo trì.
+Khóa chính đổi thành (id, started_at) vì Postgres bắt buộc unique index chứa cột partition;
+"mỗi user 1 timer đang chạy" chuyển thành partial unique index trên từng partition.
+Dialect khác (SQLite dev / test): không đổi gì.
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_partition_time_entries'
+down_revision = '0006_task_time_totals'
+branch_labels = None
+depends_on = None
+
+# Phải khớp settings.TIME_ENTRY_PARTITIONS_AHEAD mặc định
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date):
+    # Tên / DDL giống app.database.partition_repository.ensure
+    name = f"time_entries_y{month.year}m{month.month:02d}"
+    op.execute(
+        f"CREATE TABLE {name} PARTITION OF time_entries "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+    op.execute(f"CREATE UNIQUE INDEX uq_{name}_running_user ON {name} (user_id) WHERE stopped_at IS NULL")
+
+
+def _add_foreign_keys(table: str):
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_task_id_fkey "
+        "FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE"
+    )
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+
+
+def _swap_sequence(old_table: str, new_table: str):
+    # Giữ sequence của id (không reset), chuyển owner sang bảng mới trước khi DROP bảng cũ
+    sequence = op.get_bind().execute(
+        sa.text(f"SELECT pg_get_serial_sequence('{old_table}', 'id')")
+    ).scalar()
+    if sequence:
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {new_table}.id")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # ### Bảng cũ nhường tên; tên index / PK phải trống cho bảng mới ###
+    op.execute("ALTER TABLE time_entries RENAME TO time_entries_unpartitioned")
+    op.execute("ALTER TABLE time_entries_unpartitioned RENAME CONSTRAINT time_entries_pkey TO time_entries_unpartitioned_pkey")
+    for index in ('uq_time_entries_running_user', 'ix_time_entries_user_started',
+                  'ix_time_entries_task_started', 'ix_time_entries_id'):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    # ### Bảng partition: cùng cột / default (nextval của id) với bảng cũ ###
+    op.execute(
+        "CREATE TABLE time_entries (LIKE time_entries_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (started_at)"
+    )
+    op.execute("ALTER TABLE time_entries ADD CONSTRAINT time_entries_pkey PRIMARY KEY (id, started_at)")
+    _add_foreign_keys('time_entries')
+    # Index trên bảng cha tự tạo cho mọi partition (kể cả partition tạo sau)
+    op.create_index('ix_time_entries_user_started', 'time_entries', ['user_id', 'started_at'])
+    op.create_index('ix_time_entries_task_started', 'time_entries', ['task_id', 'started_at'])
+
+    # ### Partition từ tháng của entry cũ nhất tới PARTITIONS_AHEAD tháng sau hiện tại ###
+    oldest = op.get_bind().execute(sa.text("SELECT MIN(started_at) FROM time_entries_unpartitioned")).scalar()
+    now = datetime.utcnow()
+    current = date(now.year, now.month, 1)
+    month = date(oldest.year, oldest.month, 1) if oldest else current
+    while month <= _add_months(current, PARTITIONS_AHEAD):
+        _create_partition(month)
+        month = _add_months(month, 1)
+
+    op.execute("INSERT INTO time_entries SELECT * FROM time_entries_unpartitioned")
+    _swap_sequence('time_entries_unpartitioned', 'time_entries')
+    op.execute("DROP TABLE time_entries_unpartitioned")
+    op.execute("ANALYZE time_entries")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Partition đã detach / archive không được gộp lại
+    op.execute("ALTER TABLE time_entries RENAME TO time_entries_partitioned")
+    op.execute("ALTER TABLE time_entries_partitioned RENAME CONSTRAINT time_entries_pkey TO time_entries_partitioned_pkey")
+    for index in ('ix_time_entries_user_started', 'ix_time_entries_task_started'):
+        op.execute(f"ALTER INDEX {index} RENAME TO {index}_partitioned")
+
+    op.execute(
+        "CREATE TABLE time_entries (LIKE time_entries_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    op.execute("ALTER TABLE time_entries ADD CONSTRAINT time_entries_pkey PRIMARY KEY (id)")
+    _add_foreign_keys('time_entries')
+    op.execute("INSERT INTO time_entries SELECT * FROM time_entries_partitioned")
+    _swap_sequence('time_entries_partitioned', 'time_entries')
+    op.execute("DROP TABLE time_entries_partitioned CASCADE")
+
+    op.create_index('ix_time_entries_id', 'time_entries', ['id'])
+    op.create_index('ix_time_entries_user_started', 'time_entries', ['user_id', 'started_at'])
+    op.create_index('ix_time_entries_task_started', 'time_entries', ['task_id', 'started_at'])
+    op.create_index(
+        'uq_time_entries_running_user', 'time_entries', ['user_id'],
+        unique=True,
+        postgresql_where=sa.text('stopped_at IS NULL'),
+    )
@@ -0,0 +1,45 @@
+"""Background jobs table (exports, rollup rebuilds)
+
+Revision ID: 0008_jobs
+Revises: 0007_partition_time_entries
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import datetime
+
+# revision identifiers, used by Alembic.
+revision = '0008_jobs'
+down_revision = '0007_partition_time_entries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ### Hàng đợi job: runner lấy job queued theo (status, id) ###
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True),
+        sa.Column('kind', sa.String(30), nullable=False),
+        sa.Column('params', sa.Text, nullable=False, server_default='{}'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('processed', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total', sa.Integer, nullable=True),
+        sa.Column('cancel_requested', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('worker', sa.String(100), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime, nullable=True),
+        sa.Column('result_path', sa.String(255), nullable=True),
+        sa.Column('result_bytes', sa.Integer, nullable=True),
+        sa.Column('error', sa.Text, nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=False, default=datetime.utcnow),
+        sa.Column('started_at', sa.DateTime, nullable=True),
+        sa.Column('finished_at', sa.DateTime, nullable=True),
+    )
+    op.create_index('ix_jobs_status_id', 'jobs', ['status', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
@@ -51,6 +51,7 @@ class BoardResponse(BoardBase):
     created_at: datetime
     updated_at: datetime
     tasks_count: Optional[int] = 0  # Số task trong board
+    total_seconds: Optional[int] = 0  # Tổng thời gian đã track của các task
 
     class Config:
         from_attributes = True
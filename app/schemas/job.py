@@ -0,0 +1,46 @@
+import json
+from datetime import date, datetime
+from typing import Literal, Optional
+from pydantic import BaseModel, validator
+
+
+class JobCreate(BaseModel):
+    """
+    Job nền:
+    - export: như GET /reports/export (format, khoảng ngày, user_id, board_id), kết quả là file
+    - rebuild_reports: tính lại rollup theo ngày (admin), user_id None = mọi user
+    """
+    kind: Literal["export", "rebuild_reports"]
+    format: str = "csv"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    user_id: Optional[int] = None
+    board_id: Optional[int] = None
+
+    @validator("end_date")
+    def validate_end_date(cls, v, values):
+        if v and values.get("start_date") and v < values["start_date"]:
+            raise ValueError("end_date không thể trước start_date")
+        return v
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str  # queued / running / succeeded / failed / cancelled
+    params: dict
+    processed: int
+    total: Optional[int] = None
+    cancel_requested: bool
+    error: Optional[str] = None
+    result_bytes: Optional[int] = None  # có file kết quả: GET /reports/jobs/{id}/result
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @validator("params", pre=True)
+    def parse_params(cls, v):
+        return json.loads(v) if isinstance(v, str) else v
+
+    class Config:
+        from_attributes = True
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 
@@ -55,19 +55,61 @@ class TaskUpdate(BaseModel):
 
 class TaskMove(BaseModel):
     status: StatusEnum
-    position: Optional[int] = None
+    position: Optional[int] = None  # chỉ số trong cột (0 = đầu cột)
+    after_id: Optional[int] = None  # card nằm ngay phía trên vị trí mới
+    before_id: Optional[int] = None  # card nằm ngay phía dưới vị trí mới
 
 
 class TaskAssign(BaseModel):
     assigned_to: Optional[int] = None
 
 
+class TaskBatchOperation(BaseModel):
+    """
+    1 thao tác áp cho nhiều task. Chỉ field được gửi mới được cập nhật
+    (gửi "assigned_to": null để bỏ assign; field khác không nhận null).
+    Đổi status -> các task được xếp cuối cột mới theo thứ tự task_ids
+    """
+    task_ids: List[int]
+    status: Optional[StatusEnum] = None
+    priority: Optional[PriorityEnum] = None
+    assigned_to: Optional[int] = None
+    due_date: Optional[datetime] = None
+
+    @validator('task_ids')
+    def task_ids_validator(cls, v):
+        if not v:
+            raise ValueError('task_ids không được để trống')
+        if len(v) > 1000:
+            raise ValueError('Tối đa 1000 task mỗi thao tác')
+        return list(dict.fromkeys(v))
+
+    @validator('status', 'priority', 'due_date')
+    def not_null_validator(cls, v):
+        # Chỉ assigned_to được gửi null (bỏ assign), các field khác null -> ghi NULL vào cột
+        if v is None:
+            raise ValueError('Không được null (chỉ assigned_to được gửi null)')
+        return v
+
+
+class TaskBatchUpdate(BaseModel):
+    operations: List[TaskBatchOperation]
+
+    @validator('operations')
+    def operations_validator(cls, v):
+        if not v:
+            raise ValueError('operations không được để trống')
+        return v
+
+
 class TaskResponse(TaskBase):
     id: int
     board_id: int
     position: int
     assigned_to: Optional[int] = None
     due_date: Optional[datetime] = None
+    total_seconds: int = 0  # Tổng thời gian đã track (entry đã dừng)
+    entry_count: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -26,7 +26,11 @@ class TimeEntryResponse(BaseModel):
     note: Optional[str] = None
 
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class TimeSwitchResponse(BaseModel):
+    stopped: Optional[TimeEntryResponse] = None
+    started: TimeEntryResponse
 
 # =========================
 # Reports
@@ -53,4 +57,50 @@ class TaskTimeReportResponse(BaseModel):
 class StatisticsResponse(BaseModel):
     total_seconds: int
     task_count: int
-    average_per_day: float
\ No newline at end of file
+    average_per_day: float
+
+# =========================
+# Team / board reports (admin)
+# Dạng cột: mỗi field là 1 cột, các list cùng độ dài, phần tử thứ i thuộc dòng i
+# =========================
+class UserTotalsColumns(BaseModel):
+    user_id: List[int] = []
+    user_name: List[Optional[str]] = []
+    total_seconds: List[int] = []
+    entry_count: List[int] = []
+
+class TaskTotalsColumns(BaseModel):
+    task_id: List[int] = []
+    task_title: List[Optional[str]] = []
+    board_id: List[int] = []
+    total_seconds: List[int] = []
+    entry_count: List[int] = []
+
+class BoardTotalsColumns(BaseModel):
+    board_id: List[int] = []
+    board_name: List[Optional[str]] = []
+    total_seconds: List[int] = []
+    entry_count: List[int] = []
+
+class DayTotalsColumns(BaseModel):
+    day: List[date] = []
+    total_seconds: List[int] = []
+    entry_count: List[int] = []
+
+class UserDayTotalsColumns(BaseModel):
+    user_id: List[int] = []
+    day: List[date] = []
+    total_seconds: List[int] = []
+    entry_count: List[int] = []
+
+class TeamReportResponse(BaseModel):
+    start_date: date
+    end_date: date
+    board_id: Optional[int] = None
+    total_seconds: int
+    entry_count: int
+    by_user: UserTotalsColumns
+    by_task: TaskTotalsColumns
+    by_board: BoardTotalsColumns
+    by_day: DayTotalsColumns
+    by_user_day: UserDayTotalsColumns
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class TimeEntryBase(BaseModel):
@@ -34,3 +34,16 @@ class TimeEntryResponse(TimeEntryBase):
 
     class Config:
         from_attributes = True
+
+
+class TimeEntryImportError(BaseModel):
+    row: int
+    error: str
+
+
+class TimeEntryImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TimeEntryImportError] = []
+    elapsed_seconds: float
+    rows_per_second: float
@@ -1,6 +1,13 @@
 import React, { useState } from "react";
 import Stopwatch from "./Stopwatch";
 
+// total_seconds có sẵn trong TaskResponse, không cần gọi thêm API báo cáo
+const formatTracked = (seconds) => {
+  const hrs = Math.floor(seconds / 3600);
+  const mins = Math.floor((seconds % 3600) / 60);
+  return `${hrs}h ${mins.toString().padStart(2, "0")}m`;
+};
+
 const TaskCard = ({ task, onTimeUpdate, onStatusChange }) => {
   const [status, setStatus] = useState(task.status);
 
@@ -26,6 +33,9 @@ const TaskCard = ({ task, onTimeUpdate, onStatusChange }) => {
       <div className="task-info">
         <span>Priority: {task.priority}</span>
         <span>Assigned to: {task.assigned_to_name || "Unassigned"}</span>
+        <span>
+          Tracked: {formatTracked(task.total_seconds || 0)} ({task.entry_count || 0} entries)
+        </span>
         <span>
           Status:{" "}
           <select value={status} onChange={handleStatusChange}>
@@ -20,19 +20,59 @@ api.interceptors.request.use(
   (error) => Promise.reject(error)
 );
 
+/**
+ * Đổi refresh token lấy access token mới (refresh token cũ bị thu hồi, lưu token mới).
+ * Nhiều request cùng gặp 401 -> dùng chung 1 lần refresh.
+ */
+let refreshing = null;
+
+export const refreshAccessToken = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem("refresh_token");
+    refreshing = (refreshToken
+      ? axios.post(`${api.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken })
+      : Promise.reject(new Error("Không có refresh token"))
+    )
+      .then((response) => {
+        localStorage.setItem("access_token", response.data.access_token);
+        localStorage.setItem("refresh_token", response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+const redirectToLogin = () => {
+  localStorage.removeItem("access_token");
+  localStorage.removeItem("refresh_token");
+  window.location.href = "/login";
+};
+
 /**
  * Response interceptor
- * Xử lý lỗi xác thực
+ * Access token hết hạn / bị thu hồi -> refresh rồi gửi lại request 1 lần
  */
 api.interceptors.response.use(
   (response) => response,
-                              (error) => {
-                                if (error.response?.status === 401) {
-                                  localStorage.removeItem("access_token");
-                                  window.location.href = "/login";
-                                }
-                                return Promise.reject(error);
-                              }
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status !== 401 || !original || original._retried || original.url?.startsWith("/auth/")) {
+      return Promise.reject(error);
+    }
+
+    original._retried = true;
+    try {
+      const token = await refreshAccessToken();
+      original.headers.Authorization = `Bearer ${token}`;
+      return api(original);
+    } catch (refreshError) {
+      redirectToLogin();
+      return Promise.reject(error);
+    }
+  }
 );
 
 export default api;
@@ -2,6 +2,7 @@ import api from "./api";
 
 const USER_KEY = "current_user";
 const TOKEN_KEY = import.meta.env.VITE_AUTH_TOKEN_KEY || "access_token";
+const REFRESH_TOKEN_KEY = "refresh_token";
 
 /**
  * Login
@@ -20,20 +21,26 @@ const login = async (username, password) => {
     }
   );
 
-  const { access_token, user } = response.data;
+  const { access_token, refresh_token, user } = response.data;
 
   // Lưu token & user
   localStorage.setItem(TOKEN_KEY, access_token);
+  localStorage.setItem(REFRESH_TOKEN_KEY, refresh_token);
   localStorage.setItem(USER_KEY, JSON.stringify(user));
 
   return user;
 };
 
 /**
- * Logout
+ * Logout: thu hồi phiên ở server (không chờ kết quả) rồi xóa token local
  */
 const logout = () => {
+  const refreshToken = localStorage.getItem(REFRESH_TOKEN_KEY);
+  if (refreshToken) {
+    api.post("/auth/logout", { refresh_token: refreshToken }).catch(() => {});
+  }
   localStorage.removeItem(TOKEN_KEY);
+  localStorage.removeItem(REFRESH_TOKEN_KEY);
   localStorage.removeItem(USER_KEY);
 };
 
@@ -1,22 +1,47 @@
 import api from "./api";
 
 /**
- * Lấy danh sách task theo board + filter
+ * Lấy 1 trang task theo board + filter
+ * Trả về { items, nextCursor } (nextCursor = null khi hết)
  */
-const getTasks = async ({
+const getTasksPage = async ({
   boardId,
   status = null,
   priority = null,
   assignedTo = null,
+  search = null,
+  sort = null,
+  cursor = null,
+  limit = 100,
 }) => {
-  const params = { board_id: boardId };
+  const params = { board_id: boardId, limit };
 
   if (status) params.status = status;
   if (priority) params.priority = priority;
   if (assignedTo) params.assigned_to = assignedTo;
+  if (search) params.q = search;
+  if (sort) params.sort = sort;
+  if (cursor) params.cursor = cursor;
 
   const response = await api.get("/tasks", { params });
-  return response.data;
+  return {
+    items: response.data,
+    nextCursor: response.headers["x-next-cursor"] || null,
+  };
+};
+
+/**
+ * Lấy toàn bộ task theo board + filter (đi hết các trang)
+ */
+const getTasks = async (filters) => {
+  const tasks = [];
+  let cursor = null;
+  do {
+    const page = await getTasksPage({ ...filters, cursor, limit: 500 });
+    tasks.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return tasks;
 };
 
 /**
@@ -45,11 +70,14 @@ const updateTask = async (taskId, taskData) => {
 
 /**
  * Di chuyển task (Kanban / status / position)
+ * neighbours = { afterId, beforeId }: id card phía trên / phía dưới chỗ thả
  */
-const moveTask = async (taskId, status, position = null) => {
+const moveTask = async (taskId, status, position = null, neighbours = {}) => {
   const response = await api.patch(`/tasks/${taskId}/move`, {
     status,
     position,
+    after_id: neighbours.afterId ?? null,
+    before_id: neighbours.beforeId ?? null,
   });
   return response.data;
 };
@@ -72,6 +100,15 @@ const deleteTask = async (taskId) => {
   return response.data;
 };
 
+/**
+ * Cập nhật nhiều task trong 1 request
+ * operations = [{ task_ids: [...], status?, priority?, assigned_to?, due_date? }]
+ */
+const batchUpdateTasks = async (operations) => {
+  const response = await api.patch("/tasks/batch", { operations });
+  return response.data;
+};
+
 /**
  * Lấy task được assign cho user hiện tại
  */
@@ -82,11 +119,13 @@ const getMyAssignedTasks = async () => {
 
 export default {
   getTasks,
+  getTasksPage,
   getTaskById,
   createTask,
   updateTask,
   moveTask,
   assignTask,
   deleteTask,
+  batchUpdateTasks,
   getMyAssignedTasks,
 };
@@ -1,4 +1,4 @@
-import api from "./api";
+import api, { refreshAccessToken } from "./api";
 
 /**
  * ============================
@@ -16,6 +16,17 @@ const startTimer = async (taskId) => {
   return response.data;
 };
 
+/**
+ * Chuyển sang task khác: dừng timer hiện tại + bắt đầu timer mới (1 request)
+ * Trả về { stopped, started }
+ */
+const switchTimer = async (taskId) => {
+  const response = await api.post("/time/switch", {
+    task_id: taskId,
+  });
+  return response.data;
+};
+
 /**
  * Dừng đo thời gian (stopwatch)
  */
@@ -34,6 +45,50 @@ const getRunningEntry = async () => {
   return response.data;
 };
 
+/**
+ * Nghe timer đang chạy qua SSE (thay cho polling /time/running)
+ * onEvent(type, entry): type = "timer.snapshot" | "timer.started" | "timer.stopped"
+ * Trả về hàm để đóng kết nối
+ */
+const subscribeRunningEntry = (onEvent) => {
+  let source = null;
+  let closed = false;
+  let retried = false;
+
+  const open = (token) => {
+    const url = new URL("/time/stream", api.defaults.baseURL);
+    if (token) {
+      url.searchParams.set("access_token", token);
+    }
+
+    source = new EventSource(url.toString());
+    ["timer.snapshot", "timer.started", "timer.stopped"].forEach((type) => {
+      source.addEventListener(type, (event) => {
+        onEvent(type, JSON.parse(event.data));
+      });
+    });
+
+    source.onopen = () => {
+      retried = false;
+    };
+
+    // Access token ngắn hạn: kết nối lại bị 401 -> EventSource dừng hẳn -> refresh rồi mở lại (1 lần)
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !closed && !retried) {
+        retried = true;
+        refreshAccessToken().then(open).catch(() => {});
+      }
+    };
+  };
+
+  open(localStorage.getItem("access_token"));
+
+  return () => {
+    closed = true;
+    source.close();
+  };
+};
+
 /**
  * Lấy time entries của task
  */
@@ -79,8 +134,10 @@ const getStatistics = async (startDate, endDate) => {
 
 export default {
   startTimer,
+  switchTimer,
   stopTimer,
   getRunningEntry,
+  subscribeRunningEntry,
   getTaskTimeEntries,
   getDailyReport,
   getStatistics,
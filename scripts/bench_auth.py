@@ -0,0 +1,70 @@
+"""
+Microbenchmark chi phí xác thực token mỗi request
+
+Với từng backend (jose, pyjwt nếu đã cài, hmac):
+- decode: verify chữ ký + claims mỗi lần (cách cũ của get_current_user với jose)
+- cached: TokenService.verify khi token đã nằm trong cache
+- get_current_user: cả dependency với token như /auth/login cấp (role / active trong token, không query DB)
+
+Chạy:
+    python scripts/bench_auth.py
+    python scripts/bench_auth.py --iterations 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def per_call_us(fn, iterations: int) -> float:
+    # Lấy lần nhanh nhất trong 3 lần đo để bớt nhiễu
+    return min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    from app.core import deps
+    from app.core.config import settings
+    from app.core.tokens import BACKENDS, create_token_service
+
+    now = datetime.utcnow()
+    claims = {
+        "sub": "1",
+        "role": "user",
+        "active": True,
+        "iat": now,
+        "exp": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+
+    print(f"algorithm={settings.ALGORITHM} iterations={args.iterations}")
+    print(f"{'backend':<8} | {'decode us':>10} | {'cached us':>10} | {'get_current_user us':>20}")
+    for name in BACKENDS:
+        try:
+            service = create_token_service(name)
+        except RuntimeError as e:
+            print(f"{name:<8} | bỏ qua: {e}")
+            continue
+
+        token = service.encode(claims)
+        decode_us = per_call_us(lambda: service.backend.decode(token), args.iterations)
+
+        service.verify(token)
+        cached_us = per_call_us(lambda: service.verify(token), args.iterations)
+
+        deps.token_service = service
+        dependency_us = per_call_us(lambda: deps.get_current_user(token=token, db=None), args.iterations)
+
+        print(f"{name:<8} | {decode_us:>10.2f} | {cached_us:>10.2f} | {dependency_us:>20.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark GET /boards: cách cũ (N+1) vs get_summaries (1 query)
+
+Chạy:
+    python scripts/bench_board_listing.py
+    python scripts/bench_board_listing.py --database-url postgresql+psycopg2://... --boards 500 2000 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.models import Base, User, Board, Task
+from app.database.board_repository import board_repository
+from app.database.task_repository import task_repository
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(db, board_count: int, task_count: int, user_count: int = 20):
+    now = datetime.utcnow()
+    users = [
+        User(username=f"user{i}", password_hash="x", full_name=f"User {i}", created_at=now, updated_at=now)
+        for i in range(user_count)
+    ]
+    db.add_all(users)
+    db.flush()
+
+    boards = [
+        Board(name=f"Board {i}", owner_id=users[i % user_count].id, is_public=(i % 3 == 0), created_at=now, updated_at=now)
+        for i in range(board_count)
+    ]
+    db.add_all(boards)
+    db.flush()
+
+    db.bulk_insert_mappings(Task, [
+        {"board_id": boards[i % board_count].id, "title": f"Task {i}", "position": i, "created_at": now, "updated_at": now}
+        for i in range(task_count)
+    ])
+    db.commit()
+    return users[1].id
+
+
+def legacy_listing(db, user_id: int, skip: int, limit: int):
+    """Logic cũ của get_boards: load hết, cắt trang bằng Python, N+1 query"""
+    boards = board_repository.get_accessible_boards(db, user_id)
+    result = []
+    for board in boards[skip: skip + limit]:
+        tasks = task_repository.get_by_board(db, board.id)
+        owner_name = board.owner.full_name or board.owner.username if board.owner else None
+        result.append((board.id, len(tasks), owner_name))
+    return result
+
+
+def summary_listing(db, user_id: int, skip: int, limit: int):
+    rows = board_repository.get_summaries(db, user_id=user_id, skip=skip, limit=limit)
+    return [(row.id, row.tasks_count, row.owner_name) for row in rows]
+
+
+def measure(engine, counter, fn, user_id, skip, limit, repeat):
+    Session = sessionmaker(bind=engine, autoflush=False)
+    best = None
+    queries = 0
+    for _ in range(repeat):
+        with Session() as db:
+            counter.count = 0
+            started = time.perf_counter()
+            fn(db, user_id, skip, limit)
+            elapsed = time.perf_counter() - started
+            queries = counter.count
+            best = elapsed if best is None else min(best, elapsed)
+    return queries, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--boards", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'boards':>8} | {'legacy queries':>14} | {'legacy ms':>10} | {'summary queries':>15} | {'summary ms':>10}")
+    for board_count in args.boards:
+        engine = create_engine(args.database_url)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            user_id = seed(db, board_count, args.tasks)
+
+        counter = QueryCounter(engine)
+        legacy = measure(engine, counter, legacy_listing, user_id, 0, args.limit, args.repeat)
+        summary = measure(engine, counter, summary_listing, user_id, 0, args.limit, args.repeat)
+        print(f"{board_count:>8} | {legacy[0]:>14} | {legacy[1]:>10.1f} | {summary[0]:>15} | {summary[1]:>10.1f}")
+
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
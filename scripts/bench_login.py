@@ -0,0 +1,137 @@
+"""
+Benchmark login theo cost của hash mật khẩu
+
+1. Thời gian 1 lần verify cho từng cost (1 thread) -> số login/giây tối đa mỗi core
+2. Login burst in-process (httpx + ASGI, không cần chạy server): `--concurrency` client
+   login liên tục, song song `--timer-clients` client gọi GET /time/running
+   -> login/giây, p50/p95 login và p95 của request timer (có bị nghẽn không)
+
+Cost: rounds với bcrypt / bcrypt_sha256, time_cost với argon2.
+Chạy:
+    python scripts/bench_login.py
+    python scripts/bench_login.py --scheme bcrypt_sha256 --costs 10 11 12 13 --workers 2
+    python scripts/bench_login.py --scheme argon2 --costs 2 3 4 --executor process --workers 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def make_context(scheme: str, cost: int):
+    from app.core.security import build_password_context
+    if scheme == "argon2":
+        return build_password_context([scheme], argon2_time_cost=cost)
+    return build_password_context([scheme], bcrypt_rounds=cost)
+
+
+def verify_latency_ms(context, samples: int) -> float:
+    hashed = context.hash("benchmark-password")
+    started = time.perf_counter()
+    for _ in range(samples):
+        context.verify("benchmark-password", hashed)
+    return (time.perf_counter() - started) * 1000 / samples
+
+
+async def client_loop(client, deadline, request, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await request(client)
+        if response.status_code >= 400:
+            errors.append(response.status_code)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def burst(app, args, token):
+    import httpx
+
+    login_ms, timer_ms, login_errors, timer_errors = [], [], [], []
+    login = lambda c: c.post("/auth/login-json", json={"username": "bench", "password": "benchmark-password"})
+    running = lambda c: c.get("/time/running", headers={"Authorization": f"Bearer {token}"})
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=120) as client:
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(
+            *[client_loop(client, deadline, login, login_ms, login_errors) for _ in range(args.concurrency)],
+            *[client_loop(client, deadline, running, timer_ms, timer_errors) for _ in range(args.timer_clients)],
+        )
+    return login_ms, timer_ms, login_errors, timer_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--scheme", default="bcrypt_sha256", choices=["bcrypt", "bcrypt_sha256", "argon2"])
+    parser.add_argument("--costs", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--executor", default="thread", choices=["thread", "process"])
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS")
+    parser.add_argument("--concurrency", type=int, default=50, help="Số client login đồng thời")
+    parser.add_argument("--timer-clients", type=int, default=10)
+    parser.add_argument("--duration", type=int, default=10, help="Giây cho mỗi cost")
+    parser.add_argument("--samples", type=int, default=5, help="Số lần verify khi đo latency")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_login.db"
+    os.environ["PASSWORD_HASH_EXECUTOR"] = args.executor
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    # Không cho 503 làm méo số liệu: mọi login đều được xếp hàng
+    os.environ["PASSWORD_HASH_MAX_PENDING"] = str(args.concurrency + 1)
+
+    from app.main import app
+    from app.core import security
+    from app.database.connection import engine, SessionLocal
+    from app.database.models import Base, User
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = db.query(User).filter(User.username == "bench").first()
+    if user is None:
+        user = User(username="bench", password_hash="x", full_name="Bench")
+        db.add(user)
+        db.commit()
+    token = security.create_access_token(user.id)
+
+    print(f"scheme={args.scheme} executor={args.executor} workers={args.workers} cpu={os.cpu_count()}")
+    print(
+        f"{'cost':>4} | {'verify ms':>9} | {'max/s/core':>10} | {'login/s':>8} | "
+        f"{'login p50':>9} | {'login p95':>9} | {'timer p95':>9} | {'errors':>6}"
+    )
+    for cost in args.costs:
+        context = make_context(args.scheme, cost)
+        verify_ms = verify_latency_ms(context, args.samples)
+
+        # Process pool fork lại sau khi đổi context
+        security.password_pool.shutdown()
+        security.pwd_context = context
+        user.password_hash = context.hash("benchmark-password")
+        db.commit()
+
+        login_ms, timer_ms, login_errors, timer_errors = asyncio.run(burst(app, args, token))
+        print(
+            f"{cost:>4} | {verify_ms:>9.1f} | {1000 / verify_ms:>10.1f} | "
+            f"{len(login_ms) / args.duration:>8.1f} | "
+            f"{statistics.median(login_ms) if login_ms else 0:>9.1f} | {percentile(login_ms, 95):>9.1f} | "
+            f"{percentile(timer_ms, 95):>9.1f} | {len(login_errors) + len(timer_errors):>6}"
+        )
+
+    security.password_pool.shutdown()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
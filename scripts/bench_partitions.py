@@ -0,0 +1,213 @@
+"""
+Benchmark query báo cáo khi time_entries lớn dần (Postgres, dùng DB riêng để test)
+
+Mỗi bước nạp thêm lịch sử CŨ HƠN tới tổng --rows dòng (mật độ --rows-per-day không đổi,
+7 ngày gần nhất giữ nguyên), ANALYZE, rồi đo p50 / p95 các hàm repository của báo cáo
+trên 7 ngày gần nhất và số partition planner thực sự quét (EXPLAIN của get_group_by_task).
+Đã partition (migration 0007): số partition quét và latency gần như không đổi khi lịch sử tăng.
+Chạy trước / sau `alembic upgrade head` để so với bảng chưa partition.
+
+Chạy:
+    python scripts/bench_partitions.py --database-url postgresql+psycopg2://... --rows 1000000 10000000 50000000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.models import Board, Task, TimeEntry, User
+from app.database.partition_repository import partition_repository
+from app.database.report_repository import report_repository
+from app.database.time_entry_repository import time_entry_repository
+
+INSERT_CHUNK = text(
+    "INSERT INTO time_entries (task_id, user_id, started_at, stopped_at, duration_seconds) "
+    "SELECT (:task_ids)[1 + g % :task_count], (:user_ids)[1 + g % :user_count], "
+    "CAST(:oldest AS timestamp) - make_interval(secs => g * :step), "
+    "CAST(:oldest AS timestamp) - make_interval(secs => g * :step) + make_interval(secs => :duration), "
+    ":duration "
+    "FROM generate_series(1, :count) AS g"
+)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def seed(Session, users: int, tasks: int):
+    """User / task dùng cho benchmark (tạo 1 lần, chạy lại thì dùng tiếp)"""
+    db = Session()
+    try:
+        user_ids = list(db.scalars(
+            select(User.id).where(User.username.like("bench_part_%")).order_by(User.id)
+        ))
+        for i in range(len(user_ids), users):
+            user = User(username=f"bench_part_{i}", password_hash="x", full_name=f"Bench {i}")
+            db.add(user)
+            db.flush()
+            user_ids.append(user.id)
+
+        board = db.scalars(select(Board).where(Board.name == "bench_partitions")).first()
+        if board is None:
+            board = Board(name="bench_partitions", owner_id=user_ids[0])
+            db.add(board)
+            db.flush()
+        task_ids = list(db.scalars(select(Task.id).where(Task.board_id == board.id).order_by(Task.id)))
+        for i in range(len(task_ids), tasks):
+            task = Task(board_id=board.id, title=f"Bench task {i}", position=(i + 1) * 1024)
+            db.add(task)
+            db.flush()
+            task_ids.append(task.id)
+        db.commit()
+        return user_ids[:users], task_ids[:tasks]
+    finally:
+        db.close()
+
+
+def grow(Session, target: int, current: int, oldest: datetime, args, user_ids, task_ids) -> datetime:
+    """Nạp thêm entry cũ hơn `oldest` tới khi đủ target dòng, trả về mốc cũ nhất mới"""
+    step = 86400 / args.rows_per_day
+    # Entry của cùng 1 user không chồng nhau
+    duration = int(min(3600, step * len(user_ids)))
+    db = Session()
+    try:
+        while current < target:
+            count = min(args.chunk, target - current)
+            new_oldest = oldest - timedelta(seconds=count * step)
+            if partition_repository.ensure(db, new_oldest.date(), oldest.date()):
+                db.commit()
+            db.execute(INSERT_CHUNK, {
+                "task_ids": task_ids, "task_count": len(task_ids),
+                "user_ids": user_ids, "user_count": len(user_ids),
+                "oldest": oldest, "step": step, "duration": duration, "count": count,
+            })
+            db.commit()
+            current += count
+            oldest = new_oldest
+            print(f"  loaded {current:,} rows (history from {oldest:%Y-%m-%d})", flush=True)
+        db.execute(text("ANALYZE time_entries"))
+        db.commit()
+        return oldest
+    finally:
+        db.close()
+
+
+def scanned_relations(engine, Session, call) -> int:
+    """Số bảng time_entries* trong plan của các statement mà `call` chạy"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    db = Session()
+    try:
+        call(db)
+    finally:
+        db.rollback()
+        db.close()
+        event.remove(engine, "before_cursor_execute", capture)
+
+    relations = set()
+
+    def walk(node):
+        name = node.get("Relation Name", "")
+        if name.startswith("time_entries"):
+            relations.add(name)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            walk(plan[0]["Plan"])
+    return len(relations)
+
+
+def measure(Session, call, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            call(db)
+            latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.rollback()
+            db.close()
+    return statistics.median(latencies), percentile(latencies, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--rows-per-day", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="Số dòng mỗi INSERT ... SELECT")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name != "postgresql":
+        parser.error("Cần Postgres (generate_series, partition)")
+    Session = sessionmaker(bind=engine)
+
+    user_ids, task_ids = seed(Session, args.users, args.tasks)
+    with Session() as db:
+        partitioned = partition_repository.is_partitioned(db)
+        current, oldest = db.execute(select(func.count(TimeEntry.id), func.min(TimeEntry.started_at))).one()
+    oldest = oldest or datetime.utcnow()
+
+    user_id = user_ids[0]
+    today = date.today()
+    week_ago = today - timedelta(days=6)
+    calls = [
+        ("group_by_task", lambda db: time_entry_repository.get_group_by_task(db, user_id, week_ago, today)),
+        ("statistics", lambda db: report_repository.statistics(db, user_id, week_ago, today)),
+        ("entries_by_date", lambda db: time_entry_repository.get_by_user_and_date(db, user_id, today - timedelta(days=1))),
+        ("rebuild_week", lambda db: report_repository.rebuild(db, user_id=user_id, start_date=week_ago, end_date=today)),
+        ("export_week", lambda db: sum(1 for _ in time_entry_repository.stream_export(db, week_ago, today))),
+    ]
+
+    print(f"partitioned={partitioned} rows_per_day={args.rows_per_day} users={len(user_ids)} repeat={args.repeat}")
+    results = []
+    for target in sorted(args.rows):
+        if target > current:
+            oldest = grow(Session, target, current, oldest, args, user_ids, task_ids)
+            current = target
+        with Session() as db:
+            partitions = len(partition_repository.list(db)) if partitioned else 1
+        scanned = scanned_relations(engine, Session, calls[0][1])
+        timings = {name: measure(Session, call, args.repeat) for name, call in calls}
+        results.append((current, partitions, scanned, timings))
+
+    header = f"{'rows':>12} | {'partitions':>10} | {'scanned':>7}"
+    for name, _ in calls:
+        header += f" | {name + ' p50/p95 ms':>28}"
+    print(header)
+    for rows, partitions, scanned, timings in results:
+        line = f"{rows:>12,} | {partitions:>10} | {scanned:>7}"
+        for name, _ in calls:
+            p50, p95 = timings[name]
+            line += f" | {p50:>13.2f} / {p95:>12.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
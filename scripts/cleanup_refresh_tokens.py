@@ -0,0 +1,36 @@
+"""
+Xóa refresh token đã hết hạn (bảng refresh_tokens), chạy định kỳ bằng cron
+
+Chạy:
+    python scripts/cleanup_refresh_tokens.py
+"""
+import argparse
+import os
+import sys
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.connection import SessionLocal
+from app.database.refresh_token_repository import refresh_token_repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        deleted = refresh_token_repository.delete_expired(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Deleted {deleted} expired refresh tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+In query plan (EXPLAIN) của các query nóng trong repository
+để kiểm tra index có được dùng không (không còn Seq Scan / SCAN TABLE)
+
+Chạy:
+    python scripts/explain_queries.py
+    python scripts/explain_queries.py --database-url postgresql+psycopg2://... --analyze
+    python scripts/explain_queries.py --database-url sqlite:// --create-schema
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.database.models import Base, StatusEnum
+from app.database.board_repository import board_repository
+from app.database.task_repository import task_repository
+from app.database.time_entry_repository import time_entry_repository
+from app.database.report_repository import report_repository
+
+
+def repository_calls(user_id: int, board_id: int, task_id: int):
+    """(tên, hàm(db)) — gọi đúng code repository, SQL được bắt lại qua event"""
+    today = date.today()
+    week_ago = today - timedelta(days=6)
+    return [
+        ("time_entry.get_running_by_user", lambda db: time_entry_repository.get_running_by_user(db, user_id)),
+        ("time_entry.get_by_user_and_date", lambda db: time_entry_repository.get_by_user_and_date(db, user_id, today)),
+        ("time_entry.get_by_task", lambda db: time_entry_repository.get_by_task(db, task_id)),
+        ("time_entry.get_group_by_task", lambda db: time_entry_repository.get_group_by_task(db, user_id, week_ago, today)),
+        ("task.get_by_board", lambda db: task_repository.get_by_board(db, board_id)),
+        ("task.get_by_status", lambda db: task_repository.get_by_status(db, board_id, StatusEnum.todo)),
+        ("task.get_by_assigned_user", lambda db: task_repository.get_by_assigned_user(db, user_id)),
+        ("board.get_summaries", lambda db: board_repository.get_summaries(db, user_id=user_id)),
+        ("report.get_range", lambda db: report_repository.get_range(db, user_id, week_ago, today)),
+        ("report.statistics", lambda db: report_repository.statistics(db, user_id, week_ago, today)),
+    ]
+
+
+def explain_prefix(dialect: str, analyze: bool) -> str:
+    if dialect == "postgresql":
+        return "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    if dialect == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN "
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--board-id", type=int, default=1)
+    parser.add_argument("--task-id", type=int, default=1)
+    parser.add_argument("--analyze", action="store_true", help="Postgres: EXPLAIN ANALYZE (chạy query thật)")
+    parser.add_argument("--create-schema", action="store_true", help="Tạo bảng + index từ models (DB trống)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    prefix = explain_prefix(engine.dialect.name, args.analyze)
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("EXPLAIN"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+
+    for name, call in repository_calls(args.user_id, args.board_id, args.task_id):
+        db = Session()
+        try:
+            captured.clear()
+            call(db)
+            statements = list(captured)
+            print(f"=== {name} ===")
+            with engine.connect() as conn:
+                for statement, parameters in statements:
+                    print(statement.strip())
+                    print("---")
+                    for row in conn.exec_driver_sql(prefix + statement, parameters):
+                        print("  " + " | ".join(str(v) for v in row))
+            print()
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
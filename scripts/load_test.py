@@ -0,0 +1,98 @@
+"""
+Load test so sánh chế độ sync (threadpool) và async (DB_ASYNC=True)
+
+Trộn request timer nhẹ (/time/running) với report nặng (/reports/summary
+khoảng dài) để xem report chậm có làm nghẽn timer không.
+
+Chạy server 2 lần rồi so sánh kết quả:
+    DB_ASYNC=false uvicorn app.main:app --port 8000
+    python scripts/load_test.py --token <JWT> --concurrency 200 --duration 30
+
+    DB_ASYNC=true uvicorn app.main:app --port 8000
+    python scripts/load_test.py --token <JWT> --concurrency 200 --duration 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, timedelta
+
+import httpx
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def worker(client, deadline, path, params, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            if response.status_code >= 400:
+                errors[path] = errors.get(path, 0) + 1
+                continue
+        except httpx.HTTPError:
+            errors[path] = errors.get(path, 0) + 1
+            continue
+        latencies[path].append((time.perf_counter() - started) * 1000)
+
+
+async def run(args):
+    today = date.today()
+    report_params = {
+        "start_date": str(today - timedelta(days=args.report_days)),
+        "end_date": str(today),
+    }
+    endpoints = [
+        ("/time/running", None),
+        ("/reports/summary", report_params),
+    ]
+    latencies = {path: [] for path, _ in endpoints}
+    errors = {}
+
+    report_workers = max(1, int(args.concurrency * args.report_ratio))
+    timer_workers = max(1, args.concurrency - report_workers)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + args.duration
+        tasks = [
+            worker(client, deadline, "/time/running", None, latencies, errors)
+            for _ in range(timer_workers)
+        ] + [
+            worker(client, deadline, "/reports/summary", report_params, latencies, errors)
+            for _ in range(report_workers)
+        ]
+        await asyncio.gather(*tasks)
+
+    print(f"{'endpoint':<20} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'errors':>6}")
+    for path, _ in endpoints:
+        values = latencies[path]
+        print(
+            f"{path:<20} | {len(values) / args.duration:>8.1f} | "
+            f"{statistics.median(values) if values else 0:>8.1f} | "
+            f"{percentile(values, 95):>8.1f} | {percentile(values, 99):>8.1f} | "
+            f"{errors.get(path, 0):>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=int, default=20)
+    parser.add_argument("--report-ratio", type=float, default=0.2, help="Tỉ lệ worker gọi report nặng")
+    parser.add_argument("--report-days", type=int, default=365)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Quản lý partition theo tháng của time_entries (Postgres, sau migration 0007)
+
+    list     : partition đang gắn + số dòng ước lượng
+    ensure   : tạo partition cho tháng hiện tại + N tháng tới (cron, nếu tắt job nền)
+    archive  : detach các partition cũ hơn --before, ghi ra CSV gzip rồi DROP
+
+Báo cáo theo ngày (bảng reports) và tasks.total_seconds vẫn giữ thời gian của tháng đã archive.
+Chạy:
+    python scripts/manage_partitions.py list
+    python scripts/manage_partitions.py ensure --months-ahead 6
+    python scripts/manage_partitions.py archive --before 2025-01 --output-dir /var/backups/time_entries
+"""
+import argparse
+import gzip
+import os
+import sys
+from datetime import date, datetime
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.connection import SessionLocal
+from app.database.partition_repository import partition_repository
+
+
+def parse_month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def archive(db, before: date, output_dir: str, keep_table: bool):
+    os.makedirs(output_dir, exist_ok=True)
+    for partition in partition_repository.list(db):
+        if partition["month"] >= before:
+            continue
+        name = partition["name"]
+        # Detach commit riêng: khóa bảng cha chỉ trong khoảnh khắc, COPY chạy trên bảng đã tách
+        partition_repository.detach(db, name)
+        db.commit()
+
+        path = os.path.join(output_dir, f"{name}.csv.gz")
+        with gzip.open(path, "wb") as fileobj:
+            partition_repository.archive(db, name, fileobj, drop=not keep_table)
+        db.commit()
+        print(f"Archived {name} -> {path}" + (" (table kept)" if keep_table else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list")
+    ensure_parser = subparsers.add_parser("ensure")
+    ensure_parser.add_argument("--months-ahead", type=int, default=None)
+    archive_parser = subparsers.add_parser("archive")
+    archive_parser.add_argument("--before", type=parse_month, required=True, help="YYYY-MM, không tính tháng này")
+    archive_parser.add_argument("--output-dir", required=True)
+    archive_parser.add_argument("--keep-table", action="store_true", help="Chỉ detach + export, không DROP")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if not partition_repository.is_partitioned(db):
+            print("time_entries chưa được partition (cần Postgres + alembic upgrade head)")
+            return
+
+        if args.command == "list":
+            for partition in partition_repository.list(db):
+                print(f"{partition['name']:<24} {partition['month'].isoformat()} ~{partition['estimated_rows']} rows")
+        elif args.command == "ensure":
+            created = partition_repository.ensure_future(db, args.months_ahead)
+            db.commit()
+            print(f"Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+        else:
+            archive(db, args.before, args.output_dir, args.keep_table)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Đếm số SQL statement + commit cho mỗi endpoint (round trip tới DB)
+để so sánh trước / sau khi tối ưu. Chạy app in-process bằng TestClient
+trên DB trống (mặc định SQLite file tạm), cache user đã warm.
+
+--cold-cache: tắt cache user / board (số query tệ nhất, dùng để đặt QUERY_BUDGETS)
+--check-budgets: bật DB_QUERY_BUDGET_STRICT, exit 1 nếu endpoint nào vượt query budget
+(app/core/profiler.py), dùng được trong CI.
+
+Chạy:
+    python scripts/queries_per_endpoint.py
+    python scripts/queries_per_endpoint.py --cold-cache --check-budgets
+    python scripts/queries_per_endpoint.py --database-url postgresql+psycopg2://.../scratch_db
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def scenario(ctx):
+    """(method, path, json) lần lượt, dùng id tạo ra từ bước trước qua ctx"""
+    board = ctx["board_id"]
+    return [
+        ("GET", "/users/me", None),
+        ("PUT", "/users/me", {"full_name": "Alice A."}),
+        ("POST", "/boards/", {"name": "Sprint"}),
+        ("GET", "/boards/", None),
+        ("GET", f"/boards/{board}", None),
+        ("PUT", f"/boards/{board}", {"description": "updated"}),
+        ("POST", "/tasks/", {"title": "New card", "board_id": board}),
+        ("GET", f"/tasks/?board_id={board}", None),
+        ("GET", "/tasks/{task_id}", None),
+        ("PUT", "/tasks/{task_id}", {"title": "Renamed card"}),
+        ("PATCH", "/tasks/{task_id}/move", {"status": "in_progress", "position": 0}),
+        ("PATCH", "/tasks/{task_id}/assign", {"assigned_to": ctx["user_id"]}),
+        ("PATCH", "/tasks/batch", {"operations": [{"task_ids": ctx["task_ids"], "status": "done"}]}),
+        ("POST", "/time/start", {"task_id": "{task_id}"}),
+        ("GET", "/time/running", None),
+        ("POST", "/time/switch", {"task_id": ctx["task_ids"][0]}),
+        ("POST", "/time/stop", {}),
+        ("GET", "/reports/summary?start_date=2020-01-01&end_date=2030-01-01", None),
+        ("DELETE", "/tasks/{task_id}", None),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--cold-cache", action="store_true", help="Tắt cache user / board")
+    parser.add_argument("--check-budgets", action="store_true", help="Exit 1 nếu vượt query budget")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/queries.db"
+    os.environ["DATABASE_URL"] = database_url
+    if args.cold_cache:
+        os.environ["USER_CACHE_TTL_SECONDS"] = "0"
+        os.environ["BOARD_CACHE_TTL_SECONDS"] = "0"
+    if args.check_budgets:
+        os.environ["DB_PROFILER_ENABLED"] = "true"
+        os.environ["DB_QUERY_BUDGET_STRICT"] = "true"
+
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.core.security import access_token_claims, create_access_token, get_password_hash
+    from app.database.connection import engine, SessionLocal
+    from app.database.models import Base, User, Board, Task
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = User(username="alice", password_hash=get_password_hash("secret1"), full_name="Alice")
+    db.add(user)
+    db.flush()
+    board = Board(name="Board", owner_id=user.id)
+    db.add(board)
+    db.flush()
+    tasks = [Task(board_id=board.id, title=f"Task {i}", position=(i + 1) * 1024) for i in range(5)]
+    db.add_all(tasks)
+    db.commit()
+    ctx = {"user_id": user.id, "board_id": board.id, "task_ids": [t.id for t in tasks]}
+    db.close()
+
+    counts = {"queries": 0, "commits": 0}
+    event.listen(engine, "before_cursor_execute", lambda *a: counts.__setitem__("queries", counts["queries"] + 1))
+    event.listen(engine, "commit", lambda *a: counts.__setitem__("commits", counts["commits"] + 1))
+
+    # Token như /auth/login cấp (mang role / active)
+    headers = {"Authorization": "Bearer " + create_access_token(user.id, claims=access_token_claims(user))}
+    client = TestClient(app)
+    client.get("/users/me", headers=headers)  # warm cache user
+
+    print(f"{'endpoint':<70} {'status':>6} {'queries':>8} {'commits':>8}")
+    total = 0
+    over_budget = []
+    for method, path, body in scenario(ctx):
+        path = path.replace("{task_id}", str(ctx.get("task_id", "")))
+        if isinstance(body, dict):
+            body = {k: (ctx.get("task_id") if v == "{task_id}" else v) for k, v in body.items()}
+
+        counts.update(queries=0, commits=0)
+        response = client.request(method, path, json=body, headers=headers)
+        if method == "POST" and path == "/tasks/":
+            ctx["task_id"] = response.json()["id"]
+
+        if response.status_code == 500 and "query budget" in response.text:
+            over_budget.append(response.json()["detail"])
+
+        total += counts["queries"] + counts["commits"]
+        print(f"{method + ' ' + path:<70} {response.status_code:>6} {counts['queries']:>8} {counts['commits']:>8}")
+
+    print(f"{'TOTAL round trips (queries + commits)':<70} {'':>6} {total:>8}")
+
+    if over_budget:
+        print("\n".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
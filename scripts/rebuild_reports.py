@@ -0,0 +1,48 @@
+"""
+Backfill / rebuild rollup theo ngày (bảng reports) từ time_entries
+
+Chạy:
+    python scripts/rebuild_reports.py
+    python scripts/rebuild_reports.py --user-id 3 --start-date 2026-01-01 --end-date 2026-01-31
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.connection import SessionLocal
+from app.database.report_repository import report_repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        written = report_repository.rebuild(
+            db,
+            user_id=args.user_id,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            batch_size=args.batch_size
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Rebuilt {written} daily report rows")
+
+
+if __name__ == "__main__":
+    main()
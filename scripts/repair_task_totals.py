@@ -0,0 +1,40 @@
+"""
+Sửa lệch tasks.total_seconds / tasks.entry_count so với time_entries
+
+Tổng được cộng dồn khi dừng / sửa / xóa entry; job này tính lại từ các entry
+đã dừng và chỉ ghi các task đang lệch (sau khi sửa tay DB, import lỗi giữa chừng...).
+Chạy:
+    python scripts/repair_task_totals.py
+    python scripts/repair_task_totals.py --task-id 12 --task-id 15
+"""
+import argparse
+import os
+import sys
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.connection import SessionLocal
+from app.database.task_repository import task_repository
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--task-id", type=int, action="append", default=None, help="Chỉ sửa các task này")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        repaired = task_repository.repair_totals(db, task_ids=args.task_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"Repaired {repaired} task totals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Chạy job nền (POST /reports/jobs) như 1 service riêng, khi JOB_RUNNER=external
+(API nhiều worker uvicorn chỉ xếp hàng vào bảng jobs, chạy script này bằng systemd).
+Có thể chạy nhiều instance (nhiều máy dùng chung JOB_RESULT_DIR): mỗi job chỉ 1 runner lấy.
+
+Chạy:
+    python scripts/run_jobs.py
+    python scripts/run_jobs.py --workers 4
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Thêm thư mục project vào sys.path để import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.core.jobs import JobRunner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS,
+                        help="Số process chạy job cùng lúc")
+    parser.add_argument("--poll-seconds", type=float, default=settings.JOB_POLL_SECONDS,
+                        help="Chu kỳ kiểm tra job mới")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    runner = JobRunner(
+        workers=args.workers,
+        poll_seconds=args.poll_seconds,
+        stale_seconds=settings.JOB_STALE_SECONDS,
+        result_ttl_hours=settings.JOB_RESULT_TTL_HOURS,
+    )
+    runner.start()
+    print(f"Job runner {runner.worker_id} started with {args.workers} workers (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()